@@ -0,0 +1,94 @@
+"""
+Startup-time regression check for the CLIs, based on `python -X importtime`.
+
+Every entry point is started in a fresh interpreter (CLIs with `--help`, so nothing runs past argument
+parsing). The script reports the import time of each one and fails if any of them loads a heavy dependency
+that should only be imported on use: vendor SDKs when a wrapper is instantiated, pandas/scipy when an
+analysis function runs. The cost of importing those dependencies eagerly is measured the same way, to show
+what the lazy imports save.
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --repeats 5 --max-ms 400
+"""
+
+import argparse
+import subprocess
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+
+ENTRY_POINTS = {
+    "src.models": ["-c", "import src.models"],
+    "src.analysis": ["-c", "import src.analysis"],
+    "generate_answers.py --help": ["src/generate_answers.py", "--help"],
+    "judge_answers.py --help": ["src/judge_answers.py", "--help"],
+    "run_prompt.py --help": ["utils/run_prompt.py", "--help"],
+    "regenerate_dubious_answers.py --help": ["utils/regenerate_dubious_answers.py", "--help"],
+    "regenerate_failed_judgments.py --help": ["utils/regenerate_failed_judgments.py", "--help"],
+}
+
+HEAVY_MODULES = ("anthropic", "openai", "google.genai", "pandas", "scipy")
+
+
+def measure(argv: list[str]) -> tuple[float, set[str]]:
+    """Total import time in milliseconds and the set of imported module names for one interpreter start."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *argv],
+        cwd=PROJECT_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(argv)} exited with {result.returncode}:\n{result.stderr[-2000:]}")
+
+    total_us = 0
+    modules = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        modules.add(name.strip())
+        # Top-level imports are not indented; their cumulative times add up to the whole import phase.
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+    return total_us / 1000, modules
+
+
+def best_of(argv: list[str], repeats: int) -> tuple[float, set[str]]:
+    runs = [measure(argv) for _ in range(repeats)]
+    return min(ms for ms, _ in runs), runs[0][1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure CLI import time and catch eager heavy imports")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per entry point; the fastest is kept")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if any entry point imports slower")
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'entry point':42} {'import ms':>10}  heavy modules loaded")
+    print("-" * 80)
+    for name, argv in ENTRY_POINTS.items():
+        ms, modules = best_of(argv, args.repeats)
+        heavy = [module for module in HEAVY_MODULES if module in modules]
+        print(f"{name:42} {ms:10.1f}  {', '.join(heavy) or '-'}")
+        if heavy:
+            failures.append(f"{name} imports {', '.join(heavy)} at startup")
+        if args.max_ms is not None and ms > args.max_ms:
+            failures.append(f"{name} took {ms:.1f} ms (limit {args.max_ms:.1f} ms)")
+
+    eager_ms, _ = best_of(["-c", "import " + ", ".join(HEAVY_MODULES) + ", scipy.stats"], args.repeats)
+    print("-" * 80)
+    print(f"{'eager heavy imports (avoided per start)':42} {eager_ms:10.1f}")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  ✗ {failure}")
+        sys.exit(1)
+    print("\n✓ No entry point imports heavy dependencies at startup")
+
+
+if __name__ == "__main__":
+    main()
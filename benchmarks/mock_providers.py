@@ -0,0 +1,395 @@
+"""
+Offline stand-in for the Anthropic, OpenAI / OpenRouter and Gemini HTTP APIs.
+
+One server answers every vendor's route. It returns enough of each response format for the official SDKs
+used by `src/models.py` to parse it:
+
+  POST /v1/messages                             Anthropic Messages (plain and structured output)
+  POST /v1/chat/completions, /api/v1/...        OpenAI / OpenRouter chat completions
+  POST /v1/responses                            OpenAI Responses (used for native structured output)
+  POST /v1beta/models/{model}:generateContent   Gemini
+  GET  /stats                                   request / error counters
+
+Structured requests get a random JSON instance of the schema they sent, so judging round-trips through
+`JudgmentSchema`. Latency is lognormal around `latency_median` plus output tokens / `tokens_per_second`.
+Errors are injected with the given probabilities: 429 with Retry-After, 500, and truncated JSON bodies
+returned with a 200 status. With `reply`, every plain completion is that fixed text instead, like a model
+following a short instruction.
+
+Point the wrappers at it with a `base_urls` section in the config (see `MockProviderServer.base_urls`):
+
+    python benchmarks/mock_providers.py --port 8765 --latency-median 0.2 --rate-429 0.02
+"""
+
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+FILLER_WORDS = ("the", "model", "answer", "considers", "each", "step", "carefully", "and", "explains", "why")
+
+
+def sample_from_schema(schema: dict[str, Any], rng: random.Random, defs: dict[str, Any] = None) -> Any:
+    """Random instance of a (pydantic-generated) JSON schema."""
+    defs = defs if defs is not None else schema.get("$defs", {})
+    if "$ref" in schema:
+        return sample_from_schema(defs[schema["$ref"].split("/")[-1]], rng, defs)
+    if "anyOf" in schema:
+        return sample_from_schema(schema["anyOf"][0], rng, defs)
+    if "enum" in schema:
+        return rng.choice(schema["enum"])
+
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: sample_from_schema(prop, rng, defs) for name, prop in schema.get("properties", {}).items()}
+    if kind == "array":
+        items = schema.get("items", {})
+        items = defs[items["$ref"].split("/")[-1]] if "$ref" in items else items
+        if "enum" in items:
+            # Enumerated items (e.g. ranking labels) come back as a permutation, as a judge would return them.
+            values = list(items["enum"])
+            rng.shuffle(values)
+            return values[: schema.get("maxItems", len(values))]
+        length = rng.randint(schema.get("minItems", 1), schema.get("maxItems", max(3, schema.get("minItems", 1))))
+        return [sample_from_schema(items, rng, defs) for _ in range(length)]
+    if kind == "integer":
+        return rng.randint(int(schema.get("minimum", 0)), int(schema.get("maximum", 10)))
+    if kind == "number":
+        return rng.uniform(schema.get("minimum", 0.0), schema.get("maximum", 1.0))
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return " ".join(rng.choice(FILLER_WORDS) for _ in range(12))
+
+
+def _text_of(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return " ".join(_text_of(part) for part in content)
+    if isinstance(content, dict):
+        return _text_of(content.get("text") or content.get("content") or content.get("parts") or "")
+    return ""
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class MockProviderServer:
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_median: float = 0.05,
+        latency_sigma: float = 0.5,
+        tokens_per_second: float = None,
+        output_tokens: int = 300,
+        rate_429: float = 0.0,
+        rate_500: float = 0.0,
+        rate_malformed: float = 0.0,
+        seed: int = None,
+        reply: str = None,
+    ):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.rate_429 = rate_429
+        self.rate_500 = rate_500
+        self.rate_malformed = rate_malformed
+        self.reply = reply
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.stats: dict[str, int] = {}
+
+        server = self
+
+        class Handler(MockProviderHandler):
+            provider = server
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def base_urls(self) -> dict[str, str]:
+        """Value for the config's `base_urls` section."""
+        return {
+            "anthropic": self.url,
+            "openai": f"{self.url}/v1",
+            "openrouter": f"{self.url}/api/v1",
+            "google": self.url,
+        }
+
+    def count(self, key: str) -> None:
+        with self._stats_lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def draw(self) -> tuple[float, float, int, random.Random]:
+        # One locked draw per request: error selector, latency, output length and a seed for the payload.
+        with self._rng_lock:
+            selector = self._rng.random()
+            latency = self.latency_median * math.exp(self.latency_sigma * self._rng.gauss(0, 1))
+            tokens = max(1, int(self._rng.expovariate(1 / self.output_tokens)))
+            payload_rng = random.Random(self._rng.getrandbits(64))
+        return selector, latency, tokens, payload_rng
+
+    def start(self) -> "MockProviderServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "MockProviderServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+class MockProviderHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    provider: MockProviderServer = None
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: bytes, headers: dict[str, str] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        if self.path.rstrip("/") == "/stats":
+            with self.provider._stats_lock:
+                self._send(200, json.dumps(self.provider.stats).encode())
+        else:
+            self._send(404, b'{"error": "not found"}')
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.split("?")[0]
+
+        if path.endswith("/messages"):
+            route, builder = "anthropic", self._anthropic
+        elif path.endswith("/chat/completions"):
+            route, builder = "chat", self._chat
+        elif path.endswith("/responses"):
+            route, builder = "responses", self._responses
+        elif path.endswith(":generateContent"):
+            route, builder = "gemini", self._gemini
+        else:
+            self._send(404, b'{"error": "unknown route"}')
+            return
+
+        provider = self.provider
+        selector, latency, tokens, rng = provider.draw()
+        provider.count(f"{route}.requests")
+
+        if selector < provider.rate_429:
+            provider.count(f"{route}.429")
+            time.sleep(latency / 4)
+            error = {"error": {"type": "rate_limit_error", "code": 429, "message": "Mock rate limit"}}
+            self._send(429, json.dumps(error).encode(), {"Retry-After": "0"})
+            return
+        if selector < provider.rate_429 + provider.rate_500:
+            provider.count(f"{route}.500")
+            time.sleep(latency / 4)
+            error = {"error": {"type": "api_error", "code": 500, "message": "Mock internal error"}}
+            self._send(500, json.dumps(error).encode())
+            return
+
+        payload = builder(body, path, tokens, rng)
+        if provider.tokens_per_second:
+            latency += payload["_output_tokens"] / provider.tokens_per_second
+        payload.pop("_output_tokens")
+        time.sleep(latency)
+
+        data = json.dumps(payload).encode()
+        if selector < provider.rate_429 + provider.rate_500 + provider.rate_malformed:
+            provider.count(f"{route}.malformed")
+            data = data[: len(data) // 2]
+        self._send(200, data)
+
+    def _completion(
+        self, schema: dict[str, Any], max_tokens: int, tokens: int, rng: random.Random
+    ) -> tuple[str, int, bool]:
+        if schema:
+            text = json.dumps(sample_from_schema(schema, rng))
+            return text, estimate_tokens(text), False
+        if self.provider.reply is not None:
+            return self.provider.reply, estimate_tokens(self.provider.reply), False
+        truncated = max_tokens is not None and tokens > max_tokens
+        tokens = min(tokens, max_tokens) if max_tokens else tokens
+        return " ".join(rng.choice(FILLER_WORDS) for _ in range(tokens)), tokens, truncated
+
+    def _anthropic(self, body: dict, path: str, tokens: int, rng: random.Random) -> dict:
+        output_format = body.get("output_format") or body.get("output_config", {}).get("format") or {}
+        text, out_tokens, truncated = self._completion(output_format.get("schema"), body.get("max_tokens"), tokens, rng)
+        prompt = _text_of(body.get("system", "")) + _text_of(body.get("messages", []))
+        return {
+            "id": f"msg_mock_{rng.getrandbits(48):012x}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "max_tokens" if truncated else "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": estimate_tokens(prompt),
+                "output_tokens": out_tokens,
+                "cache_creation_input_tokens": 0,
+                "cache_read_input_tokens": 0,
+            },
+            "_output_tokens": out_tokens,
+        }
+
+    def _chat(self, body: dict, path: str, tokens: int, rng: random.Random) -> dict:
+        schema = (body.get("response_format") or {}).get("json_schema", {}).get("schema")
+        max_tokens = body.get("max_completion_tokens") or body.get("max_tokens")
+        choices, total_out = [], 0
+        for index in range(body.get("n") or 1):
+            text, out_tokens, truncated = self._completion(schema, max_tokens, tokens, rng)
+            total_out += out_tokens
+            choices.append(
+                {
+                    "index": index,
+                    "message": {"role": "assistant", "content": text, "refusal": None},
+                    "finish_reason": "length" if truncated else "stop",
+                    "logprobs": None,
+                }
+            )
+        prompt_tokens = estimate_tokens(_text_of(body.get("messages", [])))
+        return {
+            "id": f"chatcmpl-mock{rng.getrandbits(48):012x}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": choices,
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": total_out,
+                "total_tokens": prompt_tokens + total_out,
+                "prompt_tokens_details": {"cached_tokens": 0},
+                "completion_tokens_details": {"reasoning_tokens": 0},
+            },
+            "_output_tokens": total_out,
+        }
+
+    def _responses(self, body: dict, path: str, tokens: int, rng: random.Random) -> dict:
+        schema = (body.get("text") or {}).get("format", {}).get("schema")
+        text, out_tokens, truncated = self._completion(schema, body.get("max_output_tokens"), tokens, rng)
+        input_tokens = estimate_tokens(_text_of(body.get("instructions", "")) + _text_of(body.get("input", "")))
+        return {
+            "id": f"resp_mock{rng.getrandbits(48):012x}",
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": "incomplete" if truncated else "completed",
+            "incomplete_details": {"reason": "max_output_tokens"} if truncated else None,
+            "model": body.get("model"),
+            "output": [
+                {
+                    "type": "message",
+                    "id": f"msg_mock{rng.getrandbits(48):012x}",
+                    "status": "completed",
+                    "role": "assistant",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}],
+                }
+            ],
+            "parallel_tool_calls": True,
+            "tool_choice": "auto",
+            "tools": [],
+            "usage": {
+                "input_tokens": input_tokens,
+                "output_tokens": out_tokens,
+                "total_tokens": input_tokens + out_tokens,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens_details": {"reasoning_tokens": 0},
+            },
+            "_output_tokens": out_tokens,
+        }
+
+    def _gemini(self, body: dict, path: str, tokens: int, rng: random.Random) -> dict:
+        generation = body.get("generationConfig") or {}
+        schema = generation.get("responseJsonSchema") or generation.get("responseSchema")
+        text, out_tokens, truncated = self._completion(schema, generation.get("maxOutputTokens"), tokens, rng)
+        prompt_tokens = estimate_tokens(_text_of(body.get("systemInstruction", "")) + _text_of(body.get("contents")))
+        return {
+            "candidates": [
+                {
+                    "content": {"parts": [{"text": text}], "role": "model"},
+                    "finishReason": "MAX_TOKENS" if truncated else "STOP",
+                    "index": 0,
+                }
+            ],
+            "usageMetadata": {
+                "promptTokenCount": prompt_tokens,
+                "candidatesTokenCount": out_tokens,
+                "totalTokenCount": prompt_tokens + out_tokens,
+                "thoughtsTokenCount": 0,
+            },
+            "modelVersion": path.rsplit("/", 1)[-1].split(":")[0],
+            "_output_tokens": out_tokens,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline mock provider server")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-median", type=float, default=0.05, help="Median latency in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="Lognormal sigma of the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="Output token rate (default: inf)")
+    parser.add_argument("--output-tokens", type=int, default=300, help="Mean output tokens per plain completion")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    parser.add_argument("--rate-malformed", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--reply", type=str, default=None, help="Fixed text of every plain completion")
+    args = parser.parse_args()
+
+    server = MockProviderServer(
+        host=args.host,
+        port=args.port,
+        latency_median=args.latency_median,
+        latency_sigma=args.latency_sigma,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        rate_429=args.rate_429,
+        rate_500=args.rate_500,
+        rate_malformed=args.rate_malformed,
+        seed=args.seed,
+        reply=args.reply,
+    )
+    print(f"Mock providers listening on {server.url}")
+    print("Add to config.yaml:\nbase_urls:")
+    for provider, url in server.base_urls.items():
+        print(f"  {provider}: \"{url}\"")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Regression check for the preflight probes against the real wrappers of a shipped config.
+
+Every model of the config is built by `ModelFactory`, so each probe goes through its actual wrapper and SDK,
+pointed at an in-process mock server that answers every plain completion with `PROBE_REPLY`, the way a model
+following the probe prompt would. Any model not reported ok, e.g. because a wrapper rejects the reply as too
+short, fails the check.
+
+    python benchmarks/preflight_check.py
+    python benchmarks/preflight_check.py --config experiments/exp2_mt_bench/config.yaml
+"""
+
+import argparse
+import copy
+import sys
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from benchmarks.mock_providers import MockProviderServer
+from src.judge_answers import resolve_judges
+from src.models import ModelFactory
+from src.preflight import OK, PROBE_REPLY, preflight_report, probe_models, probe_status
+from src.utils import load_config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Probe every model of a config through its real wrapper")
+    parser.add_argument("--config", type=str, default="experiments/exp1_blind_judge/config.yaml")
+    parser.add_argument("--reply", type=str, default=PROBE_REPLY, help="Text the mock models reply with")
+    args = parser.parse_args()
+
+    config = copy.deepcopy(load_config(str(PROJECT_ROOT / args.config)))
+    config["api_keys"] = {"anthropic": "mock", "openrouter": "mock", "google": "mock", "openai": "mock"}
+
+    with MockProviderServer(latency_median=0.01, latency_sigma=0.0, reply=args.reply, seed=0) as server:
+        config["base_urls"] = server.base_urls
+        factory = ModelFactory(config)
+        models = factory.get_all_models()
+        judges = set(resolve_judges(config))
+        results = probe_models(models, judges)
+
+    print(preflight_report(results, judges))
+    failed = [key for key, result in results.items() if probe_status(result, key in judges) != OK]
+    if failed:
+        print(f"\n✗ Probes failed through the real wrappers for: {', '.join(failed)}")
+        sys.exit(1)
+    print(f"\n✓ All {len(results)} model(s) passed the probes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Throughput benchmark for `generate_all_answers` and `judge_all_answers` against the offline mock providers.
+
+The mock server runs in its own process. Each (stage, worker count) case also runs in a fresh process, so
+peak RSS belongs to that case alone. Reported per case: calls/sec, client-side p50/p99 call latency, error
+count and peak RSS. Judging is measured on synthetic answers, so it does not depend on generation results.
+
+    python benchmarks/throughput.py --prompts 50 --workers 1 4 16
+    python benchmarks/throughput.py --latency-median 0.2 --rate-429 0.02 --output bench.json
+"""
+
+import argparse
+import copy
+import json
+import multiprocessing
+import resource
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parents[1]
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.utils import load_config
+
+CATEGORIES = ("reasoning", "coding", "writing", "math")
+
+
+def synthetic_prompts(n: int) -> list[dict[str, str]]:
+    return [
+        {
+            "id": f"bench_{i:04d}",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "text": f"Benchmark question {i}: explain the trade-offs of approach {i % 7} in a few paragraphs.",
+        }
+        for i in range(n)
+    ]
+
+
+def synthetic_answers(prompts: list[dict[str, str]], config: dict) -> list[dict[str, str]]:
+    answers = []
+    for prompt in prompts:
+        for vendor, tiers in config["models"].items():
+            for tier, model_name in tiers.items():
+                answers.append(
+                    {
+                        "answer_id": f"ans_{prompt['id']}_{vendor}_{tier}",
+                        "prompt_id": prompt["id"],
+                        "category": prompt["category"],
+                        "model_vendor": vendor,
+                        "model_tier": tier,
+                        "model_name": model_name,
+                        "prompt_text": prompt["text"],
+                        "answer_text": "A synthetic benchmark answer. " * 40,
+                    }
+                )
+    return answers
+
+
+def _time_calls(model, durations: list[float]):
+    generate = model.generate
+
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return generate(*args, **kwargs)
+        finally:
+            durations.append(time.perf_counter() - start)
+
+    model.generate = timed
+    return model
+
+
+def run_case(stage: str, workers: int, n_prompts: int, config: dict) -> dict:
+    """Runs in a fresh process; returns the measurements for one (stage, workers) case."""
+    from src.models import ModelFactory
+    from src.generate_answers import generate_all_answers
+    from src.judge_answers import judge_all_answers, resolve_judges
+
+    durations: list[float] = []
+    factory = ModelFactory(config)
+    # Time every wrapper call the stage makes, whichever way the factory is asked for models.
+    get_model = factory.get_model
+    factory.get_model = lambda *args, **kwargs: _time_calls(get_model(*args, **kwargs), durations)
+
+    prompts = synthetic_prompts(n_prompts)
+    start = time.perf_counter()
+    if stage == "generate":
+        results = generate_all_answers(prompts, factory, verbose=False, max_workers=workers, retries=1)
+    else:
+        results = judge_all_answers(
+            synthetic_answers(prompts, config),
+            factory,
+            config,
+            resolve_judges(config),
+            verbose=False,
+            max_workers=workers,
+            retries=1,
+        )
+    elapsed = time.perf_counter() - start
+
+    durations.sort()
+    return {
+        "stage": stage,
+        "workers": workers,
+        "results": len(results),
+        "errors": sum(1 for r in results if "error" in r),
+        "seconds": elapsed,
+        "per_second": len(results) / elapsed if elapsed > 0 else 0.0,
+        "p50_ms": durations[len(durations) // 2] * 1000 if durations else None,
+        "p99_ms": durations[min(len(durations) - 1, int(len(durations) * 0.99))] * 1000 if durations else None,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_mock_server(args: argparse.Namespace) -> tuple[subprocess.Popen, str]:
+    port = _free_port()
+    command = [
+        sys.executable,
+        str(PROJECT_ROOT / "benchmarks" / "mock_providers.py"),
+        "--port", str(port),
+        "--latency-median", str(args.latency_median),
+        "--latency-sigma", str(args.latency_sigma),
+        "--output-tokens", str(args.output_tokens),
+        "--rate-429", str(args.rate_429),
+        "--rate-500", str(args.rate_500),
+        "--rate-malformed", str(args.rate_malformed),
+    ]  # fmt: skip
+    if args.tokens_per_second:
+        command += ["--tokens-per-second", str(args.tokens_per_second)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{url}/stats", timeout=1)
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("Mock provider server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generation and judging against mock providers")
+    parser.add_argument("--config", type=str, default="experiments/exp1_blind_judge/config.yaml")
+    parser.add_argument("--prompts", type=int, default=30, help="Number of synthetic prompts per case")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--stages", type=str, nargs="+", default=["generate", "judge"], choices=["generate", "judge"])
+    parser.add_argument("--latency-median", type=float, default=0.05)
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--tokens-per-second", type=float, default=None)
+    parser.add_argument("--output-tokens", type=int, default=300)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    parser.add_argument("--rate-malformed", type=float, default=0.0)
+    parser.add_argument("--output", type=str, default=None, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    config = copy.deepcopy(load_config(str(PROJECT_ROOT / args.config)))
+    config["api_keys"] = {"anthropic": "mock", "openrouter": "mock", "google": "mock", "openai": "mock"}
+
+    process, url = start_mock_server(args)
+    config["base_urls"] = {
+        "anthropic": url,
+        "openai": f"{url}/v1",
+        "openrouter": f"{url}/api/v1",
+        "google": url,
+    }
+
+    rows = []
+    context = multiprocessing.get_context("spawn")
+    try:
+        for stage in args.stages:
+            for workers in args.workers:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    row = executor.submit(run_case, stage, workers, args.prompts, config).result()
+                rows.append(row)
+                p50 = f"{row['p50_ms']:.1f}" if row["p50_ms"] is not None else "-"
+                p99 = f"{row['p99_ms']:.1f}" if row["p99_ms"] is not None else "-"
+                print(
+                    f"{stage:9} workers={workers:<3} {row['per_second']:8.1f}/s  p50 {p50:>7} ms  "
+                    f"p99 {p99:>7} ms  errors {row['errors']:<4} peak RSS {row['peak_rss_mb']:.0f} MB"
+                )
+        with urllib.request.urlopen(f"{url}/stats") as response:
+            server_stats = json.load(response)
+    finally:
+        process.terminate()
+        process.wait()
+
+    print(f"\nMock server counters: {server_stats}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"args": vars(args), "results": rows, "server": server_stats}, f, indent=2)
+        print(f"✓ Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
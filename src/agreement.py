@@ -0,0 +1,249 @@
+"""
+Inter-judge agreement on a (prompts x judges x answers) tensor.
+
+Answers are identified across judges by their `model_vendor`/`model_tier` slot, so the same answer lines up
+in every judge's ranking of a prompt. Missing judgments and answers left out of a partial ranking are NaN
+and are excluded pairwise:
+
+- Kendall tau-b: over answer pairs that both judges ranked, with ties handled by the tau-b denominator.
+- Spearman: Pearson correlation of the ranks over the answers both judges ranked (the usual Spearman
+  coefficient for complete, untied rankings).
+- Krippendorff's alpha: units are (prompt, answer) cells and coders are judges. Interval, ordinal and
+  nominal metrics are supported. Sufficient statistics are collected per prompt, so pooled alphas for any
+  grouping of prompts (e.g. category) are exact, not averages of per-prompt alphas.
+"""
+
+import warnings
+
+import numpy as np
+import pandas as pd
+
+
+def build_rank_tensor(df: pd.DataFrame, value: str = "rank") -> dict:
+    prompt_codes, prompt_ids = pd.factorize(df["prompt_id"])
+    judge_codes, judges = pd.factorize(df["judge"], sort=True)
+    vendor_codes, vendors = pd.factorize(df["model_vendor"], sort=True)
+    tier_codes, tiers = pd.factorize(df["model_tier"], sort=True)
+    slot_codes, answer_codes = np.unique(vendor_codes * len(tiers) + tier_codes, return_inverse=True)
+    answers = [f"{vendors[c // len(tiers)]}_{tiers[c % len(tiers)]}" for c in slot_codes]
+
+    tensor = np.full((len(prompt_ids), len(judges), len(answers)), np.nan)
+    tensor[prompt_codes, judge_codes, answer_codes] = df[value].to_numpy(dtype=np.float64)
+
+    categories = np.empty(len(prompt_ids), dtype=object)
+    categories[prompt_codes] = df["category"].to_numpy()
+    return {
+        "tensor": tensor,
+        "prompt_ids": list(prompt_ids),
+        "judges": list(judges),
+        "answers": list(answers),
+        "categories": categories,
+    }
+
+
+def _nan_divide(num: np.ndarray, den: np.ndarray) -> np.ndarray:
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = num / den
+    out[~np.isfinite(out)] = np.nan
+    return out
+
+
+def pairwise_kendall_tau(tensor: np.ndarray) -> np.ndarray:
+    """Per-prompt Kendall tau-b between every pair of judges, shape (prompts x judges x judges)."""
+    n_answers = tensor.shape[-1]
+    i, k = np.triu_indices(n_answers, k=1)
+    diff = tensor[..., i] - tensor[..., k]
+    valid = (~np.isnan(diff)).astype(np.float64)
+    sign = np.sign(np.nan_to_num(diff))
+    untied = np.abs(sign)
+
+    concordance = np.einsum("pjm,pkm->pjk", sign, sign)
+    # Untied pairs of judge j counted only over pairs that judge k ranked as well (and vice versa).
+    untied_j = np.einsum("pjm,pkm->pjk", untied, valid)
+    untied_k = np.swapaxes(untied_j, 1, 2)
+    return _nan_divide(concordance, np.sqrt(untied_j * untied_k))
+
+
+def pairwise_spearman(tensor: np.ndarray) -> np.ndarray:
+    """Per-prompt rank correlation between every pair of judges, shape (prompts x judges x judges)."""
+    mask = (~np.isnan(tensor)).astype(np.float64)
+    x = np.nan_to_num(tensor)
+
+    n = np.einsum("pja,pka->pjk", mask, mask)
+    sum_j = np.einsum("pja,pka->pjk", x, mask)
+    sum_k = np.swapaxes(sum_j, 1, 2)
+    sum_sq_j = np.einsum("pja,pka->pjk", x * x, mask)
+    sum_sq_k = np.swapaxes(sum_sq_j, 1, 2)
+    sum_jk = np.einsum("pja,pka->pjk", x, x)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sum_jk - sum_j * sum_k / n
+        var_j = sum_sq_j - sum_j**2 / n
+        var_k = sum_sq_k - sum_k**2 / n
+    return _nan_divide(cov, np.sqrt(var_j * var_k))
+
+
+def _alpha_statistics(tensor: np.ndarray, level: str) -> dict:
+    # Per-prompt sufficient statistics; units are (prompt, answer) cells with at least two values.
+    mask = ~np.isnan(tensor)
+    counts = mask.sum(axis=1)
+    pairable = counts >= 2
+    weight = np.where(pairable, 1.0 / np.maximum(counts - 1, 1), 0.0)
+    x = np.where(mask & pairable[:, None, :], tensor, 0.0)
+
+    if level == "interval":
+        unit_sum = x.sum(axis=1)
+        unit_sum_sq = (x * x).sum(axis=1)
+        m = np.where(pairable, counts, 0)
+        observed = (2 * weight * (m * unit_sum_sq - unit_sum**2)).sum(axis=1)
+        return {
+            "observed": observed,
+            "n": m.sum(axis=1),
+            "sum": unit_sum.sum(axis=1),
+            "sum_sq": unit_sum_sq.sum(axis=1),
+        }
+
+    if level not in ("ordinal", "nominal"):
+        raise ValueError(f"Unknown alpha level: {level}")
+
+    values = tensor[mask]
+    if not np.allclose(values, np.round(values)):
+        raise ValueError(f"{level} alpha requires integer-valued ratings")
+    offset = int(values.min()) if values.size else 0
+    n_values = int(values.max()) - offset + 1 if values.size else 1
+
+    # Value histogram per unit, then the coincidence matrix per prompt: sum_u (N_u^T N_u - diag N_u) / (m_u - 1)
+    n_p, _, n_a = tensor.shape
+    codes = np.where(mask, tensor - offset, 0).astype(np.int64)
+    cell = (np.arange(n_p)[:, None, None] * n_a + np.arange(n_a)[None, None, :]) * n_values + codes
+    hist = np.bincount(
+        cell[mask & pairable[:, None, :]], minlength=n_p * n_a * n_values
+    ).reshape(n_p, n_a, n_values).astype(np.float64)
+    coincidence = np.einsum("pav,paw->pvw", hist * weight[..., None], hist)
+    diagonal = (hist * weight[..., None]).sum(axis=1)
+    coincidence[:, np.arange(n_values), np.arange(n_values)] -= diagonal
+    return {"coincidence": coincidence}
+
+
+def _alpha_from_statistics(stats: dict, level: str) -> np.ndarray:
+    # Every statistic carries a leading group axis; returns one alpha per group.
+    if level == "interval":
+        n = stats["n"].astype(np.float64)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            expected = 2 * (n * stats["sum_sq"] - stats["sum"] ** 2) / (n * (n - 1))
+            alpha = 1 - (stats["observed"] / n) / expected
+        alpha[(n < 2) | ~(expected > 0)] = np.nan
+        return alpha
+
+    coincidence = stats["coincidence"]
+    marginals = coincidence.sum(axis=2)
+    n = marginals.sum(axis=1)
+    n_values = marginals.shape[1]
+    if level == "nominal":
+        delta = np.broadcast_to(1.0 - np.eye(n_values), coincidence.shape)
+    else:
+        cumulative = np.concatenate([np.zeros((len(n), 1)), np.cumsum(marginals, axis=1)], axis=1)
+        lo = np.minimum.outer(np.arange(n_values), np.arange(n_values))
+        hi = np.maximum.outer(np.arange(n_values), np.arange(n_values))
+        delta = (cumulative[:, hi + 1] - cumulative[:, lo] - (marginals[:, lo] + marginals[:, hi]) / 2) ** 2
+    observed = (coincidence * delta).sum(axis=(1, 2))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        expected = np.einsum("gv,gw,gvw->g", marginals, marginals, delta) / (n - 1)
+        alpha = 1 - observed / expected
+    alpha[(n < 2) | ~(expected > 0)] = np.nan
+    return alpha
+
+
+def krippendorff_alpha(tensor: np.ndarray, level: str = "ordinal", groups: np.ndarray = None) -> float | np.ndarray:
+    """
+    Krippendorff's alpha over all prompts, or one pooled alpha per group when `groups` assigns a group code
+    (0..G-1) to each prompt. Pass `groups=np.arange(n_prompts)` for per-prompt alphas.
+    """
+    stats = _alpha_statistics(tensor, level)
+    if groups is None:
+        return float(_alpha_from_statistics({k: v.sum(axis=0)[None] for k, v in stats.items()}, level)[0])
+
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+    pooled = {}
+    for name, per_prompt in stats.items():
+        summed = np.zeros((n_groups,) + per_prompt.shape[1:])
+        np.add.at(summed, groups, per_prompt)
+        pooled[name] = summed
+    return _alpha_from_statistics(pooled, level)
+
+
+def _mean_offdiagonal(per_prompt: np.ndarray) -> np.ndarray:
+    n_judges = per_prompt.shape[-1]
+    off = ~np.eye(n_judges, dtype=bool)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmean(per_prompt[:, off], axis=1)
+
+
+def compute_agreement(df: pd.DataFrame, value: str = "rank", level: str = "ordinal") -> dict:
+    """
+    Inter-judge agreement tables from a frame produced by `load_and_merge_data`.
+
+    Returns pairwise judge tables (mean over prompts), per-prompt and per-category summaries and overall values.
+    """
+    t = build_rank_tensor(df, value=value)
+    tensor = t["tensor"]
+    tau = pairwise_kendall_tau(tensor)
+    rho = pairwise_spearman(tensor)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        pair_tau = np.nanmean(tau, axis=0)
+        pair_rho = np.nanmean(rho, axis=0)
+    pair_counts = (~np.isnan(tau)).sum(axis=0)
+
+    judges = t["judges"]
+    pairwise_rows = [
+        {
+            "judge_a": judges[a],
+            "judge_b": judges[b],
+            "kendall_tau": pair_tau[a, b],
+            "spearman": pair_rho[a, b],
+            "n_prompts": int(pair_counts[a, b]),
+        }
+        for a in range(len(judges))
+        for b in range(a + 1, len(judges))
+    ]
+
+    prompt_tau = _mean_offdiagonal(tau)
+    prompt_rho = _mean_offdiagonal(rho)
+    prompt_alpha = krippendorff_alpha(tensor, level=level, groups=np.arange(len(t["prompt_ids"])))
+    per_prompt = pd.DataFrame(
+        {
+            "prompt_id": t["prompt_ids"],
+            "category": t["categories"],
+            "mean_kendall_tau": prompt_tau,
+            "mean_spearman": prompt_rho,
+            "alpha": prompt_alpha,
+        }
+    )
+
+    category_codes, categories = pd.factorize(t["categories"], sort=True)
+    category_alpha = krippendorff_alpha(tensor, level=level, groups=category_codes)
+    per_category = (
+        per_prompt.groupby("category", sort=True)
+        .agg(
+            mean_kendall_tau=("mean_kendall_tau", "mean"),
+            mean_spearman=("mean_spearman", "mean"),
+            n_prompts=("prompt_id", "size"),
+        )
+        .reset_index()
+    )
+    per_category["alpha"] = per_category["category"].map(dict(zip(categories, category_alpha)))
+
+    return {
+        "pairwise": pd.DataFrame(pairwise_rows),
+        "per_prompt": per_prompt,
+        "per_category": per_category,
+        "overall": {
+            "mean_kendall_tau": float(np.nanmean(prompt_tau)) if np.isfinite(prompt_tau).any() else np.nan,
+            "mean_spearman": float(np.nanmean(prompt_rho)) if np.isfinite(prompt_rho).any() else np.nan,
+            "alpha": krippendorff_alpha(tensor, level=level),
+            "level": level,
+        },
+    }
@@ -1,17 +1,47 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
 import numpy as np
-import pandas as pd
-from scipy import stats
 
+CURRENT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = CURRENT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
 
-def load_and_merge_data(answers_path: str, judgments_path: str) -> pd.DataFrame:
-    import json
+from src.resampling import bootstrap_ratios, percentile_interval, permutation_test_self_bias
+from src.utils import lazy_import
 
-    with open(answers_path, "r") as f:
-        answers = json.load(f)
+# pandas and scipy are imported on first use, so importing this module for its helpers stays cheap.
+pd = lazy_import("pandas")
+stats = lazy_import("scipy.stats")
 
-    with open(judgments_path, "r") as f:
-        judgments = json.load(f)
+VENDORS = ["claude", "gpt", "gemini"]
+
+
+MERGED_COLUMNS = [
+    "prompt_id",
+    "category",
+    "answer_id",
+    "model_vendor",
+    "model_tier",
+    "judge",
+    "rank",
+    "score",
+    "is_top_ranked",
+]
+
+
+def build_answer_index(answers: list[dict]) -> pd.DataFrame:
+    index = pd.DataFrame(
+        [(a["answer_id"], a["category"], a["model_vendor"], a["model_tier"]) for a in answers],
+        columns=["answer_id", "category", "model_vendor", "model_tier"],
+    )
+    return index.drop_duplicates("answer_id", keep="first")
 
+
+def parse_judgment_rows(judgments: list[dict]) -> pd.DataFrame:
     rows = []
     for judgment in judgments:
         if "error" in judgment:
@@ -19,37 +49,187 @@ def load_and_merge_data(answers_path: str, judgments_path: str) -> pd.DataFrame:
 
         prompt_id = judgment["prompt_id"]
         judge = judgment["judge_model"]
-        ranking = judgment["ranking"]
         scores = judgment["scores"]
         mapping = judgment["mapping"]
 
-        for rank_idx, label in enumerate(ranking):
-            answer_id = mapping[label]
-            score = scores[label]
-
-            answer = next((a for a in answers if a["answer_id"] == answer_id), None)
-            if answer is None:
-                continue
-
-            rows.append(
-                {
-                    "prompt_id": prompt_id,
-                    "category": answer["category"],
-                    "answer_id": answer_id,
-                    "model_vendor": answer["model_vendor"],
-                    "model_tier": answer["model_tier"],
-                    "judge": judge,
-                    "rank": rank_idx + 1,
-                    "score": score,
-                    "is_top_ranked": rank_idx == 0,
-                }
+        for rank_idx, label in enumerate(judgment["ranking"]):
+            rows.append((prompt_id, mapping[label], judge, rank_idx + 1, scores[label], rank_idx == 0))
+
+    return pd.DataFrame(rows, columns=["prompt_id", "answer_id", "judge", "rank", "score", "is_top_ranked"])
+
+
+def merge_judgments_with_answers(judgment_rows: pd.DataFrame, answer_index: pd.DataFrame) -> pd.DataFrame:
+    # Inner join keeps the judgment row order and drops rows whose answer is unknown.
+    return judgment_rows.merge(answer_index, on="answer_id", how="inner", sort=False)[MERGED_COLUMNS]
+
+
+def load_and_merge_data(answers_path: str, judgments_path: str) -> pd.DataFrame:
+    import json
+
+    with open(answers_path, "r") as f:
+        answers = json.load(f)
+
+    with open(judgments_path, "r") as f:
+        judgments = json.load(f)
+
+    return merge_judgments_with_answers(parse_judgment_rows(judgments), build_answer_index(answers))
+
+
+def build_prompt_tensors(df: pd.DataFrame) -> dict:
+    """
+    Aggregate the merged frame into dense per-prompt count/sum arrays for resampling.
+
+    Shapes: top1 (prompts x judges x vendors), judgments (prompts x judges),
+    score_sum / score_count (prompts x judges x vendors x tiers).
+    """
+    prompt_codes, prompt_ids = pd.factorize(df["prompt_id"])
+    judge_codes, judges = pd.factorize(df["judge"])
+    vendors = VENDORS + sorted(set(df["model_vendor"]) - set(VENDORS))
+    vendor_codes = pd.Categorical(df["model_vendor"], categories=vendors).codes
+    tier_codes, tiers = pd.factorize(df["model_tier"], sort=True)
+    n_p, n_j, n_v, n_t = len(prompt_ids), len(judges), len(vendors), len(tiers)
+
+    top_mask = df["is_top_ranked"].to_numpy(dtype=bool)
+    cell = (prompt_codes * n_j + judge_codes) * n_v + vendor_codes
+    top1 = np.bincount(cell[top_mask], minlength=n_p * n_j * n_v).reshape(n_p, n_j, n_v).astype(np.float64)
+
+    score_cell = cell * n_t + tier_codes
+    size = n_p * n_j * n_v * n_t
+    score_sum = np.bincount(score_cell, weights=df["score"].to_numpy(dtype=np.float64), minlength=size)
+    score_count = np.bincount(score_cell, minlength=size).astype(np.float64)
+
+    return {
+        "prompt_ids": list(prompt_ids),
+        "judges": list(judges),
+        "vendors": vendors,
+        "tiers": list(tiers),
+        "top1": top1,
+        "judgments": top1.sum(axis=2),
+        "score_sum": score_sum.reshape(n_p, n_j, n_v, n_t),
+        "score_count": score_count.reshape(n_p, n_j, n_v, n_t),
+    }
+
+
+def bootstrap_bias_metrics(
+    df: pd.DataFrame,
+    target_vendor: str = "gemini",
+    n_resamples: int = 10000,
+    confidence: float = 0.95,
+    seed: int = None,
+    n_jobs: int = 1,
+) -> dict:
+    """
+    Prompt-clustered bootstrap CIs for per-judge top-1 rates, mean scores and the self-bias difference.
+
+    All statistics are computed from the same resamples, so the self-bias CI accounts for the correlation
+    between judges that rated the same prompts.
+    """
+    t = build_prompt_tensors(df)
+    n_p, n_j, n_v = t["top1"].shape
+    n_t = len(t["tiers"])
+
+    numerators = np.concatenate([t["top1"].reshape(n_p, -1), t["score_sum"].reshape(n_p, -1)], axis=1)
+    denominators = np.concatenate(
+        [np.repeat(t["judgments"], n_v, axis=1), t["score_count"].reshape(n_p, -1)], axis=1
+    )
+    samples = bootstrap_ratios(numerators, denominators, n_resamples=n_resamples, seed=seed, n_jobs=n_jobs)
+    top1_samples = samples[:, : n_j * n_v].reshape(-1, n_j, n_v)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        point = numerators.sum(axis=0) / denominators.sum(axis=0)
+    low, high = percentile_interval(samples, confidence)
+
+    top1_rows = []
+    for j, judge in enumerate(t["judges"]):
+        for v, vendor in enumerate(t["vendors"]):
+            k = j * n_v + v
+            top1_rows.append(
+                {"judge": judge, "vendor": vendor, "top1_rate": point[k], "ci_low": low[k], "ci_high": high[k]}
             )
 
-    df = pd.DataFrame(rows)
-    return df
+    score_rows = []
+    offset = n_j * n_v
+    for j, judge in enumerate(t["judges"]):
+        for v, vendor in enumerate(t["vendors"]):
+            for ti, tier in enumerate(t["tiers"]):
+                k = offset + (j * n_v + v) * n_t + ti
+                if denominators[:, k].sum() == 0:
+                    continue
+                score_rows.append(
+                    {
+                        "judge": judge,
+                        "vendor": vendor,
+                        "tier": tier,
+                        "mean_score": point[k],
+                        "ci_low": low[k],
+                        "ci_high": high[k],
+                    }
+                )
+
+    results = {
+        "n_resamples": n_resamples,
+        "confidence": confidence,
+        "top1": pd.DataFrame(top1_rows),
+        "scores": pd.DataFrame(score_rows),
+    }
+
+    target_judge_key = f"{target_vendor}_thinking"
+    if target_judge_key in t["judges"] and target_vendor in t["vendors"] and n_j > 1:
+        j_target = t["judges"].index(target_judge_key)
+        v_target = t["vendors"].index(target_vendor)
+        others = [j for j in range(n_j) if j != j_target]
+        with np.errstate(invalid="ignore"):
+            other_point = np.mean(point[[j * n_v + v_target for j in others]])
+            other_samples = np.nanmean(top1_samples[:, others, v_target], axis=1)
+        diff_samples = top1_samples[:, j_target, v_target] - other_samples
+        diff_low, diff_high = percentile_interval(diff_samples, confidence)
+        results["bias_difference"] = {
+            "target_judge": target_judge_key,
+            "bias_difference": float(point[j_target * n_v + v_target] - other_point),
+            "ci_low": float(diff_low),
+            "ci_high": float(diff_high),
+        }
+
+    return results
 
 
-def calculate_top1_preference(df: pd.DataFrame, judge: str = None) -> pd.DataFrame:
+def _pooled_bootstrap(
+    df: pd.DataFrame, n_resamples: int, confidence: float, seed: int, n_jobs: int
+) -> tuple[dict, dict]:
+    # Pools judges (as the point estimates below do) and returns CIs keyed by vendor and (vendor, tier).
+    t = build_prompt_tensors(df)
+    n_p = len(t["prompt_ids"])
+    top1 = t["top1"].sum(axis=1)
+    judgments = np.repeat(t["judgments"].sum(axis=1, keepdims=True), top1.shape[1], axis=1)
+    score_sum = t["score_sum"].sum(axis=1).reshape(n_p, -1)
+    score_count = t["score_count"].sum(axis=1).reshape(n_p, -1)
+
+    samples = bootstrap_ratios(
+        np.concatenate([top1, score_sum], axis=1),
+        np.concatenate([judgments, score_count], axis=1),
+        n_resamples=n_resamples,
+        seed=seed,
+        n_jobs=n_jobs,
+    )
+    low, high = percentile_interval(samples, confidence)
+    n_v = len(t["vendors"])
+    top1_ci = {vendor: (low[v], high[v]) for v, vendor in enumerate(t["vendors"])}
+    score_ci = {
+        (vendor, tier): (low[n_v + v * len(t["tiers"]) + ti], high[n_v + v * len(t["tiers"]) + ti])
+        for v, vendor in enumerate(t["vendors"])
+        for ti, tier in enumerate(t["tiers"])
+    }
+    return top1_ci, score_ci
+
+
+def calculate_top1_preference(
+    df: pd.DataFrame,
+    judge: str = None,
+    n_bootstrap: int = 0,
+    confidence: float = 0.95,
+    seed: int = None,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
     if judge:
         df = df[df["judge"] == judge]
 
@@ -58,17 +238,30 @@ def calculate_top1_preference(df: pd.DataFrame, judge: str = None) -> pd.DataFra
     total = len(top1)
 
     results = []
-    for vendor in ["claude", "gpt", "gemini"]:
+    for vendor in VENDORS:
         count = vendor_counts.get(vendor, 0)
         percentage = (count / total * 100) if total > 0 else 0
         results.append(
             {"vendor": vendor, "top1_count": count, "top1_percentage": percentage, "total_judgments": total}
         )
 
-    return pd.DataFrame(results)
+    results = pd.DataFrame(results)
+    if n_bootstrap and total > 0:
+        top1_ci, _ = _pooled_bootstrap(df, n_bootstrap, confidence, seed, n_jobs)
+        results["ci_low"] = [top1_ci[v][0] * 100 for v in results["vendor"]]
+        results["ci_high"] = [top1_ci[v][1] * 100 for v in results["vendor"]]
+
+    return results
 
 
-def calculate_average_scores(df: pd.DataFrame, judge: str = None) -> pd.DataFrame:
+def calculate_average_scores(
+    df: pd.DataFrame,
+    judge: str = None,
+    n_bootstrap: int = 0,
+    confidence: float = 0.95,
+    seed: int = None,
+    n_jobs: int = 1,
+) -> pd.DataFrame:
     if judge:
         df = df[df["judge"] == judge]
 
@@ -76,6 +269,12 @@ def calculate_average_scores(df: pd.DataFrame, judge: str = None) -> pd.DataFram
     grouped = grouped.reset_index()
     grouped.columns = ["vendor", "tier", "mean_score", "std_score", "count"]
 
+    if n_bootstrap and len(df) > 0:
+        _, score_ci = _pooled_bootstrap(df, n_bootstrap, confidence, seed, n_jobs)
+        keys = list(zip(grouped["vendor"], grouped["tier"]))
+        grouped["ci_low"] = [score_ci[k][0] for k in keys]
+        grouped["ci_high"] = [score_ci[k][1] for k in keys]
+
     return grouped
 
 
@@ -109,7 +308,17 @@ def calculate_tier_preference(df: pd.DataFrame, judge: str = None) -> pd.DataFra
     return vendor_tier
 
 
-def detect_self_bias(df: pd.DataFrame, target_vendor: str = "gemini") -> dict:
+def detect_self_bias(
+    df: pd.DataFrame,
+    target_vendor: str = "gemini",
+    n_bootstrap: int = 0,
+    confidence: float = 0.95,
+    seed: int = None,
+    n_jobs: int = 1,
+    n_permutations: int = 0,
+    alternative: str = "two-sided",
+    memory_budget_mb: float = 64.0,
+) -> dict:
     results = {}
 
     judges = df["judge"].unique()
@@ -147,10 +356,44 @@ def detect_self_bias(df: pd.DataFrame, target_vendor: str = "gemini") -> dict:
                 "bias_percentage_points": bias_difference * 100,
             }
 
+            if n_bootstrap:
+                boot = bootstrap_bias_metrics(
+                    df, target_vendor, n_resamples=n_bootstrap, confidence=confidence, seed=seed, n_jobs=n_jobs
+                )
+                # Absent when the prompt tensors lack the target judge or vendor, or hold no other judge.
+                if "bias_difference" in boot:
+                    diff = boot["bias_difference"]
+                    results["bias_analysis"]["bootstrap"] = {
+                        "n_resamples": n_bootstrap,
+                        "confidence": confidence,
+                        "bias_difference_ci": (diff["ci_low"], diff["ci_high"]),
+                        "bias_percentage_points_ci": (diff["ci_low"] * 100, diff["ci_high"] * 100),
+                    }
+
+            if n_permutations:
+                t = build_prompt_tensors(df)
+                v_target = t["vendors"].index(target_vendor)
+                results["bias_analysis"]["permutation_test"] = permutation_test_self_bias(
+                    t["top1"][:, :, v_target],
+                    t["judgments"],
+                    target=t["judges"].index(target_judge_key),
+                    n_permutations=n_permutations,
+                    alternative=alternative,
+                    seed=seed,
+                    memory_budget_mb=memory_budget_mb,
+                )
+
     return results
 
 
-def run_statistical_tests(df: pd.DataFrame, target_vendor: str = "gemini") -> dict:
+def run_statistical_tests(
+    df: pd.DataFrame,
+    target_vendor: str = "gemini",
+    n_bootstrap: int = 0,
+    confidence: float = 0.95,
+    seed: int = None,
+    n_jobs: int = 1,
+) -> dict:
     results = {}
 
     target_judge = f"{target_vendor}_thinking"
@@ -161,7 +404,7 @@ def run_statistical_tests(df: pd.DataFrame, target_vendor: str = "gemini") -> di
 
     expected_per_vendor = len(top1) / 3
     expected = [expected_per_vendor] * 3
-    observed = [vendor_counts.get(v, 0) for v in ["claude", "gpt", "gemini"]]
+    observed = [vendor_counts.get(v, 0) for v in VENDORS]
 
     chi2, p_value = stats.chisquare(observed, expected)
 
@@ -171,8 +414,8 @@ def run_statistical_tests(df: pd.DataFrame, target_vendor: str = "gemini") -> di
         "chi2_statistic": float(chi2),
         "p_value": float(p_value),
         "significant_at_0.05": p_value < 0.05,
-        "observed_counts": dict(zip(["claude", "gpt", "gemini"], observed)),
-        "expected_counts": dict(zip(["claude", "gpt", "gemini"], expected)),
+        "observed_counts": dict(zip(VENDORS, observed)),
+        "expected_counts": dict(zip(VENDORS, expected)),
     }
 
     target_count = vendor_counts.get(target_vendor, 0)
@@ -190,10 +433,31 @@ def run_statistical_tests(df: pd.DataFrame, target_vendor: str = "gemini") -> di
         "significant_at_0.05": binom_result.pvalue < 0.05,
     }
 
+    if n_bootstrap and total > 0:
+        # The tests above treat every judgment as independent; resampling whole prompts does not.
+        top1_ci, _ = _pooled_bootstrap(judge_df, n_bootstrap, confidence, seed, n_jobs)
+        ci_low, ci_high = top1_ci[target_vendor]
+        results["cluster_bootstrap"] = {
+            "test": "Prompt-clustered bootstrap CI",
+            "null_hypothesis": f"{target_vendor} ranked #1 at expected rate (1/3)",
+            "observed_rate": target_count / total,
+            "confidence": confidence,
+            "ci_low": float(ci_low),
+            "ci_high": float(ci_high),
+            "n_resamples": n_bootstrap,
+            "excludes_expected_rate": not (ci_low <= expected_prob <= ci_high),
+        }
+
     return results
 
 
-def generate_summary_report(df: pd.DataFrame, target_vendor: str = "gemini") -> str:
+def generate_summary_report(
+    df: pd.DataFrame,
+    target_vendor: str = "gemini",
+    n_permutations: int = 10000,
+    significance_level: float = 0.05,
+    seed: int = None,
+) -> str:
     report = []
     report.append("=" * 70)
     report.append("BIAS EVALUATION SUMMARY REPORT")
@@ -231,7 +495,7 @@ def generate_summary_report(df: pd.DataFrame, target_vendor: str = "gemini") ->
     report.append("SELF-BIAS DETECTION")
     report.append("-" * 70)
 
-    bias_results = detect_self_bias(df, target_vendor)
+    bias_results = detect_self_bias(df, target_vendor, seed=seed, n_permutations=n_permutations)
     if "bias_analysis" in bias_results:
         ba = bias_results["bias_analysis"]
         report.append(
@@ -243,9 +507,19 @@ def generate_summary_report(df: pd.DataFrame, target_vendor: str = "gemini") ->
         )
         report.append(f"\nBias difference: {ba['bias_percentage_points']:+.2f} percentage points")
 
-        if ba["bias_difference"] > 0.1:
+        if "permutation_test" in ba:
+            perm = ba["permutation_test"]
+            report.append(
+                f"Permutation test ({perm['method']}, {perm['n_permutations']} permutations): p = {perm['p_value']:.4f}"
+            )
+            significant = perm["p_value"] < significance_level
+        else:
+            # Without a permutation test fall back to a fixed ±10pp threshold.
+            significant = abs(ba["bias_difference"]) > 0.1
+
+        if significant and ba["bias_difference"] > 0:
             report.append("⚠️  POTENTIAL SELF-BIAS DETECTED")
-        elif ba["bias_difference"] < -0.1:
+        elif significant and ba["bias_difference"] < 0:
             report.append("⚠️  POTENTIAL SELF-PENALTY DETECTED")
         else:
             report.append("✓ No significant self-bias detected")
@@ -0,0 +1,165 @@
+"""
+On-disk memoization for the analysis layer, keyed by content hashes of the input files.
+
+Each intermediate has its own key, so a changed input only invalidates what depends on it:
+
+  answers file    -> answer index      (key: answers digest)
+  judgments file  -> judgment rows     (key: judgments digest)
+  both            -> merged frame      (key: answers digest + judgments digest)
+  merged frame    -> every table/report (key: frame key + function name + parameters)
+
+File digests are themselves memoized by (path, size, mtime), so a repeated call on unchanged data costs
+two `stat` calls and a pickle load.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+from pathlib import Path
+from typing import Any, Callable
+
+CURRENT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = CURRENT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src import agreement, analysis, ratings, report
+from src.utils import load_json
+
+# Bump when the cached computations change shape or meaning, to invalidate old entries.
+CACHE_VERSION = 1
+
+
+class AnalysisCache:
+    def __init__(self, cache_dir: str = ".analysis_cache"):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._memory: dict[str, Any] = {}
+        self._digest_index_path = self.cache_dir / "file_digests.json"
+        try:
+            with open(self._digest_index_path, "r") as f:
+                self._digests = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self._digests = {}
+
+    def file_digest(self, path: str) -> str:
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self._digests.get(path)
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["sha256"]
+
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        self._digests[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha.hexdigest()}
+        self._write_atomic(self._digest_index_path, json.dumps(self._digests).encode())
+        return sha.hexdigest()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        payload = json.dumps([CACHE_VERSION, *parts], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any]) -> Any:
+        if key in self._memory:
+            return self._memory[key]
+
+        entry_path = self.cache_dir / f"{key}.pkl"
+        try:
+            with open(entry_path, "rb") as f:
+                value = pickle.load(f)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            value = compute()
+            self._write_atomic(entry_path, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+        self._memory[key] = value
+        return value
+
+    def clear(self) -> None:
+        for entry_path in self.cache_dir.glob("*.pkl"):
+            entry_path.unlink()
+        self._memory.clear()
+
+
+class CachedAnalysis:
+    """
+    Cached counterparts of the `src.analysis` entry points for one answers/judgments pair.
+
+    Usage mirrors the uncached functions:
+
+        analysis = CachedAnalysis(ANSWERS_PATH, JUDGMENTS_PATH)
+        df = analysis.frame()
+        print(analysis.summary_report(target_vendor="gemini"))
+    """
+
+    def __init__(self, answers_path: str, judgments_path: str, cache: AnalysisCache = None, cache_dir: str = None):
+        self.answers_path = answers_path
+        self.judgments_path = judgments_path
+        self.cache = cache or AnalysisCache(cache_dir or ".analysis_cache")
+
+    def _frame_key(self) -> tuple[str, str, str]:
+        answers_digest = self.cache.file_digest(self.answers_path)
+        judgments_digest = self.cache.file_digest(self.judgments_path)
+        return answers_digest, judgments_digest, self.cache.make_key("frame", answers_digest, judgments_digest)
+
+    def frame(self):
+        answers_digest, judgments_digest, frame_key = self._frame_key()
+
+        def merge():
+            answer_index = self.cache.get_or_compute(
+                self.cache.make_key("answer_index", answers_digest),
+                lambda: analysis.build_answer_index(load_json(self.answers_path)),
+            )
+            judgment_rows = self.cache.get_or_compute(
+                self.cache.make_key("judgment_rows", judgments_digest),
+                lambda: analysis.parse_judgment_rows(load_json(self.judgments_path)),
+            )
+            return analysis.merge_judgments_with_answers(judgment_rows, answer_index)
+
+        return self.cache.get_or_compute(frame_key, merge)
+
+    def _derived(self, fn: Callable[..., Any], **params: Any) -> Any:
+        _, _, frame_key = self._frame_key()
+        key = self.cache.make_key("derived", frame_key, fn.__name__, params)
+        return self.cache.get_or_compute(key, lambda: fn(self.frame(), **params))
+
+    def top1_preference(self, judge: str = None, **kwargs: Any):
+        return self._derived(analysis.calculate_top1_preference, judge=judge, **kwargs)
+
+    def average_scores(self, judge: str = None, **kwargs: Any):
+        return self._derived(analysis.calculate_average_scores, judge=judge, **kwargs)
+
+    def category_preference(self, judge: str = None):
+        return self._derived(analysis.calculate_category_preference, judge=judge)
+
+    def tier_preference(self, judge: str = None):
+        return self._derived(analysis.calculate_tier_preference, judge=judge)
+
+    def self_bias(self, target_vendor: str = "gemini", **kwargs: Any) -> dict:
+        return self._derived(analysis.detect_self_bias, target_vendor=target_vendor, **kwargs)
+
+    def statistical_tests(self, target_vendor: str = "gemini", **kwargs: Any) -> dict:
+        return self._derived(analysis.run_statistical_tests, target_vendor=target_vendor, **kwargs)
+
+    def summary_report(self, target_vendor: str = "gemini", **kwargs: Any) -> str:
+        return self._derived(analysis.generate_summary_report, target_vendor=target_vendor, **kwargs)
+
+    def agreement(self, value: str = "rank", level: str = "ordinal") -> dict:
+        return self._derived(agreement.compute_agreement, value=value, level=level)
+
+    def ratings(self, method: str = "bradley_terry", **kwargs: Any):
+        return self._derived(ratings.compute_ratings, method=method, **kwargs)
+
+    def bias_report(self, **kwargs: Any) -> dict:
+        return self._derived(report.build_bias_report, **kwargs)
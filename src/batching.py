@@ -0,0 +1,94 @@
+"""
+Client-side micro-batching for self-hosted inference servers.
+
+Worker threads each block on one request, so their requests reach a local server (vLLM, llama.cpp with
+`--parallel`, ...) staggered by however long each thread spent on bookkeeping, and the server's own
+batching starts on whatever happens to be in flight. A `MicroBatcher` sits in front of one endpoint.
+After the first request arrives it waits up to `max_wait_ms` for up to `max_batch_size` more, then releases
+the whole group together as a burst of parallel streams, so prefills land in the same server step. At most
+`max_concurrency` requests are in flight at once; set it to the server's slot count. Each caller blocks on its
+own future and gets its own response or exception back.
+
+The OpenAI chat completions API has no multi-conversation request body, so a batch goes out as parallel
+requests rather than one HTTP call; the server does the actual batching on device.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+
+from src.tracing import span
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        send: Callable[[dict[str, Any]], Any],
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0,
+        max_concurrency: int = None,
+        name: str = "batcher",
+    ):
+        self.send = send
+        self.max_batch_size = max(max_batch_size, 1)
+        self.max_wait_s = max_wait_ms / 1000
+        self.max_concurrency = max(max_concurrency or self.max_batch_size, self.max_batch_size)
+        self.name = name
+        self.batches = 0
+        self.requests = 0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._slots = threading.Semaphore(self.max_concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"{name}-stream")
+        self._dispatcher = threading.Thread(target=self._run, name=f"{name}-dispatch", daemon=True)
+        self._start_lock = threading.Lock()
+
+    def submit(self, request: dict[str, Any]) -> Any:
+        """Queue one request and block until its response (or exception) comes back."""
+        if not self._dispatcher.is_alive():
+            with self._start_lock:
+                if not self._dispatcher.is_alive():
+                    self._dispatcher.start()
+        future: Future = Future()
+        self._queue.put((request, future))
+        return future.result()
+
+    def _collect(self) -> list[tuple[dict[str, Any], Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _send_one(self, request: dict[str, Any], future: Future) -> None:
+        try:
+            future.set_result(self.send(request))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect()
+            with span("batch.dispatch", batcher=self.name, size=len(batch)):
+                for request, future in batch:
+                    # Blocks only when max_concurrency requests are already in flight.
+                    self._slots.acquire()
+                    self._pool.submit(self._send_one, request, future)
+            self.batches += 1
+            self.requests += len(batch)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": self.requests / self.batches if self.batches else 0.0,
+        }
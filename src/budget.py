@@ -0,0 +1,244 @@
+"""
+Per-run and per-vendor token / dollar budgets.
+
+Configured under `budget:` in config.yaml:
+
+    budget:
+      max_tokens: 5000000          # whole run, all vendors
+      max_cost_usd: 40.0
+      vendors:
+        gpt: {max_tokens: 2000000, max_cost_usd: 15.0}
+      prices:                      # USD per 1M tokens, keyed by model name as it appears under `models:`
+        claude-sonnet-4-5: {input: 3.0, cached_input: 0.3, output: 15.0}
+
+Tasks run their model calls inside `BudgetTracker.metered`. Every provider request sent in that block, retries
+included, first reserves its worst case (estimated prompt tokens plus `max_tokens` of output and the model's
+thinking budget) against every budget that applies, and swaps the reservation for the request's real usage
+when it returns. A request whose reservation would push used + reserved past a limit waits for in-flight
+requests to settle, since most of each reservation is handed back. It is skipped only if it cannot fit with
+nothing in flight. Once the settled usage reaches a limit, that budget is exhausted: requests already in flight
+finish, and every later task it covers is skipped with a "Budget exhausted" error record. Those records are
+saved with the rest of the output, so the run's output file is its checkpoint. The regenerate scripts re-run
+error records, so they resume the run once the budget is raised.
+
+Budgets are tracked in memory, so each process enforces them on its own: every `sharded_run.py work` process
+gets the full limits.
+"""
+
+import threading
+from contextlib import contextmanager, nullcontext
+from typing import Any, Iterator
+
+from src.run_logging import get_logger
+
+log = get_logger("budget")
+
+BUDGET_EXHAUSTED = "Budget exhausted"
+
+# The metered task of each thread, see `BudgetTracker.metered`.
+_metered = threading.local()
+
+
+class BudgetExhausted(RuntimeError):
+    """Raised instead of sending a request that the budget cannot cover."""
+
+
+def estimate_tokens(text: str) -> int:
+    # ~4 characters per token for English prose; only used for reservations, which are replaced by real usage.
+    return len(text) // 4 + 1
+
+
+def max_output_tokens(config: dict[str, Any], model_name: str = None, stage: str = "generation") -> int:
+    """`generation.max_tokens`, plus the thinking budget of `model_name`'s reasoning settings for `stage`."""
+    # Imported here because src.models imports this module for `reserve_request`.
+    from src.models import reasoning_settings, thinking_budget
+
+    tokens = config.get("generation", {}).get("max_tokens", 2048)
+    if model_name is not None:
+        tokens += thinking_budget(reasoning_settings(config, model_name, stage)) or 0
+    return tokens
+
+
+def billable_usage(telemetry: dict[str, Any]) -> tuple[int, int, int]:
+    """(uncached input, cached input, output) tokens of an envelope, normalizing per-provider conventions."""
+    route = telemetry.get("route") or ""
+    input_tokens = telemetry.get("input_tokens", 0)
+    cached = telemetry.get("cached_tokens", 0)
+    output = telemetry.get("output_tokens", 0)
+    if route.startswith("anthropic."):
+        # Anthropic reports cache reads on top of input_tokens; the others count them inside it.
+        input_tokens += cached
+    if route.startswith("google."):
+        # Gemini reports thinking tokens separately from candidate tokens, but bills both as output.
+        output += telemetry.get("reasoning_tokens", 0)
+    return max(input_tokens - cached, 0), cached, output
+
+
+class BudgetReservation:
+    __slots__ = ("tracker", "scopes", "tokens", "cost")
+
+    def __init__(self, tracker: "BudgetTracker", scopes: tuple[str, ...], tokens: int, cost: float):
+        self.tracker = tracker
+        self.scopes = scopes
+        self.tokens = tokens
+        self.cost = cost
+
+
+class BudgetTracker:
+    def __init__(self, budget_config: dict[str, Any]):
+        self.prices: dict[str, dict[str, float]] = budget_config.get("prices") or {}
+        # scope ("run" or "vendor:<name>") -> {"max_tokens": ..., "max_cost_usd": ...}
+        self.limits: dict[str, dict[str, float]] = {"run": self._limits(budget_config)}
+        for vendor, vendor_config in (budget_config.get("vendors") or {}).items():
+            self.limits[f"vendor:{vendor}"] = self._limits(vendor_config or {})
+        self.used = {scope: {"tokens": 0, "cost": 0.0} for scope in self.limits}
+        self.reserved = {scope: {"tokens": 0, "cost": 0.0} for scope in self.limits}
+        self.exhausted: dict[str, str] = {}
+        self.skipped = 0
+        self.unpriced: set[str] = set()
+        self._lock = threading.Lock()
+        # Notified whenever a reservation settles, for requests waiting for room.
+        self._settled = threading.Condition(self._lock)
+
+    @staticmethod
+    def _limits(section: dict[str, Any]) -> dict[str, float]:
+        return {key: section[key] for key in ("max_tokens", "max_cost_usd") if section.get(key) is not None}
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "BudgetTracker | None":
+        budget_config = config.get("budget")
+        if not budget_config:
+            return None
+        return cls(budget_config)
+
+    def cost(self, model_name: str, uncached_input: int, cached_input: int, output: int) -> float:
+        price = self.prices.get(model_name)
+        if price is None:
+            if model_name not in self.unpriced:
+                self.unpriced.add(model_name)
+                log.warning(f"⚠ Budget: no price configured for {model_name}; its calls count as $0")
+            return 0.0
+        return (
+            uncached_input * price.get("input", 0.0)
+            + cached_input * price.get("cached_input", price.get("input", 0.0))
+            + output * price.get("output", 0.0)
+        ) / 1_000_000
+
+    def _scopes(self, vendor: str) -> tuple[str, ...]:
+        return tuple(scope for scope in ("run", f"vendor:{vendor}") if scope in self.limits)
+
+    def _fits(self, scope: str, tokens: int, cost: float) -> bool:
+        limits, used, reserved = self.limits[scope], self.used[scope], self.reserved[scope]
+        if "max_tokens" in limits and used["tokens"] + reserved["tokens"] + tokens > limits["max_tokens"]:
+            return False
+        return "max_cost_usd" not in limits or used["cost"] + reserved["cost"] + cost <= limits["max_cost_usd"]
+
+    def reserve(self, vendor: str, model_name: str, prompt_tokens: int, max_output_tokens: int) -> BudgetReservation:
+        """
+        Reserve one request's worst case, waiting while in-flight reservations leave too little room. Raises
+        `BudgetExhausted` if a budget it counts against is spent, or cannot fit it even with nothing in flight.
+        """
+        tokens = prompt_tokens + max_output_tokens
+        with self._settled:
+            scopes = self._scopes(vendor)
+            cost = self.cost(model_name, prompt_tokens, 0, max_output_tokens)
+            while True:
+                reason = self._exhausted_reason(scopes)
+                full = [scope for scope in scopes if not self._fits(scope, tokens, cost)]
+                if reason is None and full and not any(self.reserved[scope]["tokens"] for scope in full):
+                    reason = f"{BUDGET_EXHAUSTED}: {full[0]} budget cannot cover a call of up to {tokens:,} tokens"
+                if reason is not None:
+                    self.skipped += 1
+                    raise BudgetExhausted(reason)
+                if not full:
+                    break
+                self._settled.wait(timeout=1.0)
+            for scope in scopes:
+                self.reserved[scope]["tokens"] += tokens
+                self.reserved[scope]["cost"] += cost
+            return BudgetReservation(self, scopes, tokens, cost)
+
+    def settle(self, reservation: BudgetReservation, model_name: str, telemetry: dict[str, Any] = None) -> None:
+        """Release a reservation and charge the request's actual usage instead."""
+        if reservation is None:
+            return
+        uncached, cached, output = billable_usage(telemetry) if telemetry else (0, 0, 0)
+        with self._settled:
+            cost = self.cost(model_name, uncached, cached, output)
+            for scope in reservation.scopes:
+                self.reserved[scope]["tokens"] -= reservation.tokens
+                self.reserved[scope]["cost"] -= reservation.cost
+                self.used[scope]["tokens"] += uncached + cached + output
+                self.used[scope]["cost"] += cost
+                limits, used = self.limits[scope], self.used[scope]
+                if scope in self.exhausted:
+                    continue
+                if "max_tokens" in limits and used["tokens"] >= limits["max_tokens"]:
+                    self.exhausted[scope] = f"{scope} token budget of {limits['max_tokens']:,}"
+                elif "max_cost_usd" in limits and used["cost"] >= limits["max_cost_usd"]:
+                    self.exhausted[scope] = f"{scope} cost budget of ${limits['max_cost_usd']:g}"
+                else:
+                    continue
+                log.warning(f"⚠ {BUDGET_EXHAUSTED}: {self.exhausted[scope]} reached; draining in-flight calls")
+            self._settled.notify_all()
+
+    def _exhausted_reason(self, scopes: tuple[str, ...]) -> str | None:
+        reasons = [self.exhausted[scope] for scope in scopes if scope in self.exhausted]
+        return f"{BUDGET_EXHAUSTED}: {', '.join(reasons)}" if reasons else None
+
+    def skip_reason(self, vendor: str) -> str | None:
+        """The error of a task to skip because a budget covering `vendor` is spent, else None."""
+        with self._lock:
+            reason = self._exhausted_reason(self._scopes(vendor))
+            if reason is not None:
+                self.skipped += 1
+            return reason
+
+    @contextmanager
+    def metered(self, vendor: str, prompt_tokens: int, max_output_tokens: int) -> Iterator[None]:
+        """Reserve (and settle) every provider request this thread sends in the block, see `reserve_request`."""
+        previous = getattr(_metered, "task", None)
+        _metered.task = (self, vendor, prompt_tokens, max_output_tokens)
+        try:
+            yield
+        finally:
+            _metered.task = previous
+
+    def report(self) -> str:
+        report = ["Budget:"]
+        for scope, limits in self.limits.items():
+            used = self.used[scope]
+            token_limit = f" / {limits['max_tokens']:,}" if "max_tokens" in limits else ""
+            cost_limit = f" / ${limits['max_cost_usd']:g}" if "max_cost_usd" in limits else ""
+            status = " (exhausted)" if scope in self.exhausted else ""
+            report.append(
+                f"  {scope:16} {used['tokens']:,}{token_limit} tokens, ${used['cost']:.4f}{cost_limit}{status}"
+            )
+        if self.skipped:
+            report.append(f"  {self.skipped} call(s) skipped; re-run the regenerate scripts to resume them")
+        return "\n".join(report)
+
+
+def metered(budget: BudgetTracker | None, vendor: str, prompt_tokens: int, max_output_tokens: int):
+    """`budget.metered(...)`, or a block without reservations when the run has no budget."""
+    if budget is None:
+        return nullcontext()
+    return budget.metered(vendor, prompt_tokens, max_output_tokens)
+
+
+def reserve_request(model_name: str) -> BudgetReservation | None:
+    """
+    Called by `ModelWrapper._request` before every provider request: reserves it against the budget of the
+    thread's metered task, if any. Raises `BudgetExhausted` if it cannot be covered.
+    """
+    task = getattr(_metered, "task", None)
+    if task is None:
+        return None
+    tracker, vendor, prompt_tokens, max_output_tokens = task
+    return tracker.reserve(vendor, model_name, prompt_tokens, max_output_tokens)
+
+
+def settle_request(reservation: BudgetReservation | None, model_name: str, usage: dict[str, Any] = None) -> None:
+    """Swap a request's reservation for its usage: a telemetry-style dict with `route`, or None if it failed."""
+    if reservation is not None:
+        reservation.tracker.settle(reservation, model_name, usage)
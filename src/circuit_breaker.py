@@ -0,0 +1,172 @@
+"""
+Circuit breakers per (vendor, route, model), with optional failover to an equivalent route.
+
+Configured under `circuit_breaker:` in config.yaml; without that section no breakers are created:
+
+    circuit_breaker:
+      error_rate: 0.5        # open when at least this share of the last `window` requests failed...
+      window: 20
+      min_requests: 5        # ...once the window holds this many requests
+      cooldown_s: 30         # then reject requests for this long before letting probes through
+      half_open_probes: 1    # concurrent probe requests while half-open
+
+Every provider request in `ModelWrapper._request` goes through the breaker of its (vendor, route, model). While
+a breaker is open, requests fail immediately with `CircuitOpenError` instead of tying up a worker, and the
+generate / judge retry loops stop retrying them. After `cooldown_s` the breaker turns half-open and lets
+`half_open_probes` requests through. One success closes it; a failure re-opens it for another cooldown. Only
+errors that say something about the route count as failures: connection errors, timeouts, 408 / 409 / 429 and
+5xx responses. Other 4xx responses, unparseable output and validation errors count as successes, and requests
+cut off by the run's `--deadline` are not counted at all.
+
+A provider or route with a `fallback:` entry (see `ModelFactory`) is called through that fallback while its own
+breaker is open, e.g. OpenRouter's `google/gemini-2.5-flash` through the native Gemini API. No built-in provider
+has one; fallbacks are opt-in per config.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from src.deadline import DeadlineExceeded
+from src.run_logging import get_logger
+
+log = get_logger("circuit")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of sending a request while the breaker of its route is open."""
+
+
+# Matched by class name anywhere in the MRO, so the provider SDKs and httpx need not be imported here.
+TRANSPORT_ERRORS = {"APIConnectionError", "APITimeoutError", "TransportError", "TimeoutException", "ServerError"}
+
+
+def counts_as_failure(exc: BaseException) -> bool:
+    """Transport errors and 408 / 409 / 429 / 5xx responses; anything else (bad output, 4xx) is not the route's."""
+    if isinstance(exc, DeadlineExceeded):
+        # The run's own deadline, not the route.
+        return False
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    if TRANSPORT_ERRORS & {cls.__name__ for cls in type(exc).__mro__}:
+        return True
+    # google-genai errors carry the HTTP status as `code`.
+    status = getattr(exc, "status_code", None) or getattr(exc, "code", None)
+    return isinstance(status, int) and (status >= 500 or status in (408, 409, 429))
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        error_rate: float = 0.5,
+        window: int = 20,
+        min_requests: int = 5,
+        cooldown_s: float = 30.0,
+        half_open_probes: int = 1,
+    ):
+        self.name = name
+        self.error_rate = error_rate
+        self.min_requests = max(min_requests, 1)
+        self.cooldown_s = cooldown_s
+        self.half_open_probes = max(half_open_probes, 1)
+        self.state = CLOSED
+        self.opened = 0
+        self.rejected = 0
+        self._outcomes: deque[bool] = deque(maxlen=max(window, self.min_requests))
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    def before_request(self) -> None:
+        """Raise `CircuitOpenError` if a request may not be sent now; otherwise the caller must `record` it."""
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.cooldown_s:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"Circuit open for {self.name}")
+                self.state = HALF_OPEN
+                self._probes = 0
+                log.info(f"Circuit half-open for {self.name}, probing", extra={"circuit": self.name})
+            if self.state == HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    self.rejected += 1
+                    raise CircuitOpenError(f"Circuit half-open for {self.name}, waiting for a probe")
+                self._probes += 1
+
+    def release(self) -> None:
+        """End a request admitted by `before_request` without an outcome, e.g. one cut off by the run deadline."""
+        with self._lock:
+            if self.state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record(self, success: bool) -> None:
+        with self._lock:
+            if self.state == OPEN:
+                # A request sent before the breaker opened; its outcome is already reflected.
+                return
+            if self.state == HALF_OPEN:
+                if success:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                    log.info(f"Circuit closed for {self.name}", extra={"circuit": self.name})
+                else:
+                    self._open()
+                return
+            self._outcomes.append(success)
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self.min_requests and failures / len(self._outcomes) >= self.error_rate:
+                self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened += 1
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        log.warning(
+            f"⚠ Circuit opened for {self.name}: failing fast for {self.cooldown_s:g}s",
+            extra={"circuit": self.name},
+        )
+
+
+class BreakerRegistry:
+    def __init__(self, settings: dict[str, Any]):
+        self.settings = {
+            key: settings[key]
+            for key in ("error_rate", "window", "min_requests", "cooldown_s", "half_open_probes")
+            if settings.get(key) is not None
+        }
+        self._breakers: dict[tuple[str, str, str], CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "BreakerRegistry | None":
+        settings = config.get("circuit_breaker")
+        if not settings:
+            return None
+        return cls(settings)
+
+    def get(self, vendor: str, route: str, model_name: str) -> CircuitBreaker:
+        key = (vendor, route, model_name)
+        with self._lock:
+            if key not in self._breakers:
+                self._breakers[key] = CircuitBreaker(f"{vendor}:{route}:{model_name}", **self.settings)
+            return self._breakers[key]
+
+    def report(self) -> str:
+        with self._lock:
+            tripped = [b for b in self._breakers.values() if b.opened]
+        if not tripped:
+            return "Circuit breakers: none opened"
+        lines = ["Circuit breakers:"]
+        for breaker in sorted(tripped, key=lambda b: b.name):
+            lines.append(
+                f"  {breaker.name}: opened {breaker.opened}x, {breaker.rejected} request(s) failed fast, "
+                f"now {breaker.state}"
+            )
+        return "\n".join(lines)
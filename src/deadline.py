@@ -0,0 +1,84 @@
+"""
+Per-call timeouts and a whole-run deadline.
+
+Every provider request is sent with a timeout of `generation.timeout` seconds (default 60), so a hung
+connection fails the call instead of pinning a worker thread. The SDK clients are built without retries of their
+own; `ModelWrapper._request` retries transient errors itself and takes a fresh timeout for every attempt.
+
+`--deadline` on generate_answers.py, judge_answers.py and pipeline.py bounds the whole run, e.g. `--deadline 90m`.
+Inside `run_deadline(...)` each request's timeout is capped at the time left, so calls still in flight are cut off
+when the deadline passes and no further attempt is sent. Tasks that have not started by then are not sent, and
+failed tasks are not retried. Both are recorded as error records with "Deadline reached", like budget skips. The
+output is saved as usual, so the file is the run's checkpoint: the regenerate scripts re-run the pending records
+later. Requests cut off by the deadline do not count against circuit breakers.
+"""
+
+import contextlib
+import re
+import time
+
+DEADLINE_REACHED = "Deadline reached"
+
+_expires_at: float | None = None
+
+_DURATION = re.compile(r"(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m)?(?:(\d+(?:\.\d+)?)s?)?")
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised instead of sending a request once the run's deadline has passed."""
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in "45", "45s", "90m", "2h" or "1h30m"."""
+    match = _DURATION.fullmatch(text.strip().lower())
+    if not text.strip() or match is None:
+        raise ValueError(f"Invalid duration: {text!r} (expected e.g. 45, 90m, 2h, 1h30m)")
+    hours, minutes, seconds = (float(part) if part else 0.0 for part in match.groups())
+    return hours * 3600 + minutes * 60 + seconds
+
+
+def add_deadline_arguments(parser) -> None:
+    parser.add_argument(
+        "--deadline",
+        type=parse_duration,
+        default=None,
+        help="Stop the run after this long (e.g. 90m, 2h): cut off calls in flight, record unstarted tasks as "
+        "pending and save what finished",
+    )
+
+
+def time_left() -> float | None:
+    """Seconds until the run's deadline, or None without one."""
+    if _expires_at is None:
+        return None
+    return _expires_at - time.monotonic()
+
+
+def deadline_reached() -> bool:
+    remaining = time_left()
+    return remaining is not None and remaining <= 0
+
+
+def call_timeout(timeout: float) -> float:
+    """`timeout` capped at the time left before the deadline; raises `DeadlineExceeded` once it has passed."""
+    remaining = time_left()
+    if remaining is None:
+        return timeout
+    if remaining <= 0:
+        raise DeadlineExceeded(DEADLINE_REACHED)
+    return min(timeout, remaining)
+
+
+@contextlib.contextmanager
+def run_deadline(seconds: float = None):
+    global _expires_at
+    if seconds is None:
+        yield None
+        return
+    previous = _expires_at
+    _expires_at = time.monotonic() + seconds
+    print(f"Run deadline: {seconds:.0f}s from now")
+    try:
+        yield _expires_at
+    finally:
+        _expires_at = previous
@@ -1,8 +1,6 @@
 import argparse
 import sys
-import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 from tqdm import tqdm
@@ -13,50 +11,252 @@ if str(PROJECT_ROOT) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT))
 
 from src.utils import load_config, load_prompts, save_json, generate_timestamp
-from src.models import ModelFactory
-
-print_lock = threading.Lock()
+from src.models import ModelFactory, ModelWrapper
+from src.budget import BudgetExhausted, BudgetTracker, estimate_tokens, max_output_tokens, metered
+from src.circuit_breaker import CircuitOpenError
+from src.deadline import DEADLINE_REACHED, add_deadline_arguments, deadline_reached, run_deadline
+from src.planner import LatencyModel, add_planner_arguments, plan_report
+from src.preflight import DEFAULT_WORKERS, add_preflight_arguments, run_preflight
+from src.run_logging import add_logging_arguments, get_logger, run_logging
+from src.run_metrics import RunMetrics, add_metrics_arguments, serve_run_metrics
+from src.scheduler import ScheduledTask, TaskScheduler, add_fairness_arguments
+from src.telemetry import answer_group, merge_envelopes, split_envelope, telemetry_report
+from src.tracing import add_instrumentation_arguments, instrumented_run, traced
+
+log = get_logger("generate")
+
+
+def generate_answer_with_telemetry(
+    model_wrapper, prompt_text: str, retries: int = 3, retry_delay: float = 1.0
+) -> tuple[str | dict[str, str], dict]:
+    """Like `generate_answer`, also returning the call envelopes of every attempt merged into one."""
+    telemetry = None
+    for attempt in range(retries):
+        try:
+            answer, call_telemetry = model_wrapper.generate_with_metadata(prompt_text)
+            return answer, merge_envelopes(telemetry, call_telemetry)
+        except (CircuitOpenError, BudgetExhausted) as e:
+            # Retrying would only fail fast again until the breaker's cooldown is over or the budget is raised.
+            return {"error": str(e)}, merge_envelopes(telemetry, model_wrapper.last_call_metadata())
+        except Exception as e:
+            telemetry = merge_envelopes(telemetry, model_wrapper.last_call_metadata())
+            if deadline_reached():
+                return {"error": DEADLINE_REACHED}, telemetry
+            if attempt == retries - 1:
+                return {"error": str(e)}, telemetry
+            time.sleep(retry_delay)
+            continue
+    return {"error": "No attempts made"}, telemetry
 
 
 def generate_answer(
     model_wrapper, prompt_text: str, retries: int = 3, retry_delay: float = 1.0
 ) -> str | dict[str, str]:
+    return generate_answer_with_telemetry(model_wrapper, prompt_text, retries=retries, retry_delay=retry_delay)[0]
+
+
+def generate_samples_with_telemetry(
+    model_wrapper, prompt_text: str, n: int, retries: int = 3, retry_delay: float = 1.0
+) -> tuple[list[str] | dict[str, str], dict]:
+    """`n` answers from one request per attempt, with the envelopes of every attempt merged into one."""
+    telemetry = None
     for attempt in range(retries):
         try:
-            answer = model_wrapper.generate(prompt_text)
-            return answer
+            samples, call_telemetry = model_wrapper.generate_n_with_metadata(prompt_text, n)
+            return samples, merge_envelopes(telemetry, call_telemetry)
+        except (CircuitOpenError, BudgetExhausted) as e:
+            return {"error": str(e)}, merge_envelopes(telemetry, model_wrapper.last_call_metadata())
         except Exception as e:
+            telemetry = merge_envelopes(telemetry, model_wrapper.last_call_metadata())
+            if deadline_reached():
+                return {"error": DEADLINE_REACHED}, telemetry
             if attempt == retries - 1:
-                return {"error": str(e)}
+                return {"error": str(e)}, telemetry
             time.sleep(retry_delay)
-            continue
-
+    return {"error": "No attempts made"}, telemetry
 
-def generate_single_task(task: dict[str, str], retries: int, retry_delay: float) -> dict[str, str]:
-    model = task["model"]
-    prompt = task["prompt"]
-    vendor = task["vendor"]
-    tier = task["tier"]
 
-    answer_text = generate_answer(model, prompt["text"], retries=retries, retry_delay=retry_delay)
-
-    return_dict = {
-        "answer_id": f"ans_{prompt['id']}_{vendor}_{tier}",
+def answer_record(
+    prompt: dict[str, str], vendor: str, tier: str, model_name: str, sample_index: int = None
+) -> dict[str, str]:
+    """The identifying fields of an answer. With `--samples`, each sample gets an `_s<i>` suffixed id."""
+    answer_id = f"ans_{prompt['id']}_{vendor}_{tier}"
+    record = {
+        "answer_id": answer_id if sample_index is None else f"{answer_id}_s{sample_index}",
         "prompt_id": prompt["id"],
         "category": prompt["category"],
         "model_vendor": vendor,
         "model_tier": tier,
-        "model_name": model.model_name,
+        "model_name": model_name,
         "prompt_text": prompt["text"],
     }
+    if sample_index is not None:
+        record["sample_index"] = sample_index
+    return record
+
+
+@traced("generate.answer")
+def generate_single_task(
+    task: dict[str, str], retries: int, retry_delay: float, budget: BudgetTracker = None, metrics: RunMetrics = None
+) -> dict[str, str]:
+    model = task["model"]
+    prompt = task["prompt"]
+    vendor = task["vendor"]
+    tier = task["tier"]
+    if metrics is not None:
+        metrics.task_started("generate", vendor, tier)
+
+    skip_reason = None
+    if deadline_reached():
+        skip_reason = DEADLINE_REACHED
+    elif budget is not None:
+        skip_reason = budget.skip_reason(vendor)
+    if skip_reason is not None:
+        answer_text, telemetry = {"error": skip_reason}, None
+    else:
+        output_tokens = max_output_tokens(model.config, model.model_name)
+        with metered(budget, vendor, estimate_tokens(prompt["text"]), output_tokens):
+            answer_text, telemetry = generate_answer_with_telemetry(
+                model, prompt["text"], retries=retries, retry_delay=retry_delay
+            )
+
+    return_dict = answer_record(prompt, vendor, tier, model.model_name, task.get("sample_index"))
     if isinstance(answer_text, dict) and "error" in answer_text:
         return_dict.update(answer_text)
     else:
         return_dict["answer_text"] = answer_text
+    if telemetry is not None:
+        return_dict["telemetry"] = telemetry
+    if metrics is not None:
+        metrics.task_finished("generate", vendor, tier, return_dict)
 
     return return_dict
 
 
+@traced("generate.samples")
+def generate_sample_group(
+    task: dict[str, str], retries: int, retry_delay: float, budget: BudgetTracker = None, metrics: RunMetrics = None
+) -> list[dict[str, str]]:
+    """All `task["samples"]` answers of one prompt and model from a single request using the provider's `n`."""
+    model = task["model"]
+    prompt = task["prompt"]
+    vendor = task["vendor"]
+    tier = task["tier"]
+    n = task["samples"]
+    if metrics is not None:
+        metrics.task_started("generate", vendor, tier)
+
+    skip_reason = None
+    if deadline_reached():
+        skip_reason = DEADLINE_REACHED
+    elif budget is not None:
+        skip_reason = budget.skip_reason(vendor)
+    if skip_reason is not None:
+        samples, telemetry = {"error": skip_reason}, None
+    else:
+        # The prompt is sent once; every completion can use up to max_tokens plus its thinking budget.
+        output_tokens = n * max_output_tokens(model.config, model.model_name)
+        with metered(budget, vendor, estimate_tokens(prompt["text"]), output_tokens):
+            samples, telemetry = generate_samples_with_telemetry(
+                model, prompt["text"], n, retries=retries, retry_delay=retry_delay
+            )
+
+    records = []
+    for sample_index, sample_telemetry in enumerate(split_envelope(telemetry, n)):
+        record = answer_record(prompt, vendor, tier, model.model_name, sample_index)
+        if isinstance(samples, dict):
+            record.update(samples)
+        elif sample_index < len(samples):
+            record["answer_text"] = samples[sample_index]
+        else:
+            # A short response leaves error records, so the regenerate scripts can fill the gap.
+            record["error"] = f"Provider returned {len(samples)} of {n} samples"
+        if sample_telemetry is not None:
+            record["telemetry"] = sample_telemetry
+        records.append(record)
+    if metrics is not None:
+        error = samples if isinstance(samples, dict) else {}
+        metrics.task_finished("generate", vendor, tier, {**error, "telemetry": telemetry})
+
+    return records
+
+
+def run_generation_task(
+    task: dict[str, str], retries: int, retry_delay: float, budget: BudgetTracker = None, metrics: RunMetrics = None
+) -> list[dict[str, str]]:
+    """The answer records of one task from `build_generation_tasks`: one answer, or a group of samples."""
+    if "samples" in task:
+        return generate_sample_group(task, retries, retry_delay, budget, metrics)
+    return [generate_single_task(task, retries, retry_delay, budget, metrics)]
+
+
+def add_sample_arguments(parser) -> None:
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=1,
+        help="Answers per prompt and model, for measuring answer variance. Uses the provider's `n` parameter "
+        "where supported (OpenAI-compatible routes), concurrent calls elsewhere (default: 1)",
+    )
+
+
+def log_answer(result: dict[str, str], vendor: str, tier: str, prompt_id: str) -> None:
+    fields = {"stage": "generate", "vendor": vendor, "tier": tier, "prompt_id": prompt_id}
+    target = prompt_id
+    if "sample_index" in result:
+        fields["sample_index"] = result["sample_index"]
+        target = f"{prompt_id} (sample {result['sample_index']})"
+    if "error" in result:
+        log.warning(f"  ✗ {vendor}_{tier} → {target} ({result['error']})", extra=fields)
+    else:
+        fields.update(chars=len(result["answer_text"]), progress=True)
+        log.info(f"  ✓ {vendor}_{tier} → {target} ({fields['chars']} chars)", extra=fields)
+
+
+def build_generation_tasks(
+    prompts: list[dict[str, str]], models: dict[str, ModelWrapper], samples: int = 1
+) -> list[dict[str, str]]:
+    """
+    One task per prompt and model. With `samples` > 1, a model whose provider supports `n` gets one task for
+    all samples (the prompt is paid for once); any other model gets one concurrent task per sample, each sending
+    the full prompt with its own `_s<i>` id, telemetry and budget reservation.
+    """
+    tasks = []
+    for prompt in prompts:
+        for model_key, model in models.items():
+            if model is not None:
+                vendor, tier = model_key.split("_", 1)
+                task = {"model": model, "prompt": prompt, "vendor": vendor, "tier": tier}
+                if samples <= 1:
+                    tasks.append(task)
+                elif model.supports_n():
+                    tasks.append({**task, "samples": samples})
+                else:
+                    tasks.extend({**task, "sample_index": i} for i in range(samples))
+    return tasks
+
+
+def plan_generation_tasks(prompts: list[dict[str, str]], config: dict, samples: int = 1) -> list[dict]:
+    """
+    The generation task matrix for a dry run, built from the config alone so no client is created. Samples are
+    planned as separate calls, which overstates input tokens for providers that support `n`.
+    """
+    tasks = []
+    for prompt in prompts:
+        input_tokens = estimate_tokens(prompt["text"])
+        for vendor, tiers in config.get("models", {}).items():
+            for tier, model_name in (tiers or {}).items():
+                if model_name:
+                    task = {
+                        "label": f"{vendor}_{tier}",
+                        "model": model_name,
+                        "input_tokens": input_tokens,
+                        "category": prompt.get("category"),
+                    }
+                    tasks.extend([task] * max(samples, 1))
+    return tasks
+
+
 def generate_all_answers(
     prompts: list[dict[str, str]],
     model_factory: ModelFactory,
@@ -64,63 +264,70 @@ def generate_all_answers(
     max_workers: int = 6,
     retries: int = 3,
     retry_delay: float = 1.0,
+    budget: BudgetTracker = None,
+    metrics: RunMetrics = None,
+    samples: int = 1,
+    latency_model: LatencyModel = None,
+    vendor_share: float = None,
 ) -> list[dict[str, str]]:
+    """
+    Answers of every model to every prompt. With a `latency_model`, tasks start longest-predicted first so slow
+    calls don't extend the tail of the run; `vendor_share` caps the workers one vendor holds (see TaskScheduler).
+    """
     models = model_factory.get_all_models()
-    vendors = ["claude", "gpt", "gemini"]
-    tiers = ["fast", "thinking"]
-
-    tasks = []
-    for prompt in prompts:
-        for vendor in vendors:
-            for tier in tiers:
-                model_key = f"{vendor}_{tier}"
-                if models[model_key] is not None:
-                    tasks.append({"model": models[model_key], "prompt": prompt, "vendor": vendor, "tier": tier})
+    tasks = build_generation_tasks(prompts, models, samples)
 
     total_tasks = len(tasks)
+    total_answers = sum(task.get("samples", 1) for task in tasks)
+    if metrics is not None:
+        metrics.add_planned("generate", total_tasks)
     if verbose:
-        print(f"\nRunning {total_tasks} tasks with {max_workers} concurrent workers...")
+        print(f"\nRunning {total_tasks} tasks ({total_answers} answers) with {max_workers} concurrent workers...")
 
     if total_tasks == 0:
         return []
 
-    ordered_answers: list[dict[str, str] | None] = [None] * total_tasks
-
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_index = {
-            executor.submit(generate_single_task, task, retries, retry_delay): idx for idx, task in enumerate(tasks)
-        }
-        pbar = tqdm(total=total_tasks, desc="Generating answers") if verbose else None
-
-        for future in as_completed(future_to_index):
-            idx = future_to_index[future]
-            task = tasks[idx]
-            try:
-                result = future.result()
-                ordered_answers[idx] = result
-
-                if verbose:
-                    with print_lock:
-                        status = "✓" if "error" not in result else "✗"
-                        detail = (
-                            f"{len(result['answer_text'])} chars"
-                            if "answer_text" in result
-                            else result.get("error", "error")
-                        )
-                        tqdm.write(f"  {status} {task['vendor']}_{task['tier']} → {task['prompt']['id']} ({detail})")
-
-            except Exception as e:
-                if verbose:
-                    with print_lock:
-                        tqdm.write(f"  ✗ {task['vendor']}_{task['tier']} → {task['prompt']['id']} FAILED: {e}")
-
-            if pbar:
-                pbar.update(1)
-
+    ordered_answers: list[list[dict[str, str]] | None] = [None] * total_tasks
+    pbar = tqdm(total=total_answers, desc="Generating answers") if verbose else None
+
+    def on_answer(scheduled: ScheduledTask, results: list[dict[str, str]], exc: BaseException) -> None:
+        idx = scheduled.meta["index"]
+        task = tasks[idx]
+        if exc is not None:
+            if verbose:
+                log.error(f"  ✗ {task['vendor']}_{task['tier']} → {task['prompt']['id']} FAILED: {exc}")
+        else:
+            ordered_answers[idx] = results
+            if verbose:
+                for result in results:
+                    log_answer(result, task["vendor"], task["tier"], task["prompt"]["id"])
         if pbar:
-            pbar.close()
-
-    return [answer for answer in ordered_answers if answer is not None]
+            pbar.update(task.get("samples", 1))
+
+    scheduler = TaskScheduler(max_workers=max_workers, group_share=vendor_share)
+    for idx, task in enumerate(tasks):
+        priority = 0.0
+        if latency_model is not None:
+            prompt = task["prompt"]
+            priority = latency_model.predict(
+                task["model"].model_name, estimate_tokens(prompt["text"]), prompt.get("category")
+            )
+        scheduler.add(
+            ScheduledTask(
+                run_generation_task,
+                args=(task, retries, retry_delay, budget, metrics),
+                meta={"index": idx},
+                callback=on_answer,
+                priority=priority,
+                group=task["vendor"],
+            )
+        )
+    scheduler.run()
+
+    if pbar:
+        pbar.close()
+
+    return [answer for results in ordered_answers if results is not None for answer in results]
 
 
 def main():
@@ -131,13 +338,28 @@ def main():
     parser.add_argument("--limit", type=int, default=None)
     parser.add_argument("--category", type=str, default=None)
     parser.add_argument("--verbose", action="store_true", default=True)
-    parser.add_argument("--workers", type=int, default=6, help="Number of concurrent workers (default: 6)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of concurrent workers (default: seeded by the preflight, else 6)",
+    )
     parser.add_argument("--retries", type=int, default=3, help="Number of retries per generation (default: 3)")
     parser.add_argument(
         "--retry-delay", type=float, default=1.0, help="Seconds to wait between retries (default: 1.0)"
     )
+    add_sample_arguments(parser)
+    add_planner_arguments(parser)
+    add_logging_arguments(parser)
+    add_metrics_arguments(parser)
+    add_deadline_arguments(parser)
+    add_preflight_arguments(parser)
+    add_fairness_arguments(parser)
+    add_instrumentation_arguments(parser)
 
     args = parser.parse_args()
+    if args.samples < 1:
+        parser.error("--samples must be at least 1")
 
     print("Loading configuration...")
     config = load_config(args.config)
@@ -153,41 +375,62 @@ def main():
         prompts = prompts[: args.limit]
         print(f"Limited to first {args.limit} prompts")
 
-    print(f"Processing {len(prompts)} prompts across 6 models (3 vendors × 2 tiers)")
-    print(f"Total API calls: {len(prompts) * 6}")
-    print(f"Concurrent workers: {args.workers}")
+    if args.dry_run:
+        tasks = plan_generation_tasks(prompts, config, args.samples)
+        workers = args.workers or DEFAULT_WORKERS
+        print("\n" + plan_report(tasks, config, args.history, workers, "Answer generation"))
+        return
 
     print("\nInitializing model factory...")
     model_factory = ModelFactory(config)
+    _, seeded_workers = run_preflight(model_factory, args.preflight)
+    workers = args.workers or seeded_workers or DEFAULT_WORKERS
+    model_keys = model_factory.model_keys()
 
-    print("\nTesting API connections...")
-    models = model_factory.get_all_models()
-    for name, model in models.items():
-        vendor, tier = name.split("_")
-        if model and tier:
-            print(f"  {vendor.capitalize()} ({tier}): {model.model_name}")
+    print(
+        f"\nProcessing {len(prompts)} prompts across {len(model_keys)} models "
+        f"({len(model_factory.vendors())} vendors)"
+    )
+    print(f"Total answers: {len(prompts) * len(model_keys) * args.samples}")
+    if args.samples > 1:
+        print(f"Samples per prompt and model: {args.samples}")
+    seeded_note = " (seeded by the preflight)" if not args.workers and seeded_workers else ""
+    print(f"Concurrent workers: {workers}{seeded_note}")
 
     print("\n" + "=" * 60)
     print("STARTING ANSWER GENERATION")
     print("=" * 60)
 
-    answers = generate_all_answers(
-        prompts=prompts,
-        model_factory=model_factory,
-        verbose=args.verbose,
-        max_workers=args.workers,
-        retries=args.retries,
-        retry_delay=args.retry_delay,
-    )
-
     if args.output is None:
         timestamp = generate_timestamp()
         output_path = f"data/answers/answers_{timestamp}.json"
     else:
         output_path = args.output
 
-    print(f"\nSaving {len(answers)} answers to {output_path}")
-    save_json(answers, output_path)
+    latency_model = LatencyModel.from_paths(args.history) if args.history else None
+    budget = BudgetTracker.from_config(config)
+    metrics = serve_run_metrics(args.metrics_port)
+    with (
+        run_logging(args.log_level, args.log_json, args.progress_interval),
+        instrumented_run(args.trace, args.trace_format, args.profile, args.profile_interval),
+        run_deadline(args.deadline),
+    ):
+        answers = generate_all_answers(
+            prompts=prompts,
+            model_factory=model_factory,
+            verbose=args.verbose,
+            max_workers=workers,
+            retries=args.retries,
+            retry_delay=args.retry_delay,
+            budget=budget,
+            metrics=metrics,
+            samples=args.samples,
+            latency_model=latency_model,
+            vendor_share=args.vendor_share,
+        )
+
+        print(f"\nSaving {len(answers)} answers to {output_path}")
+        save_json(answers, output_path)
 
     print("\n" + "=" * 60)
     print("SUMMARY")
@@ -211,6 +454,16 @@ def main():
     for category, count in sorted(by_category.items()):
         print(f"  {category}: {count}")
 
+    pending = sum(1 for answer in answers if answer.get("error") == DEADLINE_REACHED)
+    if pending:
+        print(f"\n⚠ Deadline reached: {pending} answer(s) pending; utils/regenerate_dubious_answers.py resumes them")
+
+    print("\n" + telemetry_report(answers, answer_group, "Usage by model"))
+    if budget is not None:
+        print("\n" + budget.report())
+    if model_factory.breakers is not None:
+        print("\n" + model_factory.breakers.report())
+
     print(f"\n✓ Done! Answers saved to: {output_path}")
 
 
@@ -1,8 +1,7 @@
 import argparse
+import random
 import sys
-import threading
 import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from typing import Literal, Annotated
 from pydantic import BaseModel, Field
@@ -22,9 +21,20 @@ from src.utils import (
     format_judge_prompt,
     extract_json_from_response,
 )
-from src.models import ModelFactory, ModelWrapper
-
-print_lock = threading.Lock()
+from src.models import ModelFactory, ModelWrapper, reasoning_settings
+from src.budget import BUDGET_EXHAUSTED, BudgetTracker, estimate_tokens, max_output_tokens, metered
+from src.circuit_breaker import CircuitOpenError
+from src.deadline import DEADLINE_REACHED, add_deadline_arguments, deadline_reached, run_deadline
+from src.live_metrics import BiasAggregator
+from src.planner import LatencyModel, add_planner_arguments, plan_report
+from src.preflight import DEFAULT_WORKERS, add_preflight_arguments, run_preflight
+from src.run_logging import add_logging_arguments, get_logger, run_logging
+from src.run_metrics import RunMetrics, add_metrics_arguments, serve_run_metrics
+from src.scheduler import ScheduledTask, TaskScheduler, add_fairness_arguments
+from src.telemetry import judgment_group, merge_envelopes, telemetry_report
+from src.tracing import add_instrumentation_arguments, instrumented_run, traced
+
+log = get_logger("judge")
 
 TEMPERATURE_MAP = {
     "claude-haiku-4-5": 0.5,
@@ -35,6 +45,11 @@ TEMPERATURE_MAP = {
     "gemini-3-pro-preview": 1.0,
 }
 
+SAMPLE_MODES = ("first", "random", "each")
+
+# Judge system prompt and answer framing added on top of the question and answer texts, for budget estimates.
+JUDGE_PROMPT_OVERHEAD_TOKENS = 500
+
 Label = Literal["A", "B", "C", "D", "E", "F"]
 Score = Annotated[int, Field(ge=0, le=10)]
 
@@ -60,11 +75,6 @@ class JudgmentSchema(BaseModel):
     )
 
 
-def thread_safe_print(*args, **kwargs):
-    with print_lock:
-        print(*args, **kwargs)
-
-
 def judge_prompt_answers(
     prompt_id: str,
     prompt_text: str,
@@ -99,20 +109,32 @@ def judge_prompt_answers(
     )
 
     if verbose:
-        thread_safe_print(f"  Judge prompt: {len(judge_prompt)} chars")
-        thread_safe_print(f"  Mapping: {mapping}")
+        log.debug(f"  Judge prompt: {len(judge_prompt)} chars")
+        log.debug(f"  Mapping: {mapping}")
 
+    telemetry = None
     try:
         model_id = judge_model.model_name
-        generate_kwargs = {"prompt": judge_prompt, "system_prompt": system_prompt, "response_model": JudgmentSchema}
+        generate_kwargs = {
+            "prompt": judge_prompt,
+            "system_prompt": system_prompt,
+            "response_model": JudgmentSchema,
+            "reasoning": reasoning_settings(judge_model.config, model_id, "judging"),
+        }
         # For OpenAI gpt-5 models, temperature is ignored from the corresponding wrapper.
         if "gpt" not in model_id:
-            generate_kwargs.update({"temperature": TEMPERATURE_MAP[model_id]})
-        response = judge_model.generate(**generate_kwargs)
+            # Judges added through `providers:` use the config's judging temperature.
+            default_temperature = judge_model.config.get("judging", {}).get("temperature", 0.3)
+            generate_kwargs.update({"temperature": TEMPERATURE_MAP.get(model_id, default_temperature)})
+        try:
+            response, telemetry = judge_model.generate_with_metadata(**generate_kwargs)
+        except Exception:
+            telemetry = judge_model.last_call_metadata()
+            raise
 
         if verbose:
             preview = response if isinstance(response, str) else str(response)
-            thread_safe_print(f"  Judge response: {preview[:200]}...")
+            log.debug(f"  Judge response: {preview[:200]}...")
 
         if isinstance(response, BaseModel):
             judgment = response.model_dump()
@@ -134,15 +156,25 @@ def judge_prompt_answers(
             "justification": judgment["justification"],
             "mapping": mapping,
             "anonymized_answers": [{"label": a["label"], "text": a["text"][:200] + "..."} for a in anonymized],
+            "telemetry": telemetry,
         }
 
         return judgment_record
 
     except Exception as e:
-        thread_safe_print(f"  ✗ Error judging {prompt_id} with {judge_name}: {e}")
-        return {"prompt_id": prompt_id, "judge_model": judge_name, "error": str(e), "mapping": mapping}
+        log.warning(
+            f"  ✗ Error judging {prompt_id} with {judge_name}: {e}",
+            extra={"stage": "judge", "judge": judge_name, "prompt_id": prompt_id},
+        )
+        error_record = {"prompt_id": prompt_id, "judge_model": judge_name, "error": str(e), "mapping": mapping}
+        if isinstance(e, CircuitOpenError):
+            error_record["circuit_open"] = True
+        if telemetry is not None:
+            error_record["telemetry"] = telemetry
+        return error_record
 
 
+@traced("judge.judgment")
 def judge_with_retries(
     prompt_id: str,
     prompt_text: str,
@@ -154,35 +186,181 @@ def judge_with_retries(
     retries: int,
     retry_delay: float,
     hint_mode: str = "none",
+    budget: BudgetTracker = None,
+    metrics: RunMetrics = None,
+    sample_index: int = None,
 ) -> dict[str, str]:
+    judge_vendor, judge_tier = judge_name.split("_")
+    if metrics is not None:
+        metrics.task_started("judge", judge_vendor, judge_tier)
+
+    skip_reason = None
+    if deadline_reached():
+        skip_reason = DEADLINE_REACHED
+    elif budget is not None:
+        skip_reason = budget.skip_reason(judge_vendor)
+    if skip_reason is not None:
+        result = {"prompt_id": prompt_id, "judge_model": judge_name, "error": skip_reason, "mapping": {}}
+        if sample_index is not None:
+            result["sample_index"] = sample_index
+        if metrics is not None:
+            metrics.task_finished("judge", judge_vendor, judge_tier, result)
+        return result
+
     last_result: dict[str, str] | None = None
+    telemetry = None
+    output_tokens = max_output_tokens(judge_model.config, judge_model.model_name, "judging")
     for attempt in range(retries):
-        result = judge_prompt_answers(
-            prompt_id=prompt_id,
-            prompt_text=prompt_text,
-            answers=answers,
-            judge_model=judge_model,
-            judge_name=judge_name,
-            shuffle_seed=shuffle_seed,
-            verbose=verbose,
-            hint_mode=hint_mode,
-        )
-        if "error" not in result:
-            return result
+        with metered(budget, judge_vendor, judge_input_tokens(prompt_text, answers), output_tokens):
+            result = judge_prompt_answers(
+                prompt_id=prompt_id,
+                prompt_text=prompt_text,
+                answers=answers,
+                judge_model=judge_model,
+                judge_name=judge_name,
+                shuffle_seed=shuffle_seed,
+                verbose=verbose,
+                hint_mode=hint_mode,
+            )
+        # Failed attempts still cost tokens and time, so the returned record carries all of them.
+        telemetry = merge_envelopes(telemetry, result.get("telemetry"))
+        if telemetry is not None:
+            result["telemetry"] = telemetry
+        if "error" not in result or result.get("circuit_open") or result["error"].startswith(BUDGET_EXHAUSTED):
+            # An open circuit fails fast again until its cooldown is over, and a spent budget stays spent.
+            break
+        if deadline_reached():
+            result["error"] = DEADLINE_REACHED
+            break
         last_result = result
         if attempt < retries - 1:
             if verbose:
-                thread_safe_print(
+                log.warning(
                     f"  Retry {attempt + 1}/{retries} for {judge_name} on {prompt_id}: {result.get('error')}"
                 )
             time.sleep(retry_delay)
-    return (
-        last_result
-        if last_result is not None
-        else {"prompt_id": prompt_id, "judge_model": judge_name, "error": "Unknown error", "mapping": {}}
+    else:
+        result = (
+            last_result
+            if last_result is not None
+            else {"prompt_id": prompt_id, "judge_model": judge_name, "error": "Unknown error", "mapping": {}}
+        )
+
+    if sample_index is not None:
+        result["sample_index"] = sample_index
+    if metrics is not None:
+        metrics.task_finished("judge", judge_vendor, judge_tier, result)
+    return result
+
+
+def log_judgment(judgment: dict[str, str], judge_key: str, prompt_id: str) -> None:
+    fields = {"stage": "judge", "judge": judge_key, "prompt_id": prompt_id}
+    if "sample_index" in judgment:
+        fields["sample_index"] = judgment["sample_index"]
+        prompt_id = f"{prompt_id} (sample {judgment['sample_index']})"
+    if "error" in judgment:
+        log.warning(f"  ✗ {judge_key} → {prompt_id}: {judgment['error']}", extra=fields)
+    else:
+        top_label = judgment["ranking"][0]
+        top_answer = judgment["mapping"].get(top_label, top_label)
+        fields.update(top=top_answer, progress=True)
+        log.info(f"  ✓ {judge_key} → {prompt_id} (top: {top_answer})", extra=fields)
+
+
+def load_judge_models(model_factory: ModelFactory, judges: list[str]) -> dict[str, ModelWrapper]:
+    judge_models = {}
+    for judge_key in judges:
+        vendor, tier = judge_key.split("_")
+        judge_models[judge_key] = model_factory.get_model(vendor, tier)
+    return judge_models
+
+
+def resolve_judges(config: dict[str, str], judges: list[str] = None) -> list[str]:
+    if judges:
+        return judges
+    primary_judge = config.get("judges", {}).get("primary", "gemini_thinking")
+    additional_judges = config.get("judges", {}).get("additional", [])
+    return [primary_judge] + additional_judges
+
+
+def select_sample_sets(
+    prompt_answers: list[dict[str, str]], mode: str = "first", seed: int = 42
+) -> list[tuple[int | None, list[dict[str, str]]]]:
+    """
+    The answer sets one prompt is judged on, as (sample_index, answers) pairs with one answer per model.
+
+    Answers generated with `--samples` carry a `sample_index`. "first" judges each model's sample 0, "random"
+    one sample per model drawn with `seed` (reproducible per prompt), and "each" judges every sample index as
+    its own set, so per-sample judgments can be aggregated. Answers without samples form a single set.
+    """
+    if not any("sample_index" in answer for answer in prompt_answers):
+        return [(None, prompt_answers)]
+
+    by_model: dict[tuple[str, str], dict[int, dict[str, str]]] = {}
+    for answer in prompt_answers:
+        model_samples = by_model.setdefault((answer["model_vendor"], answer["model_tier"]), {})
+        model_samples[answer.get("sample_index", 0)] = answer
+
+    if mode == "each":
+        indices = sorted({index for model_samples in by_model.values() for index in model_samples})
+        return [
+            (index, [model_samples[index] for model_samples in by_model.values() if index in model_samples])
+            for index in indices
+        ]
+    if mode == "random":
+        rng = random.Random(f"{seed}:{prompt_answers[0]['prompt_id']}")
+        return [(None, [model_samples[rng.choice(sorted(model_samples))] for model_samples in by_model.values()])]
+    return [(None, [model_samples[min(model_samples)] for model_samples in by_model.values()])]
+
+
+def add_sample_mode_arguments(parser) -> None:
+    parser.add_argument(
+        "--samples-mode",
+        type=str,
+        default="first",
+        choices=SAMPLE_MODES,
+        help="For answers generated with --samples: judge each model's first sample, one random sample, or "
+        "every sample index as its own judgment (default: first)",
     )
 
 
+def judge_input_tokens(prompt_text: str, answers: list[dict[str, str]]) -> int:
+    """Estimated input tokens of one judgment of `answers` to `prompt_text`."""
+    answer_texts = "".join(a.get("answer_text", "") for a in answers)
+    return JUDGE_PROMPT_OVERHEAD_TOKENS + estimate_tokens(prompt_text + answer_texts)
+
+
+def plan_judge_tasks(
+    answers: list[dict[str, str]],
+    config: dict[str, str],
+    judges: list[str],
+    hint_modes: list[str],
+    samples_mode: str = "first",
+) -> list[dict]:
+    """The judging task matrix for a dry run, built from the config alone so no client is created."""
+    answers_by_prompt: dict[str, list[dict[str, str]]] = {}
+    for answer in answers:
+        answers_by_prompt.setdefault(answer["prompt_id"], []).append(answer)
+    shuffle_seed = config.get("judging", {}).get("shuffle_seed", 42)
+
+    tasks = []
+    for all_answers in answers_by_prompt.values():
+        for _, prompt_answers in select_sample_sets(all_answers, samples_mode, shuffle_seed):
+            input_tokens = judge_input_tokens(prompt_answers[0]["prompt_text"], prompt_answers)
+            category = prompt_answers[0].get("category")
+            for judge_key in judges:
+                vendor, tier = judge_key.split("_")
+                model_name = config.get("models", {}).get(vendor, {}).get(tier)
+                if not model_name:
+                    continue
+                for hint_mode in hint_modes:
+                    label = judge_key if len(hint_modes) == 1 else f"{judge_key}/{hint_mode}"
+                    tasks.append(
+                        {"label": label, "model": model_name, "input_tokens": input_tokens, "category": category}
+                    )
+    return tasks
+
+
 def judge_all_answers(
     answers: list[dict[str, str]],
     model_factory: ModelFactory,
@@ -193,7 +371,21 @@ def judge_all_answers(
     retries: int = 3,
     retry_delay: float = 1.0,
     hint_mode: str = "none",
+    aggregator: BiasAggregator = None,
+    live_every: int = 0,
+    budget: BudgetTracker = None,
+    metrics: RunMetrics = None,
+    samples_mode: str = "first",
+    latency_model: LatencyModel = None,
+    vendor_share: float = None,
 ) -> list[dict[str, str]]:
+    """
+    Judgments of every prompt's answers by every judge. With a `latency_model`, tasks start longest-predicted
+    first; `vendor_share` caps the workers one judge vendor holds (see TaskScheduler).
+    """
+    if aggregator is not None:
+        aggregator.add_answers(answers)
+
     answers_by_prompt = {}
     for answer in answers:
         prompt_id = answer["prompt_id"]
@@ -205,35 +397,39 @@ def judge_all_answers(
 
     print(f"Judging {len(answers_by_prompt)} prompts with {len(judges)} judge(s)")
 
-    judge_models = {}
-    for judge_key in judges:
-        vendor, tier = judge_key.split("_")
-        judge_models[judge_key] = model_factory.get_model(vendor, tier)
+    judge_models = load_judge_models(model_factory, judges)
 
     tasks = []
-    for prompt_id, prompt_answers in answers_by_prompt.items():
-        prompt_text = prompt_answers[0]["prompt_text"]
-        category = prompt_answers[0]["category"]
+    for prompt_id, all_answers in answers_by_prompt.items():
+        prompt_text = all_answers[0]["prompt_text"]
+        category = all_answers[0]["category"]
+        sample_sets = select_sample_sets(all_answers, samples_mode, shuffle_seed)
 
         if verbose:
             print(f"\n{'=' * 60}")
             print(f"Judging: {prompt_id} ({category})")
             print(f"Question: {prompt_text[:80]}...")
-            print(f"Answers: {len(prompt_answers)}")
-
-        for judge_key in judges:
-            if judge_models[judge_key] is not None:
-                tasks.append(
-                    {
-                        "prompt_id": prompt_id,
-                        "prompt_text": prompt_text,
-                        "answers": prompt_answers,
-                        "judge_key": judge_key,
-                        "judge_model": judge_models[judge_key],
-                    }
-                )
+            sets_note = f" in {len(sample_sets)} sample sets" if len(sample_sets) > 1 else ""
+            print(f"Answers: {len(all_answers)}{sets_note}")
+
+        for sample_index, prompt_answers in sample_sets:
+            for judge_key in judges:
+                if judge_models[judge_key] is not None:
+                    tasks.append(
+                        {
+                            "prompt_id": prompt_id,
+                            "prompt_text": prompt_text,
+                            "answers": prompt_answers,
+                            "judge_key": judge_key,
+                            "judge_model": judge_models[judge_key],
+                            "sample_index": sample_index,
+                            "category": category,
+                        }
+                    )
 
     total_tasks = len(tasks)
+    if metrics is not None:
+        metrics.add_planned("judge", total_tasks)
     if verbose:
         print(f"\nRunning {total_tasks} judgment tasks with {max_workers} concurrent workers...")
 
@@ -246,43 +442,62 @@ def judge_all_answers(
     if hint_mode != "none":
         print(f"Hint mode: {hint_mode}")
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        future_to_index = {
-            executor.submit(
-                judge_with_retries,
-                prompt_id=task["prompt_id"],
-                prompt_text=task["prompt_text"],
-                answers=task["answers"],
-                judge_model=task["judge_model"],
-                judge_name=task["judge_key"],
-                shuffle_seed=shuffle_seed,
-                verbose=verbose,
-                retries=retries,
-                retry_delay=retry_delay,
-                hint_mode=hint_mode,
-            ): idx
-            for idx, task in enumerate(tasks)
-        }
+    completed = 0
+
+    def on_judgment(scheduled: ScheduledTask, judgment: dict[str, str], exc: BaseException) -> None:
+        nonlocal completed
+        idx = scheduled.meta["index"]
+        task = tasks[idx]
+        if exc is not None:
+            log.error(f"  ✗ {task['judge_key']} → {task['prompt_id']} FAILED: {exc}")
+        else:
+            ordered_judgments[idx] = judgment
+            if aggregator is not None:
+                aggregator.update(judgment)
 
-        for future in as_completed(future_to_index):
-            idx = future_to_index[future]
-            task = tasks[idx]
-            try:
-                judgment = future.result()
-                ordered_judgments[idx] = judgment
-
-                if verbose:
-                    if "error" in judgment:
-                        thread_safe_print(f"  ✗ {task['judge_key']} → {task['prompt_id']}: {judgment['error']}")
-                    else:
-                        top_label = judgment["ranking"][0]
-                        top_answer = judgment["mapping"].get(top_label, top_label)
-                        thread_safe_print(f"  ✓ {task['judge_key']} → {task['prompt_id']} (top: {top_answer})")
-            except Exception as e:
-                thread_safe_print(f"  ✗ {task['judge_key']} → {task['prompt_id']} FAILED: {e}")
-            finally:
-                if pbar:
-                    pbar.update(1)
+            if verbose:
+                log_judgment(judgment, task["judge_key"], task["prompt_id"])
+        if pbar:
+            pbar.update(1)
+        completed += 1
+        if aggregator is not None and live_every and completed % live_every == 0:
+            log.info("\n".join(aggregator.progress_lines()))
+
+    scheduler = TaskScheduler(max_workers=max_workers, group_share=vendor_share)
+    for idx, task in enumerate(tasks):
+        priority = 0.0
+        if latency_model is not None:
+            priority = latency_model.predict(
+                task["judge_model"].model_name,
+                judge_input_tokens(task["prompt_text"], task["answers"]),
+                task["category"],
+            )
+        scheduler.add(
+            ScheduledTask(
+                judge_with_retries,
+                kwargs={
+                    "prompt_id": task["prompt_id"],
+                    "prompt_text": task["prompt_text"],
+                    "answers": task["answers"],
+                    "judge_model": task["judge_model"],
+                    "judge_name": task["judge_key"],
+                    "shuffle_seed": shuffle_seed,
+                    "verbose": verbose,
+                    "retries": retries,
+                    "retry_delay": retry_delay,
+                    "hint_mode": hint_mode,
+                    "budget": budget,
+                    "metrics": metrics,
+                    "sample_index": task["sample_index"],
+                },
+                stage="judge",
+                meta={"index": idx},
+                callback=on_judgment,
+                priority=priority,
+                group=task["judge_key"].split("_", 1)[0],
+            )
+        )
+    scheduler.run()
 
     if pbar:
         pbar.close()
@@ -298,7 +513,12 @@ def main():
     parser.add_argument("--judges", type=str, nargs="+", default=None)
     parser.add_argument("--limit", type=int, default=None)
     parser.add_argument("--verbose", action="store_true", default=True)
-    parser.add_argument("--workers", type=int, default=6, help="Number of concurrent judging workers (default: 4)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of concurrent judging workers (default: seeded by the preflight, else 6)",
+    )
     parser.add_argument("--retries", type=int, default=3, help="Number of retries per judgment task (default: 3)")
     parser.add_argument(
         "--retry-delay", type=float, default=1.0, help="Seconds to wait between retries (default: 1.0)"
@@ -310,6 +530,20 @@ def main():
         choices=["none", "self", "competitors", "full"],
         help="Hinting mode: none (blind), self (reveal own model), competitors (reveal others), full (reveal all)",
     )
+    parser.add_argument(
+        "--live-every",
+        type=int,
+        default=25,
+        help="Print live top-1 rates every N completed judgments, 0 to disable (default: 25)",
+    )
+    add_sample_mode_arguments(parser)
+    add_planner_arguments(parser)
+    add_logging_arguments(parser)
+    add_metrics_arguments(parser)
+    add_deadline_arguments(parser)
+    add_preflight_arguments(parser)
+    add_fairness_arguments(parser)
+    add_instrumentation_arguments(parser)
 
     args = parser.parse_args()
 
@@ -319,12 +553,7 @@ def main():
     print(f"Loading answers from {args.answers}...")
     answers = load_json(args.answers)
 
-    if args.judges:
-        judges = args.judges
-    else:
-        primary_judge = config.get("judges", {}).get("primary", "gemini_thinking")
-        additional_judges = config.get("judges", {}).get("additional", [])
-        judges = [primary_judge] + additional_judges
+    judges = resolve_judges(config, args.judges)
 
     print(f"Using judges: {', '.join(judges)}")
 
@@ -339,24 +568,23 @@ def main():
 
     print(f"Loaded {len(answers)} answers")
 
+    if args.dry_run:
+        tasks = plan_judge_tasks(answers, config, judges, [hint_mode], args.samples_mode)
+        print("\n" + plan_report(tasks, config, args.history, args.workers or DEFAULT_WORKERS, "Judging"))
+        return
+
     print("\nInitializing model factory...")
     model_factory = ModelFactory(config)
+    judges, seeded_workers = run_preflight(model_factory, args.preflight, generation=False, judges=judges)
+    workers = args.workers or seeded_workers or DEFAULT_WORKERS
+    seeded_note = " (seeded by the preflight)" if not args.workers and seeded_workers else ""
+    print(f"\nConcurrent workers: {workers}{seeded_note}")
 
     print("\n" + "=" * 60)
     print("STARTING JUDGING PROCESS")
     print("=" * 60)
 
-    judgments = judge_all_answers(
-        answers=answers,
-        model_factory=model_factory,
-        config=config,
-        judges=judges,
-        verbose=args.verbose,
-        max_workers=args.workers,
-        retries=args.retries,
-        retry_delay=args.retry_delay,
-        hint_mode=hint_mode,
-    )
+    aggregator = BiasAggregator()
 
     if args.output is None:
         timestamp = generate_timestamp()
@@ -364,8 +592,35 @@ def main():
     else:
         output_path = args.output
 
-    print(f"\nSaving {len(judgments)} judgments to {output_path}")
-    save_json(judgments, output_path)
+    latency_model = LatencyModel.from_paths(args.history) if args.history else None
+    budget = BudgetTracker.from_config(config)
+    metrics = serve_run_metrics(args.metrics_port)
+    with (
+        run_logging(args.log_level, args.log_json, args.progress_interval),
+        instrumented_run(args.trace, args.trace_format, args.profile, args.profile_interval),
+        run_deadline(args.deadline),
+    ):
+        judgments = judge_all_answers(
+            answers=answers,
+            model_factory=model_factory,
+            config=config,
+            judges=judges,
+            verbose=args.verbose,
+            max_workers=workers,
+            retries=args.retries,
+            retry_delay=args.retry_delay,
+            hint_mode=hint_mode,
+            aggregator=aggregator,
+            live_every=args.live_every,
+            budget=budget,
+            metrics=metrics,
+            samples_mode=args.samples_mode,
+            latency_model=latency_model,
+            vendor_share=args.vendor_share,
+        )
+
+        print(f"\nSaving {len(judgments)} judgments to {output_path}")
+        save_json(judgments, output_path)
 
     print("\n" + "=" * 60)
     print("SUMMARY")
@@ -386,6 +641,17 @@ def main():
 
     if errors > 0:
         print(f"\n⚠ Errors: {errors} judgments failed")
+    pending = sum(1 for judgment in judgments if judgment.get("error") == DEADLINE_REACHED)
+    if pending:
+        print(f"⚠ Deadline reached: {pending} judgment(s) pending; utils/regenerate_failed_judgments.py resumes them")
+
+    print("\n" + telemetry_report(judgments, judgment_group, "Usage by judge"))
+    if budget is not None:
+        print("\n" + budget.report())
+    if model_factory.breakers is not None:
+        print("\n" + model_factory.breakers.report())
+
+    print("\n" + aggregator.report())
 
     print(f"\n✓ Done! Judgments saved to: {output_path}")
 
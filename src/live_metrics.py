@@ -0,0 +1,181 @@
+import math
+import threading
+from typing import Any
+
+
+class BiasAggregator:
+    """
+    Running per judge x vendor x tier counters for top-1 picks and scores.
+
+    Each completed judgment is folded in with a constant amount of work (one update per label), so rates,
+    means and standard deviations are available at any point during a run without re-reading the output
+    files. The tables it produces mirror `calculate_top1_preference` / `calculate_average_scores`.
+    """
+
+    VENDORS = ("claude", "gpt", "gemini")
+
+    def __init__(self, answers: list[dict[str, Any]] = None):
+        self._lock = threading.Lock()
+        self._answer_meta: dict[str, tuple[str, str]] = {}
+        # (judge, vendor, tier) -> [top1_count, score_count, score_sum, score_sumsq]
+        self._cells: dict[tuple[str, str, str], list[float]] = {}
+        self._judgments: dict[str, int] = {}
+        self._errors: dict[str, int] = {}
+        if answers:
+            self.add_answers(answers)
+
+    def add_answers(self, answers: list[dict[str, Any]]) -> None:
+        with self._lock:
+            for answer in answers:
+                self._answer_meta[answer["answer_id"]] = (answer["model_vendor"], answer["model_tier"])
+
+    def update(self, judgment: dict[str, Any]) -> None:
+        judge = judgment.get("judge_model")
+        with self._lock:
+            if "error" in judgment:
+                self._errors[judge] = self._errors.get(judge, 0) + 1
+                return
+
+            mapping = judgment["mapping"]
+            scores = judgment["scores"]
+            counted = False
+            for rank_idx, label in enumerate(judgment["ranking"]):
+                meta = self._answer_meta.get(mapping.get(label))
+                if meta is None:
+                    continue
+                cell = self._cells.setdefault((judge, *meta), [0, 0, 0.0, 0.0])
+                score = float(scores[label])
+                cell[0] += rank_idx == 0
+                cell[1] += 1
+                cell[2] += score
+                cell[3] += score * score
+                counted = True
+            if counted:
+                self._judgments[judge] = self._judgments.get(judge, 0) + 1
+
+    def judges(self) -> list[str]:
+        with self._lock:
+            return sorted(self._judgments)
+
+    def _vendors(self) -> list[str]:
+        extra = sorted({vendor for _, vendor, _ in self._cells} - set(self.VENDORS))
+        return list(self.VENDORS) + extra
+
+    def _top1_counts(self, judge: str = None) -> dict[str, int]:
+        # Caller holds self._lock.
+        counts = {vendor: 0 for vendor in self._vendors()}
+        for (cell_judge, vendor, _), cell in self._cells.items():
+            if judge is None or cell_judge == judge:
+                counts[vendor] += cell[0]
+        return counts
+
+    def top1_counts(self, judge: str = None) -> dict[str, int]:
+        with self._lock:
+            return self._top1_counts(judge)
+
+    def top1_preference(self, judge: str = None):
+        import pandas as pd
+
+        counts = self.top1_counts(judge)
+        total = sum(counts.values())
+        return pd.DataFrame(
+            [
+                {
+                    "vendor": vendor,
+                    "top1_count": count,
+                    "top1_percentage": (count / total * 100) if total > 0 else 0,
+                    "total_judgments": total,
+                }
+                for vendor, count in counts.items()
+            ]
+        )
+
+    def average_scores(self, judge: str = None):
+        import pandas as pd
+
+        pooled: dict[tuple[str, str], list[float]] = {}
+        with self._lock:
+            for (cell_judge, vendor, tier), cell in self._cells.items():
+                if judge is None or cell_judge == judge:
+                    acc = pooled.setdefault((vendor, tier), [0, 0.0, 0.0])
+                    acc[0] += cell[1]
+                    acc[1] += cell[2]
+                    acc[2] += cell[3]
+
+        rows = []
+        for (vendor, tier), (count, total, sumsq) in sorted(pooled.items()):
+            mean = total / count if count else math.nan
+            # Sample standard deviation, matching pandas' default used by calculate_average_scores.
+            var = (sumsq - total * total / count) / (count - 1) if count > 1 else math.nan
+            rows.append(
+                {
+                    "vendor": vendor,
+                    "tier": tier,
+                    "mean_score": mean,
+                    "std_score": math.sqrt(max(var, 0.0)) if count > 1 else math.nan,
+                    "count": count,
+                }
+            )
+        return pd.DataFrame(rows, columns=["vendor", "tier", "mean_score", "std_score", "count"])
+
+    def self_bias(self) -> dict[str, dict[str, float]]:
+        # For every judge, its rate of ranking its own vendor #1 versus the other judges' average for that vendor.
+        rates = {}
+        for judge in self.judges():
+            counts = self.top1_counts(judge)
+            total = sum(counts.values())
+            rates[judge] = {vendor: count / total for vendor, count in counts.items()} if total else {}
+
+        results = {}
+        for judge, judge_rates in rates.items():
+            vendor = judge.split("_")[0]
+            if vendor not in judge_rates:
+                continue
+            other_rates = [r[vendor] for j, r in rates.items() if j != judge and vendor in r]
+            other_avg = sum(other_rates) / len(other_rates) if other_rates else math.nan
+            results[judge] = {
+                "vendor": vendor,
+                "self_rate": judge_rates[vendor],
+                "other_judges_avg_rate": other_avg,
+                "bias_difference": judge_rates[vendor] - other_avg,
+            }
+        return results
+
+    def progress_lines(self) -> list[str]:
+        # One snapshot under the lock, so counts and errors of a line come from the same moment.
+        with self._lock:
+            snapshot = [
+                (judge, self._top1_counts(judge), self._errors.get(judge, 0)) for judge in sorted(self._judgments)
+            ]
+        lines = []
+        for judge, counts, errors in snapshot:
+            total = sum(counts.values())
+            rates = ", ".join(f"{vendor} {count / total * 100:.0f}%" for vendor, count in counts.items() if total)
+            suffix = f", {errors} error(s)" if errors else ""
+            lines.append(f"  [live] {judge} top-1 over {total}: {rates}{suffix}")
+        return lines
+
+    def report(self) -> str:
+        report = ["-" * 70, "LIVE BIAS METRICS", "-" * 70]
+        for judge in self.judges():
+            report.append(f"\n{judge} ({self._judgments[judge]} judgments)")
+            for _, row in self.top1_preference(judge).iterrows():
+                report.append(
+                    f"  {row['vendor'].capitalize():10} {row['top1_percentage']:6.2f}% "
+                    f"({row['top1_count']}/{row['total_judgments']})"
+                )
+            for _, row in self.average_scores(judge).iterrows():
+                report.append(
+                    f"  {row['vendor'].capitalize():10} ({row['tier']:8}): "
+                    f"{row['mean_score']:.2f} ± {row['std_score']:.2f}"
+                )
+
+        bias = self.self_bias()
+        if bias:
+            report.append("\nSelf-bias (own vendor #1 rate vs other judges' average):")
+            for judge, entry in bias.items():
+                report.append(
+                    f"  {judge:20} {entry['self_rate'] * 100:6.2f}% vs {entry['other_judges_avg_rate'] * 100:6.2f}% "
+                    f"({entry['bias_difference'] * 100:+.2f} pp)"
+                )
+        return "\n".join(report)
@@ -1,25 +1,325 @@
+import importlib
 import os
+import threading
 import time
-from typing import Any, Type
+from typing import TYPE_CHECKING, Any, Callable, Type
 import json
-import google.genai as genai
-from anthropic import Anthropic
-from openai import OpenAI
 from pydantic import BaseModel
 
+from src.batching import MicroBatcher
+from src.budget import BudgetExhausted, reserve_request, settle_request
+from src.circuit_breaker import BreakerRegistry, CircuitOpenError, counts_as_failure
+from src.deadline import DeadlineExceeded, call_timeout, deadline_reached, time_left
+from src.run_logging import get_logger
+from src.telemetry import TOKEN_FIELDS, merge_envelopes, new_envelope
+from src.tracing import span, traced
+
+log = get_logger("models")
+
+# Vendor SDKs take seconds to import, so each wrapper imports its own SDK when it is first instantiated.
+if TYPE_CHECKING:
+    import google.genai as genai
+
+
+def _usage_count(obj: Any, *path: str) -> int:
+    for name in path:
+        obj = getattr(obj, name, None)
+        if obj is None:
+            return 0
+    return int(obj)
+
+
+def _anthropic_usage(response: Any) -> dict[str, Any]:
+    usage = getattr(response, "usage", None)
+    return {
+        "input_tokens": _usage_count(usage, "input_tokens"),
+        "output_tokens": _usage_count(usage, "output_tokens"),
+        "cached_tokens": _usage_count(usage, "cache_read_input_tokens"),
+        # Extended thinking is billed as output tokens and not reported separately.
+        "reasoning_tokens": 0,
+        "finish_reason": getattr(response, "stop_reason", None),
+    }
+
+
+def _chat_usage(response: Any) -> dict[str, Any]:
+    usage = getattr(response, "usage", None)
+    choices = getattr(response, "choices", None)
+    return {
+        "input_tokens": _usage_count(usage, "prompt_tokens"),
+        "output_tokens": _usage_count(usage, "completion_tokens"),
+        "cached_tokens": _usage_count(usage, "prompt_tokens_details", "cached_tokens"),
+        "reasoning_tokens": _usage_count(usage, "completion_tokens_details", "reasoning_tokens"),
+        "finish_reason": choices[0].finish_reason if choices else None,
+    }
+
+
+def _responses_usage(response: Any) -> dict[str, Any]:
+    usage = getattr(response, "usage", None)
+    incomplete = getattr(response, "incomplete_details", None)
+    return {
+        "input_tokens": _usage_count(usage, "input_tokens"),
+        "output_tokens": _usage_count(usage, "output_tokens"),
+        "cached_tokens": _usage_count(usage, "input_tokens_details", "cached_tokens"),
+        "reasoning_tokens": _usage_count(usage, "output_tokens_details", "reasoning_tokens"),
+        "finish_reason": getattr(incomplete, "reason", None) or getattr(response, "status", None),
+    }
+
+
+def _gemini_usage(response: Any) -> dict[str, Any]:
+    usage = getattr(response, "usage_metadata", None)
+    candidates = getattr(response, "candidates", None)
+    return {
+        "input_tokens": _usage_count(usage, "prompt_token_count"),
+        "output_tokens": _usage_count(usage, "candidates_token_count"),
+        "cached_tokens": _usage_count(usage, "cached_content_token_count"),
+        "reasoning_tokens": _usage_count(usage, "thoughts_token_count"),
+        "finish_reason": candidates[0].finish_reason if candidates else None,
+    }
+
+
+# Request routes are "<provider>.<api>"; the API part selects how usage is read off the response.
+USAGE_PARSERS = {
+    "messages": _anthropic_usage,
+    "chat": _chat_usage,
+    "responses": _responses_usage,
+    "generate_content": _gemini_usage,
+}
+
+# Thinking budgets for providers that take a token budget rather than an effort level.
+EFFORT_BUDGETS = {"none": 0, "minimal": 1024, "low": 2048, "medium": 8192, "high": 24576}
+# Gemini 3 thinking levels per effort; it cannot turn thinking off, so "none" gets the lowest level.
+GEMINI_THINKING_LEVELS = {"none": "LOW", "minimal": "LOW", "low": "LOW", "medium": "HIGH", "high": "HIGH"}
+
+
+def reasoning_settings(config: dict[str, Any], model_name: str, stage: str = "generation") -> dict[str, Any]:
+    """
+    Reasoning settings of `model_name` for a stage ("generation" or "judging"), keyed by model name:
+
+        generation:
+          reasoning:
+            openai/gpt-5.2: {effort: medium}                     # none / minimal / low / medium / high
+            claude-sonnet-4-5: {budget_tokens: 4096}             # thinking tokens; 0 turns thinking off
+            google/gemini-3-pro-preview: {effort: high, include_thoughts: true}
+        judging:
+          reasoning:                                             # overrides the generation entry per key
+            openai/gpt-5.2: {effort: low}
+
+    `include_thoughts` stores the thoughts or thought summaries the provider returns in the call's telemetry.
+    """
+    settings = dict((config.get("generation", {}).get("reasoning") or {}).get(model_name) or {})
+    if stage != "generation":
+        settings.update((config.get(stage, {}).get("reasoning") or {}).get(model_name) or {})
+    effort = settings.get("effort")
+    if effort is not None and effort not in EFFORT_BUDGETS:
+        raise ValueError(f"Unknown reasoning effort for {model_name}: {effort!r} (one of {', '.join(EFFORT_BUDGETS)})")
+    return settings
+
+
+def thinking_budget(reasoning: dict[str, Any]) -> int | None:
+    """Thinking tokens for `reasoning`: its `budget_tokens`, else the budget of its effort, else None."""
+    if reasoning.get("budget_tokens") is not None:
+        return int(reasoning["budget_tokens"])
+    if reasoning.get("effort") is not None:
+        return EFFORT_BUDGETS[reasoning["effort"]]
+    return None
+
+
+def _openrouter_reasoning(reasoning: dict[str, Any]) -> dict[str, Any] | None:
+    """OpenRouter's unified `reasoning` request field, which it maps onto each upstream provider."""
+    if not reasoning:
+        return None
+    body = {"exclude": not reasoning.get("include_thoughts", False)}
+    if reasoning.get("budget_tokens") is not None:
+        body["max_tokens"] = int(reasoning["budget_tokens"])
+    elif reasoning.get("effort") is not None:
+        body["effort"] = reasoning["effort"]
+    return body
+
+
+def _retry_delay(exc: BaseException, attempt: int) -> float:
+    """Seconds before retrying after `exc`: its Retry-After header, else exponential backoff from 0.5s to 8s."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return min(float(headers.get("retry-after")), 60.0)
+    except (TypeError, ValueError):
+        return min(0.5 * 2**attempt, 8.0)
+
 
 class ModelWrapper:
-    def __init__(self, api_key: str, model_name: str, config: dict[str, Any]):
+    # Retries of transient errors (see `counts_as_failure`) by `_request`. Wrappers build their SDK clients
+    # without retries of their own, so every attempt checks the deadline, reserves budget and hits the breaker.
+    request_retries = 0
+
+    def __init__(self, api_key: str, model_name: str, config: dict[str, Any], provider: dict[str, Any] = None):
         self.api_key = api_key
         self.model_name = model_name
         self.config = config
+        # The resolved `providers:` entry this wrapper was created from (see ModelFactory).
+        self.provider = provider or {}
         self.timeout = config.get("generation", {}).get("timeout", 60)
+        # Optional per-provider endpoint overrides, e.g. local mock servers or proxies.
+        self.base_urls = config.get("base_urls") or {}
+        # Wrappers are shared across worker threads, so each thread records its own call envelope.
+        self._local = threading.local()
+        # Set by ModelFactory: per-route circuit breakers, and how to build the wrapper failed over to.
+        self.breakers: BreakerRegistry = None
+        self.fallback_factory: Callable[[], "ModelWrapper"] = None
+        self._fallback: ModelWrapper = None
+        self._fallback_lock = threading.Lock()
+
+    def _base_url(self, name: str, default: str = None) -> str:
+        """The provider's own `base_url`, else the `base_urls` override for `name`, else `default`."""
+        return self.provider.get("base_url") or self.base_urls.get(name, default)
 
     def generate(
         self, prompt: str, system_prompt: str = None, response_model: Type[BaseModel] = None, **kwargs
     ) -> Any:
         raise NotImplementedError
 
+    def supports_n(self) -> bool:
+        """Whether `generate_n` gets several completions of one prompt from a single request (`n`)."""
+        return False
+
+    def generate_n(self, prompt: str, n: int, system_prompt: str = None, **kwargs) -> list[str]:
+        """`n` independent text completions of `prompt` from one request; only when `supports_n()`."""
+        raise NotImplementedError(f"{type(self).__name__} does not support n completions per request")
+
+    def generate_with_metadata(
+        self, prompt: str, system_prompt: str = None, response_model: Type[BaseModel] = None, **kwargs
+    ) -> tuple[Any, dict[str, Any]]:
+        """`generate`, plus the token usage, latency, attempts, route and finish reason of the call."""
+        return self._metered(
+            "generate",
+            {"structured": response_model is not None},
+            prompt,
+            system_prompt=system_prompt,
+            response_model=response_model,
+            **kwargs,
+        )
+
+    def generate_n_with_metadata(
+        self, prompt: str, n: int, system_prompt: str = None, **kwargs
+    ) -> tuple[list[str], dict[str, Any]]:
+        """`generate_n`, plus one envelope for the whole request (see `telemetry.split_envelope`)."""
+        return self._metered("generate_n", {"n": n}, prompt, n, system_prompt=system_prompt, **kwargs)
+
+    def _metered(self, method: str, span_attributes: dict[str, Any], *args, **kwargs) -> tuple[Any, dict[str, Any]]:
+        """Run `method` in a fresh call envelope; if its route's circuit is open, run it on the fallback instead."""
+        self._local.envelope = new_envelope(self.model_name)
+        reasoning = self._reasoning(kwargs)
+        if reasoning:
+            # Recorded with the usage so latency and reasoning tokens can be compared across settings.
+            self._local.envelope["reasoning"] = kwargs["reasoning"] = reasoning
+            span_attributes = {**span_attributes, **{f"reasoning.{k}": v for k, v in reasoning.items()}}
+        start = time.perf_counter()
+        try:
+            with span("model.generate", model=self.model_name, **span_attributes):
+                try:
+                    result = getattr(self, method)(*args, **kwargs)
+                except CircuitOpenError:
+                    fallback = self._fallback_wrapper()
+                    if fallback is None:
+                        raise
+                    log.debug(f"Circuit open for {self.model_name}, failing over to {fallback.model_name}")
+                    try:
+                        result, _ = getattr(fallback, f"{method}_with_metadata")(*args, **kwargs)
+                    finally:
+                        self._local.envelope = merge_envelopes(self._local.envelope, fallback.last_call_metadata())
+        finally:
+            self._local.envelope["latency_s"] = round(time.perf_counter() - start, 4)
+        return result, self.last_call_metadata()
+
+    def _fallback_wrapper(self) -> "ModelWrapper | None":
+        # Built on first failover, so an unused fallback never imports its SDK or needs its key.
+        if self.fallback_factory is None:
+            return None
+        with self._fallback_lock:
+            if self._fallback is None:
+                self._fallback = self.fallback_factory()
+            return self._fallback
+
+    def last_call_metadata(self) -> dict[str, Any]:
+        """Envelope of this thread's most recent `generate_with_metadata` call, also when it raised."""
+        return dict(getattr(self._local, "envelope", None) or new_envelope(self.model_name))
+
+    def _reasoning(self, kwargs: dict[str, Any]) -> dict[str, Any]:
+        """The call's `reasoning=` settings, else this model's `generation.reasoning` entry."""
+        if kwargs.get("reasoning") is not None:
+            return kwargs["reasoning"]
+        return reasoning_settings(self.config, self.model_name)
+
+    def _record_thoughts(self, reasoning: dict[str, Any], thoughts: str) -> None:
+        """Keep the thoughts a provider returned on the call envelope, if `include_thoughts` asked for them."""
+        if reasoning.get("include_thoughts") and thoughts:
+            envelope = getattr(self._local, "envelope", None)
+            if envelope is not None:
+                envelope["thoughts"] = thoughts
+
+    def _request(self, route: str, call: Callable[..., Any], **kwargs) -> Any:
+        """Send one provider request, retrying transient errors, and fold its usage into the current call envelope."""
+        for attempt in range(self.request_retries + 1):
+            try:
+                return self._attempt(route, call, kwargs)
+            except (CircuitOpenError, BudgetExhausted, DeadlineExceeded):
+                raise
+            except Exception as e:
+                if attempt == self.request_retries or not counts_as_failure(e) or deadline_reached():
+                    raise
+                delay = _retry_delay(e, attempt)
+                remaining = time_left()
+                # The next attempt raises DeadlineExceeded if the deadline passes during the wait.
+                time.sleep(delay if remaining is None else max(min(delay, remaining), 0.0))
+
+    def _attempt(self, route: str, call: Callable[..., Any], kwargs: dict[str, Any]) -> Any:
+        # Raises DeadlineExceeded, before anything is sent, once the run's deadline has passed.
+        kwargs = self._with_timeout(kwargs, call_timeout(self.timeout))
+        envelope = getattr(self._local, "envelope", None)
+        if envelope is None:
+            envelope = self._local.envelope = new_envelope(self.model_name)
+        # Every request, retries included, reserves its own worst case if the task is metered by a budget.
+        reservation = reserve_request(self.model_name)
+        usage = None
+        try:
+            breaker = None
+            if self.breakers is not None:
+                breaker = self.breakers.get(self.provider.get("vendor", ""), route, self.model_name)
+                breaker.before_request()
+            envelope["route"] = route
+            envelope["attempts"] += 1
+            with span("provider.request", route=route, model=self.model_name, attempt=envelope["attempts"]):
+                try:
+                    response = call(**kwargs)
+                except Exception as e:
+                    if breaker is not None and deadline_reached():
+                        # Cut off by the run's own deadline, which says nothing about the route.
+                        breaker.release()
+                    elif breaker is not None:
+                        breaker.record(not counts_as_failure(e))
+                    raise
+            if breaker is not None:
+                breaker.record(True)
+            usage = USAGE_PARSERS[route.split(".", 1)[1]](response)
+        finally:
+            settle_request(reservation, self.model_name, {"route": route, **usage} if usage else None)
+
+        for field in TOKEN_FIELDS:
+            envelope[field] += usage[field]
+        finish_reason = usage["finish_reason"]
+        if finish_reason is not None:
+            # Gemini reports an enum member; the other SDKs report plain strings.
+            envelope["finish_reason"] = str(getattr(finish_reason, "name", finish_reason))
+        return response
+
+    def _with_timeout(self, request_kwargs: dict[str, Any], timeout: float) -> dict[str, Any]:
+        """The request's kwargs with a per-request timeout; the Anthropic and OpenAI SDKs take `timeout=`."""
+        return {**request_kwargs, "timeout": timeout}
+
+    @staticmethod
+    def _message_text(message_content: Any) -> str:
+        if isinstance(message_content, list):
+            return "".join(getattr(part, "text", "") for part in message_content)
+        return message_content or ""
+
     @staticmethod
     def _patch_json_schema_for_openai(schema: dict[str, Any]) -> dict[str, Any]:
         """
@@ -91,19 +391,39 @@ class ModelWrapper:
             raise
 
 
+WRAPPERS: dict[str, type[ModelWrapper]] = {}
+
+
+def register_wrapper(name: str):
+    """Class decorator making a ModelWrapper available as `wrapper: <name>` in the config's `providers:`."""
+
+    def decorator(cls: type[ModelWrapper]) -> type[ModelWrapper]:
+        WRAPPERS[name] = cls
+        return cls
+
+    return decorator
+
+
+@register_wrapper("anthropic")
 class ClaudeWrapper(ModelWrapper):
+    request_retries = 2  # the Anthropic SDK's default
     # https://platform.claude.com/docs/en/build-with-claude/structured-outputs
     STRUCTURED_OUTPUTS_BETA = ["structured-outputs-2025-11-13"]
 
-    def __init__(self, api_key: str, model_name: str, config: dict[str, Any]):
-        super().__init__(api_key, model_name, config)
-        self.client = Anthropic(api_key=api_key)
+    def __init__(self, api_key: str, model_name: str, config: dict[str, Any], provider: dict[str, Any] = None):
+        super().__init__(api_key, model_name, config, provider)
+        from anthropic import Anthropic
+
+        base_url = self._base_url("anthropic")
+        self.client = Anthropic(api_key=api_key, base_url=base_url, timeout=self.timeout, max_retries=0)
 
     def generate(
         self, prompt: str, system_prompt: str = None, response_model: Type[BaseModel] = None, **kwargs
     ) -> Any:
         temperature = kwargs.get("temperature", self.config.get("generation", {}).get("temperature", 0.7))
         max_tokens = kwargs.get("max_tokens", self.config.get("generation", {}).get("max_tokens", 2048))
+        reasoning = self._reasoning(kwargs)
+        budget_tokens = thinking_budget(reasoning)
 
         kwargs = {
             "model": self.model_name,
@@ -113,33 +433,54 @@ class ClaudeWrapper(ModelWrapper):
         }
         if system_prompt is not None:
             kwargs["system"] = system_prompt
+        if budget_tokens:
+            # Thinking tokens count against max_tokens, and extended thinking rejects a non-default temperature.
+            kwargs["thinking"] = {"type": "enabled", "budget_tokens": budget_tokens}
+            kwargs["max_tokens"] = max_tokens + budget_tokens
+            del kwargs["temperature"]
         try:
             if response_model is not None:
                 try:
                     kwargs.update({"betas": self.STRUCTURED_OUTPUTS_BETA, "output_format": response_model})
-                    response = self.client.beta.messages.parse(**kwargs)
+                    response = self._request("anthropic.messages", self.client.beta.messages.parse, **kwargs)
+                    self._record_thoughts(reasoning, self._thinking_text(response))
                     return self._coerce_structured_response(response.parsed_output, response_model)
+                except (CircuitOpenError, BudgetExhausted):
+                    raise
                 except Exception as structured_error:
-                    print(f"Structured Claude output failed ({self.model_name}): {structured_error}")
+                    log.warning(f"Structured Claude output failed ({self.model_name}): {structured_error}")
                     raise
 
-            response = self.client.messages.create(**kwargs)
-            result = response.content[0].text
+            response = self._request("anthropic.messages", self.client.messages.create, **kwargs)
+            self._record_thoughts(reasoning, self._thinking_text(response))
+            # With thinking enabled, thinking blocks come before the text.
+            result = "".join(block.text for block in response.content if block.type == "text")
             return result
+        except (CircuitOpenError, BudgetExhausted):
+            raise
         except Exception as e:
-            print(f"Error calling Claude API: {e}")
+            log.warning(f"Error calling Claude API: {e}")
             raise
 
+    @staticmethod
+    def _thinking_text(response: Any) -> str:
+        return "".join(getattr(block, "thinking", "") for block in response.content if block.type == "thinking")
 
+
+@register_wrapper("openai")
 class GPTWrapper(ModelWrapper):
-    def __init__(self, api_key: str, model_name: str, config: dict[str, Any]):
-        super().__init__(api_key, model_name, config)
-        openai_models = config.get("models")["gpt"]
+    request_retries = 2  # the OpenAI SDK's default
+    def __init__(self, api_key: str, model_name: str, config: dict[str, Any], provider: dict[str, Any] = None):
+        super().__init__(api_key, model_name, config, provider)
+        openai_models = config.get("models")[self.provider.get("vendor", "gpt")]
         self.use_openrouter_for_openai = all(openai_models[tier].startswith("openai/") for tier in openai_models)
+        from openai import OpenAI
 
-        self.client = OpenAI(
-            api_key=api_key, base_url="https://openrouter.ai/api/v1" if self.use_openrouter_for_openai else None
-        )
+        if self.use_openrouter_for_openai:
+            base_url = self._base_url("openrouter", "https://openrouter.ai/api/v1")
+        else:
+            base_url = self._base_url("openai")
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=self.timeout, max_retries=0)
 
     @staticmethod
     def _build_messages(system_prompt: str, prompt: str) -> list[dict[str, str]]:
@@ -150,26 +491,44 @@ class GPTWrapper(ModelWrapper):
         return messages
 
     def _call_native_openai(
-        self, messages: list[dict[str, str]], temperature: float, max_tokens: int, response_model: Type[BaseModel]
+        self,
+        messages: list[dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        response_model: Type[BaseModel],
+        reasoning: dict[str, Any] = None,
     ) -> Any:
         is_gpt5 = "gpt-5" in self.model_name
         request_kwargs = {"model": self.model_name, "messages": messages}
         if not is_gpt5:
             request_kwargs["temperature"] = temperature
+        # OpenAI takes an effort level only; `budget_tokens` has no equivalent here.
+        reasoning = reasoning or {}
+        effort = reasoning.get("effort")
 
         if response_model is not None:
             try:
                 request_kwargs["max_output_tokens"] = max_tokens
                 request_kwargs["text_format"] = response_model
                 request_kwargs["input"] = request_kwargs.pop("messages")
-                response = self.client.responses.parse(**request_kwargs)
+                options = {"effort": effort} if effort is not None else {}
+                if reasoning.get("include_thoughts"):
+                    options["summary"] = "auto"
+                if options:
+                    request_kwargs["reasoning"] = options
+                response = self._request("openai.responses", self.client.responses.parse, **request_kwargs)
+                self._record_thoughts(reasoning, self._reasoning_summary(response))
                 return self._coerce_structured_response(response.output_parsed, response_model)
+            except (CircuitOpenError, BudgetExhausted):
+                raise
             except Exception as structured_error:
-                print(f"Structured OpenAI output failed ({self.model_name}): {structured_error}")
+                log.warning(f"Structured OpenAI output failed ({self.model_name}): {structured_error}")
                 raise
 
         request_kwargs["max_completion_tokens"] = max_tokens
-        response = self.client.chat.completions.create(**request_kwargs)
+        if effort is not None:
+            request_kwargs["reasoning_effort"] = effort
+        response = self._request("openai.chat", self.client.chat.completions.create, **request_kwargs)
         message_content = response.choices[0].message.content
         if isinstance(message_content, list):
             text = "".join(getattr(part, "text", "") for part in message_content)
@@ -177,15 +536,49 @@ class GPTWrapper(ModelWrapper):
             text = message_content or ""
         return text
 
+    @staticmethod
+    def _reasoning_summary(response: Any) -> str:
+        # Chat completions never return reasoning; the Responses API returns summaries when asked for them.
+        return "\n\n".join(
+            part.text
+            for item in getattr(response, "output", None) or []
+            if item.type == "reasoning"
+            for part in getattr(item, "summary", None) or []
+        )
+
+    def supports_n(self) -> bool:
+        # OpenRouter forwards `n` to some upstream providers and silently drops it for others.
+        return not self.use_openrouter_for_openai
+
+    def generate_n(self, prompt: str, n: int, system_prompt: str = None, **kwargs) -> list[str]:
+        if not self.supports_n():
+            return super().generate_n(prompt, n, system_prompt=system_prompt, **kwargs)
+        temperature = kwargs.get("temperature", self.config.get("generation", {}).get("temperature", 0.7))
+        max_tokens = kwargs.get("max_tokens", self.config.get("generation", {}).get("max_tokens", 2048))
+        request_kwargs = {
+            "model": self.model_name,
+            "messages": self._build_messages(system_prompt, prompt),
+            "max_completion_tokens": max_tokens,
+            "n": n,
+        }
+        if "gpt-5" not in self.model_name:
+            request_kwargs["temperature"] = temperature
+        effort = self._reasoning(kwargs).get("effort")
+        if effort is not None:
+            request_kwargs["reasoning_effort"] = effort
+        response = self._request("openai.chat", self.client.chat.completions.create, **request_kwargs)
+        return [self._message_text(choice.message.content) for choice in response.choices]
+
     def generate(
         self, prompt: str, system_prompt: str = None, response_model: Type[BaseModel] = None, **kwargs
     ) -> Any:
         temperature = kwargs.get("temperature", self.config.get("generation", {}).get("temperature", 0.7))
         max_tokens = kwargs.get("max_tokens", self.config.get("generation", {}).get("max_tokens", 2048))
         messages = self._build_messages(system_prompt, prompt)
+        reasoning = self._reasoning(kwargs)
 
         if not self.use_openrouter_for_openai:
-            return self._call_native_openai(messages, temperature, max_tokens, response_model)
+            return self._call_native_openai(messages, temperature, max_tokens, response_model, reasoning)
 
         try:
             request_kwargs = {
@@ -201,9 +594,12 @@ class GPTWrapper(ModelWrapper):
             if "gpt-5" not in self.model_name:
                 # GPT-5 models don't support temperature.
                 request_kwargs.update({"temperature": temperature})
+            if reasoning:
+                request_kwargs["extra_body"] = {"reasoning": _openrouter_reasoning(reasoning)}
             if response_model is not None:
-                raw_schema = response_model.model_json_schema()
-                patched_schema = self._patch_json_schema_for_openai(raw_schema)
+                with span("schema.build", schema=response_model.__name__):
+                    raw_schema = response_model.model_json_schema()
+                    patched_schema = self._patch_json_schema_for_openai(raw_schema)
                 request_kwargs["response_format"] = {
                     "type": "json_schema",
                     "json_schema": {
@@ -213,7 +609,8 @@ class GPTWrapper(ModelWrapper):
                     },
                 }
 
-            response = self.client.chat.completions.create(**request_kwargs)
+            response = self._request("openrouter.chat", self.client.chat.completions.create, **request_kwargs)
+            self._record_thoughts(reasoning, getattr(response.choices[0].message, "reasoning", None))
             message_content = response.choices[0].message.content
             if isinstance(message_content, list):
                 text = "".join(getattr(part, "text", "") for part in message_content)
@@ -222,14 +619,17 @@ class GPTWrapper(ModelWrapper):
             if response_model is not None:
                 return self._coerce_structured_response(text, response_model)
             return text
+        except (CircuitOpenError, BudgetExhausted):
+            raise
         except Exception as e:
-            print(f"Error calling GPT via OpenRouter: {e}")
+            log.warning(f"Error calling GPT via OpenRouter: {e}")
             raise
 
 
+@register_wrapper("google")
 class GeminiWrapper(ModelWrapper):
-    def __init__(self, api_key: str, model_name: str, config: dict[str, Any]):
-        super().__init__(api_key, model_name, config)
+    def __init__(self, api_key: str, model_name: str, config: dict[str, Any], provider: dict[str, Any] = None):
+        super().__init__(api_key, model_name, config, provider)
 
         self.safety_settings = [
             {"category": "HARM_CATEGORY_HARASSMENT", "threshold": "BLOCK_NONE"},
@@ -238,7 +638,15 @@ class GeminiWrapper(ModelWrapper):
             {"category": "HARM_CATEGORY_DANGEROUS_CONTENT", "threshold": "BLOCK_NONE"},
         ]
 
-        self.client = genai.Client(api_key=api_key)
+        from google import genai
+
+        self.types = genai.types
+        base_url = self._base_url("google")
+        # The Gemini SDK takes timeouts in milliseconds.
+        http_options = {"timeout": int(self.timeout * 1000)}
+        if base_url:
+            http_options["base_url"] = base_url
+        self.client = genai.Client(api_key=api_key, http_options=http_options)
         self.model_name = model_name
 
     def generate(
@@ -256,6 +664,7 @@ class GeminiWrapper(ModelWrapper):
             temperature=temperature,
             max_tokens=max_tokens,
             response_model=response_model,
+            reasoning=self._reasoning(kwargs),
         )
 
         try:
@@ -271,10 +680,13 @@ class GeminiWrapper(ModelWrapper):
                 response_model=response_model,
             )
 
+        except (CircuitOpenError, BudgetExhausted):
+            raise
         except Exception as e:
-            print(f"Error calling Gemini API: {e}")
+            log.warning(f"Error calling Gemini API: {e}")
             raise
 
+    @traced("schema.build")
     def _build_gen_config(
         self,
         *,
@@ -282,36 +694,67 @@ class GeminiWrapper(ModelWrapper):
         temperature: float,
         max_tokens: int,
         response_model: Type[BaseModel] = None,
-    ) -> genai.types.GenerateContentConfig:
+        reasoning: dict[str, Any] = None,
+    ) -> "genai.types.GenerateContentConfig":
         cfg: dict[str, Any] = {
             "system_instruction": system_prompt,
             "temperature": temperature,
             "max_output_tokens": max_tokens,
             "safety_settings": self.safety_settings,
-            # Uncomment to see magic ✨
-            # "thinking_config": {"return_thoughts": True, "thinking_budget": 0}
         }
+        thinking_config = self._thinking_config(reasoning or {})
+        if thinking_config:
+            cfg["thinking_config"] = thinking_config
         if response_model is not None:
             cfg["response_mime_type"] = "application/json"
             cfg["response_json_schema"] = response_model.model_json_schema()
-        return genai.types.GenerateContentConfig(**cfg)
-
-    def _call(self, prompt: str, config: genai.types.GenerateContentConfig):
-        return self.client.models.generate_content(
+        return self.types.GenerateContentConfig(**cfg)
+
+    def _thinking_config(self, reasoning: dict[str, Any]) -> dict[str, Any]:
+        thinking_config = {}
+        if reasoning.get("include_thoughts"):
+            thinking_config["include_thoughts"] = True
+        if "gemini-3" in self.model_name and reasoning.get("budget_tokens") is None and reasoning.get("effort"):
+            # Gemini 3 takes a thinking level; Gemini 2.5 only a token budget.
+            thinking_config["thinking_level"] = GEMINI_THINKING_LEVELS[reasoning["effort"]]
+        elif thinking_budget(reasoning) is not None:
+            thinking_config["thinking_budget"] = thinking_budget(reasoning)
+        return thinking_config
+
+    def _with_timeout(self, request_kwargs: dict[str, Any], timeout: float) -> dict[str, Any]:
+        http_options = self.types.HttpOptions(timeout=int(timeout * 1000))
+        return {**request_kwargs, "config": request_kwargs["config"].model_copy(update={"http_options": http_options})}
+
+    def _call(self, prompt: str, config: "genai.types.GenerateContentConfig"):
+        response = self._request(
+            "google.generate_content",
+            self.client.models.generate_content,
             model=self.model_name,
             contents=prompt,
             config=config,
         )
+        if config.thinking_config is not None and config.thinking_config.include_thoughts:
+            self._record_thoughts({"include_thoughts": True}, self._thought_text(response))
+        return response
+
+    @staticmethod
+    def _thought_text(response) -> str:
+        candidates = getattr(response, "candidates", None)
+        if not candidates or not candidates[0].content or not candidates[0].content.parts:
+            return ""
+        return "".join(part.text or "" for part in candidates[0].content.parts if part.thought)
 
     def _extract_text_or_raise(self, response) -> str:
+        # `text` leaves out thought parts.
         text = getattr(response, "text", None)
         if text:
             return text
 
-        # fallback: first candidate part
+        # fallback: first candidate part that is not a thought
         candidates = getattr(response, "candidates", None)
         if candidates and candidates[0].content.parts:
-            part_text = getattr(candidates[0].content.parts[0], "text", None)
+            answer_parts = [part for part in candidates[0].content.parts if not part.thought]
+            part_text = getattr(answer_parts[0], "text", None) if answer_parts else None
             if part_text:
                 return part_text
 
@@ -322,7 +765,7 @@ class GeminiWrapper(ModelWrapper):
         self,
         *,
         prompt: str,
-        config: genai.types.GenerateContentConfig,
+        config: "genai.types.GenerateContentConfig",
         response_model: Type[BaseModel],
     ) -> Any:
         # Attempt 1: normal
@@ -346,11 +789,15 @@ class GeminiWrapper(ModelWrapper):
             return self._coerce_structured_response(text2, response_model)
 
 
+@register_wrapper("openrouter")
 class OpenRouterWrapper(ModelWrapper):
-    def __init__(self, api_key: str, model_name: str, config: dict[str, Any]):
-        super().__init__(api_key, model_name, config)
+    request_retries = 2
+    def __init__(self, api_key: str, model_name: str, config: dict[str, Any], provider: dict[str, Any] = None):
+        super().__init__(api_key, model_name, config, provider)
+        from openai import OpenAI
 
-        self.client = OpenAI(api_key=api_key, base_url="https://openrouter.ai/api/v1")
+        base_url = self._base_url("openrouter", "https://openrouter.ai/api/v1")
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=self.timeout, max_retries=0)
 
     def generate(
         self, prompt: str, system_prompt: str = None, response_model: Type[BaseModel] = None, **kwargs
@@ -364,8 +811,9 @@ class OpenRouterWrapper(ModelWrapper):
         )
         response_format = None
         if response_model is not None:
-            raw_schema = response_model.model_json_schema()
-            patched_schema = self._patch_json_schema_for_openai(raw_schema)
+            with span("schema.build", schema=response_model.__name__):
+                raw_schema = response_model.model_json_schema()
+                patched_schema = self._patch_json_schema_for_openai(raw_schema)
             response_format = {
                 "type": "json_schema",
                 "json_schema": {
@@ -382,10 +830,14 @@ class OpenRouterWrapper(ModelWrapper):
         }
         if response_format:
             base_payload["response_format"] = response_format
+        reasoning = self._reasoning(kwargs)
+        if reasoning:
+            base_payload["extra_body"] = {"reasoning": _openrouter_reasoning(reasoning)}
 
         for attempt in range(retries):
             try:
-                response = self.client.chat.completions.create(**base_payload)
+                response = self._request("openrouter.chat", self.client.chat.completions.create, **base_payload)
+                self._record_thoughts(reasoning, getattr(response.choices[0].message, "reasoning", None))
                 message_content = response.choices[0].message.content
                 if isinstance(message_content, list):
                     result = "".join(getattr(part, "text", "") for part in message_content)
@@ -396,69 +848,272 @@ class OpenRouterWrapper(ModelWrapper):
                         return self._coerce_structured_response(result, response_model)
                     return result
                 if attempt < retries - 1:
-                    print(f"  Retry {attempt + 1}: Empty or short response")
+                    log.warning(f"  Retry {attempt + 1}: Empty or short response")
                     time.sleep(1)
+            except (CircuitOpenError, BudgetExhausted):
+                raise
             except Exception as e:
                 if attempt < retries - 1:
-                    print(f"  Retry {attempt + 1}: {e}")
+                    log.warning(f"  Retry {attempt + 1}: {e}")
                     time.sleep(2)
                 else:
-                    print(f"Error calling OpenRouter ({self.model_name}): {e}")
+                    log.warning(f"Error calling OpenRouter ({self.model_name}): {e}")
                     raise
         raise ValueError(f"Failed after {retries} attempts")
 
 
+@register_wrapper("openai_compatible")
+class OpenAICompatibleWrapper(ModelWrapper):
+    """
+    Any server speaking the OpenAI chat completions API, e.g. llama.cpp's llama-server, vLLM, Ollama or LM Studio.
+
+    Provider settings: `base_url` (required); `api_key` / `api_key_env`, which most local servers ignore;
+    `structured_output`: "json_schema" (default) sends the judge schema as `response_format` for servers with
+    grammar-constrained decoding, "prompt" only describes it in the system prompt; `extra_body`: extra request
+    fields sent with every call, e.g. vLLM sampling parameters; `batching`: `{max_batch_size, max_wait_ms,
+    max_concurrency}` to send requests through a `MicroBatcher` shared by every wrapper on the same base_url;
+    `supports_n` (default false): set it to true for servers that honor `n`, e.g. vLLM, so `--samples` asks for
+    several completions per request; llama-server rejects `n` other than 1.
+    """
+
+    request_retries = 2
+    _batchers: dict[str, MicroBatcher] = {}
+    _batchers_lock = threading.Lock()
+
+    def __init__(self, api_key: str, model_name: str, config: dict[str, Any], provider: dict[str, Any] = None):
+        super().__init__(api_key, model_name, config, provider)
+        from openai import OpenAI
+
+        base_url = self._base_url(self.provider.get("vendor", "openai_compatible"))
+        if not base_url:
+            raise ValueError(f"Provider for {model_name} needs a base_url")
+        # The SDK refuses an empty key; local servers accept any.
+        self.client = OpenAI(api_key=api_key or "not-needed", base_url=base_url, timeout=self.timeout, max_retries=0)
+        self.structured_output = self.provider.get("structured_output", "json_schema")
+        self.extra_body = self.provider.get("extra_body") or {}
+        self.batcher = None
+        batching = self.provider.get("batching")
+        if batching:
+            with self._batchers_lock:
+                if base_url not in self._batchers:
+                    self._batchers[base_url] = MicroBatcher(
+                        lambda request, client=self.client: client.chat.completions.create(**request),
+                        max_batch_size=batching.get("max_batch_size", 8),
+                        max_wait_ms=batching.get("max_wait_ms", 10.0),
+                        max_concurrency=batching.get("max_concurrency"),
+                        name=f"batch-{self.provider.get('vendor', 'local')}",
+                    )
+                self.batcher = self._batchers[base_url]
+
+    def _send(self, **request_kwargs) -> Any:
+        if self.batcher is not None:
+            return self.batcher.submit(request_kwargs)
+        return self.client.chat.completions.create(**request_kwargs)
+
+    def supports_n(self) -> bool:
+        # Opt-in: vLLM honors `n`, but llama-server rejects n != 1 and others may ignore it.
+        return self.provider.get("supports_n", False)
+
+    def _build_request(
+        self, prompt: str, system_prompt: str, response_model: Type[BaseModel], kwargs: dict[str, Any]
+    ) -> dict[str, Any]:
+        temperature = kwargs.get("temperature", self.config.get("generation", {}).get("temperature", 0.7))
+        max_tokens = kwargs.get("max_tokens", self.config.get("generation", {}).get("max_tokens", 2048))
+
+        if response_model is not None and self.structured_output == "prompt":
+            schema_hint = (
+                "Respond with only a JSON object matching this JSON schema, no other text:\n"
+                + json.dumps(response_model.model_json_schema())
+            )
+            system_prompt = f"{system_prompt}\n\n{schema_hint}" if system_prompt else schema_hint
+        messages = [{"role": "system", "content": system_prompt}] if system_prompt else []
+        messages.append({"role": "user", "content": prompt})
+
+        request_kwargs = {
+            "model": self.model_name,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if response_model is not None and self.structured_output == "json_schema":
+            with span("schema.build", schema=response_model.__name__):
+                patched_schema = self._patch_json_schema_for_openai(response_model.model_json_schema())
+            request_kwargs["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": response_model.__name__, "schema": patched_schema, "strict": True},
+            }
+        # vLLM, llama-server and Ollama take OpenAI's `reasoning_effort`; a thinking budget is server-specific and
+        # goes in `extra_body`.
+        effort = self._reasoning(kwargs).get("effort")
+        if effort is not None:
+            request_kwargs["reasoning_effort"] = effort
+        if self.extra_body:
+            request_kwargs["extra_body"] = self.extra_body
+        return request_kwargs
+
+    def generate_n(self, prompt: str, n: int, system_prompt: str = None, **kwargs) -> list[str]:
+        if not self.supports_n():
+            return super().generate_n(prompt, n, system_prompt=system_prompt, **kwargs)
+        request_kwargs = self._build_request(prompt, system_prompt, None, kwargs)
+        request_kwargs["n"] = n
+        try:
+            response = self._request("openai_compatible.chat", self._send, **request_kwargs)
+        except (CircuitOpenError, BudgetExhausted):
+            raise
+        except Exception as e:
+            log.warning(f"Error calling OpenAI-compatible server ({self.model_name}): {e}")
+            raise
+        texts = [self._message_text(choice.message.content) for choice in response.choices]
+        if len(texts) != n:
+            raise ValueError(f"Asked {self.model_name} for {n} completions, got {len(texts)}")
+        return texts
+
+    def generate(
+        self, prompt: str, system_prompt: str = None, response_model: Type[BaseModel] = None, **kwargs
+    ) -> Any:
+        request_kwargs = self._build_request(prompt, system_prompt, response_model, kwargs)
+        try:
+            response = self._request("openai_compatible.chat", self._send, **request_kwargs)
+            # Reasoning servers return the thinking separately from the answer, as `reasoning_content`.
+            thoughts = getattr(response.choices[0].message, "reasoning_content", None)
+            self._record_thoughts(self._reasoning(kwargs), thoughts)
+            text = self._message_text(response.choices[0].message.content)
+            if response_model is not None and self.structured_output == "prompt":
+                # Unconstrained models often wrap the object in code fences or prose.
+                from src.utils import extract_json_from_response
+
+                return self._coerce_structured_response(extract_json_from_response(text), response_model)
+            if response_model is not None:
+                return self._coerce_structured_response(text, response_model)
+            return text
+        except (CircuitOpenError, BudgetExhausted):
+            raise
+        except Exception as e:
+            log.warning(f"Error calling OpenAI-compatible server ({self.model_name}): {e}")
+            raise
+
+
+# Providers of the built-in vendors. A config's `providers:` section adds vendors or overrides these per key.
+DEFAULT_PROVIDERS: dict[str, dict[str, Any]] = {
+    "claude": {"wrapper": "anthropic", "api_key_env": "ANTHROPIC_API_KEY", "api_keys_entry": "anthropic"},
+    "gpt": {"wrapper": "openai", "api_key_env": "OPENROUTER_API_KEY", "api_keys_entry": "openrouter"},
+    "gemini": {
+        "wrapper": "google",
+        "api_key_env": "GOOGLE_API_KEY",
+        "api_keys_entry": "google",
+        # OpenRouter-style model names are served through OpenRouter instead of the Gemini API. Failing over to the
+        # Gemini API while OpenRouter's circuit is open is opt-in (it bills a second account): override this route
+        # in `providers:` with `fallback: {wrapper: google, api_key_env: GOOGLE_API_KEY, api_keys_entry: google}`.
+        "routes": {
+            "google/": {"wrapper": "openrouter", "api_key_env": "OPENROUTER_API_KEY", "api_keys_entry": "openrouter"}
+        },
+    },
+}
+
+
 class ModelFactory:
-    VALID_VENDORS = ("claude", "gpt", "gemini")
-    VALID_TIERS = ("fast", "thinking")
-    VENDOR_WRAPPERS = {
-        "claude": ("ANTHROPIC_API_KEY", "anthropic", ClaudeWrapper),
-        "gpt": ("OPENROUTER_API_KEY", "openrouter", GPTWrapper),
-    }
+    """
+    Builds wrappers from the config. Vendors and their tiers are the entries of `models:`; each vendor's
+    provider says which registered wrapper serves it and where its key comes from:
+
+        providers:
+          local:                              # vendor name, as used in answer ids and judge keys
+            wrapper: openai_compatible        # any name registered with @register_wrapper
+            base_url: http://127.0.0.1:8080/v1
+            api_key_env: LOCAL_API_KEY        # or api_keys_entry: <key under api_keys:>, or api_key: <literal>
+            routes:                           # optional per-model-name-prefix overrides of the settings above
+              "qwen/": {base_url: http://gpu-box:8000/v1}
+            fallback:                         # optional, used while this route's circuit breaker is open
+              wrapper: openrouter             # provider settings of the fallback route, plus optionally
+              api_key_env: OPENROUTER_API_KEY # model: <name>; default is the model name without the route prefix
+        models:
+          local: {fast: qwen2.5-7b-instruct}
+        plugins: [my_package.wrappers]        # modules imported first, so their @register_wrapper classes exist
+    """
 
     def __init__(self, config: dict[str, Any]):
         self.config = config
         self.api_keys = config.get("api_keys", {})
         self.models_config = config.get("models", {})
+        for module in config.get("plugins") or []:
+            importlib.import_module(module)
+        self.providers = {vendor: dict(provider) for vendor, provider in DEFAULT_PROVIDERS.items()}
+        for vendor, provider in (config.get("providers") or {}).items():
+            self.providers.setdefault(vendor, {}).update(provider or {})
+        self.breakers = BreakerRegistry.from_config(config)
+        # "<vendor>_<tier>" keys left out of `model_keys()`, e.g. routes the preflight found dead.
+        self.disabled: set[str] = set()
+        for vendor, tiers in self.models_config.items():
+            # Answer ids (ans_<prompt>_<vendor>_<tier>) and judge keys (<vendor>_<tier>) are split on "_".
+            for name in (vendor, *(tiers or {})):
+                if "_" in name:
+                    raise ValueError(f"Vendor and tier names cannot contain '_': {name}")
 
     def _get_api_key(self, env_var: str, config_key: str) -> str:
-        return os.environ.get(env_var) or self.api_keys.get(config_key)
+        return (os.environ.get(env_var) if env_var else None) or self.api_keys.get(config_key)
+
+    def vendors(self) -> list[str]:
+        return list(self.models_config)
+
+    def model_keys(self) -> list[tuple[str, str]]:
+        """Every configured and not disabled (vendor, tier), in config order."""
+        return [
+            (vendor, tier)
+            for vendor, tiers in self.models_config.items()
+            for tier in (tiers or {})
+            if f"{vendor}_{tier}" not in self.disabled
+        ]
+
+    def disable(self, keys: list[str]) -> None:
+        self.disabled.update(keys)
+
+    def resolve_provider(self, vendor: str, model_name: str) -> dict[str, Any]:
+        """The vendor's provider settings with the longest matching `routes` prefix for `model_name` applied."""
+        provider = dict(self.providers.get(vendor) or {})
+        routes = provider.pop("routes", None) or {}
+        for prefix in sorted(routes, key=len, reverse=True):
+            if model_name.startswith(prefix):
+                provider.update(routes[prefix])
+                provider["route_prefix"] = prefix
+                break
+        provider["vendor"] = vendor
+        return provider
 
     def get_model(self, vendor: str, tier: str, model_name_override: str = None) -> ModelWrapper:
         vendor = vendor.lower()
         tier = tier.lower()
 
-        if vendor not in self.VALID_VENDORS:
+        if vendor not in self.models_config and vendor not in self.providers:
             raise ValueError(f"Unknown vendor: {vendor}")
 
-        if tier not in self.VALID_TIERS:
-            raise ValueError(f"Unknown tier: {tier}")
-
-        if vendor in self.VENDOR_WRAPPERS:
-            env_var, key_name, wrapper_cls = self.VENDOR_WRAPPERS[vendor]
-            api_key = self._get_api_key(env_var, key_name)
-            vendor_models = self.models_config.get(vendor, {})
-            model_name = model_name_override or vendor_models.get(tier)
-            if not model_name:
-                raise KeyError(f"Missing model config for {vendor}.{tier}")
-            return wrapper_cls(api_key, model_name, self.config)
-
-        gemini_models = self.models_config.get("gemini", {})
-        model_name = model_name_override or gemini_models.get(tier)
+        model_name = model_name_override or (self.models_config.get(vendor) or {}).get(tier)
         if not model_name:
-            raise KeyError(f"Missing model config for gemini.{tier}")
-        if model_name.startswith("google/"):
-            api_key = self._get_api_key("OPENROUTER_API_KEY", "openrouter")
-            return OpenRouterWrapper(api_key, model_name, self.config)
-        api_key = self._get_api_key("GOOGLE_API_KEY", "google")
-        return GeminiWrapper(api_key, model_name, self.config)
+            raise KeyError(f"Missing model config for {vendor}.{tier}")
+
+        return self._build_wrapper(self.resolve_provider(vendor, model_name), model_name)
+
+    def _build_wrapper(self, provider: dict[str, Any], model_name: str) -> ModelWrapper:
+        vendor = provider["vendor"]
+        wrapper_name = provider.get("wrapper")
+        if wrapper_name not in WRAPPERS:
+            raise ValueError(f"Unknown wrapper for {vendor}: {wrapper_name!r} (registered: {', '.join(WRAPPERS)})")
+        api_key = self._get_api_key(provider.get("api_key_env"), provider.get("api_keys_entry"))
+        api_key = api_key or provider.get("api_key")
+        wrapper = WRAPPERS[wrapper_name](api_key, model_name, self.config, provider=provider)
+        wrapper.breakers = self.breakers
+
+        fallback = dict(provider.get("fallback") or {})
+        if fallback:
+            fallback_model = fallback.pop("model", None) or model_name.removeprefix(provider.get("route_prefix", ""))
+            fallback["vendor"] = vendor
+            wrapper.fallback_factory = lambda: self._build_wrapper(fallback, fallback_model)
+        return wrapper
 
     def get_all_models(self) -> dict[str, ModelWrapper]:
         models = {}
-        for vendor in ["claude", "gpt", "gemini"]:
-            for tier in ["fast", "thinking"]:
-                key = f"{vendor}_{tier}"
-                models[key] = self.get_model(vendor, tier)
+        for vendor, tier in self.model_keys():
+            key = f"{vendor}_{tier}"
+            models[key] = self.get_model(vendor, tier)
         return models
 
 
@@ -0,0 +1,407 @@
+"""
+Run answer generation and judging as a single pipelined job.
+
+A prompt is handed to the judges as soon as all of its answers are generated, instead of waiting for the
+whole generation stage to finish. Both stages share one `TaskScheduler`, so the `--workers` pool and the
+`--max-in-flight` backpressure budget apply to generation and judging calls together.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from tqdm import tqdm
+
+CURRENT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = CURRENT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.utils import load_config, load_prompts, save_json, generate_timestamp
+from src.models import ModelFactory
+from src.budget import BudgetTracker, estimate_tokens
+from src.deadline import DEADLINE_REACHED, add_deadline_arguments, run_deadline
+from src.preflight import DEFAULT_WORKERS, add_preflight_arguments, run_preflight
+from src.planner import LatencyModel, add_history_arguments
+from src.scheduler import ScheduledTask, TaskScheduler, add_fairness_arguments
+from src.generate_answers import (
+    add_sample_arguments,
+    answer_record,
+    build_generation_tasks,
+    log_answer,
+    run_generation_task,
+)
+from src.judge_answers import (
+    add_sample_mode_arguments,
+    judge_input_tokens,
+    judge_with_retries,
+    load_judge_models,
+    log_judgment,
+    resolve_judges,
+    select_sample_sets,
+)
+from src.live_metrics import BiasAggregator
+from src.run_logging import add_logging_arguments, get_logger, run_logging
+from src.run_metrics import RunMetrics, add_metrics_arguments, serve_run_metrics
+from src.telemetry import answer_group, judgment_group, telemetry_report
+from src.tracing import add_instrumentation_arguments, instrumented_run
+
+log = get_logger("pipeline")
+
+
+def run_pipeline(
+    prompts: list[dict[str, str]],
+    model_factory: ModelFactory,
+    config: dict[str, str],
+    judges: list[str],
+    verbose: bool = True,
+    max_workers: int = 6,
+    max_in_flight: int = None,
+    retries: int = 3,
+    retry_delay: float = 1.0,
+    hint_mode: str = "none",
+    aggregator: BiasAggregator = None,
+    live_every: int = 0,
+    budget: BudgetTracker = None,
+    metrics: RunMetrics = None,
+    samples: int = 1,
+    samples_mode: str = "first",
+    latency_model: LatencyModel = None,
+    vendor_share: float = None,
+) -> tuple[list[dict[str, str]], list[dict[str, str]]]:
+    models = model_factory.get_all_models()
+    generation_tasks = build_generation_tasks(prompts, models, samples)
+    judge_models = load_judge_models(model_factory, judges)
+    shuffle_seed = config.get("judging", {}).get("shuffle_seed", 42)
+
+    if not generation_tasks:
+        return [], []
+
+    expected_per_prompt: dict[str, int] = {}
+    for task in generation_tasks:
+        prompt_id = task["prompt"]["id"]
+        expected_per_prompt[prompt_id] = expected_per_prompt.get(prompt_id, 0) + 1
+
+    active_judges = [judge_key for judge_key in judges if judge_models[judge_key] is not None]
+    # Judgment rounds per prompt: one per sample index with --samples-mode each, otherwise one.
+    sets_per_prompt = samples if samples > 1 and samples_mode == "each" else 1
+    judges_per_prompt = len(active_judges) * sets_per_prompt
+    total_judge_tasks = len(expected_per_prompt) * judges_per_prompt
+    total_answers = sum(task.get("samples", 1) for task in generation_tasks)
+    if metrics is not None:
+        metrics.add_planned("generate", len(generation_tasks))
+        metrics.add_planned("judge", total_judge_tasks)
+
+    if verbose:
+        print(
+            f"\nPipelining {len(generation_tasks)} generation ({total_answers} answers) and up to "
+            f"{total_judge_tasks} judgment tasks with {max_workers} concurrent workers..."
+        )
+        if hint_mode != "none":
+            print(f"Hint mode: {hint_mode}")
+
+    ordered_answers: list[list[dict[str, str]] | None] = [None] * len(generation_tasks)
+    answers_by_prompt: dict[str, dict[int, list[dict[str, str]]]] = {}
+    # prompt id -> (sample_index, judge_key) -> judgment, and the order those keys were enqueued in.
+    judgments_by_prompt: dict[str, dict[tuple[int | None, str], dict[str, str]]] = {}
+    judgment_order: dict[str, list[tuple[int | None, str]]] = {}
+    skipped_prompts: list[str] = []
+    judged = 0
+
+    scheduler = TaskScheduler(max_workers=max_workers, max_in_flight=max_in_flight, group_share=vendor_share)
+
+    def predicted_latency(model_name: str, input_tokens: int, category: str) -> float:
+        # Longest-predicted first within a stage; without history every task has the same priority (FIFO).
+        if latency_model is None:
+            return 0.0
+        return latency_model.predict(model_name, input_tokens, category)
+
+    gen_pbar = tqdm(total=total_answers, desc="Generating answers", position=0) if verbose else None
+    judge_pbar = tqdm(total=total_judge_tasks, desc="Judging answers", position=1) if verbose else None
+
+    def on_judgment(task: ScheduledTask, judgment: dict[str, str], exc: BaseException) -> None:
+        nonlocal judged
+        prompt_id = task.meta["prompt_id"]
+        judge_key = task.meta["judge_key"]
+        sample_index = task.meta["sample_index"]
+        if exc is not None:
+            judgment = {"prompt_id": prompt_id, "judge_model": judge_key, "error": str(exc), "mapping": {}}
+            if sample_index is not None:
+                judgment["sample_index"] = sample_index
+        judgments_by_prompt.setdefault(prompt_id, {})[(sample_index, judge_key)] = judgment
+        if aggregator is not None:
+            aggregator.update(judgment)
+
+        if verbose:
+            log_judgment(judgment, judge_key, prompt_id)
+        if judge_pbar:
+            judge_pbar.update(1)
+        judged += 1
+        if aggregator is not None and live_every and judged % live_every == 0:
+            log.info("\n".join(aggregator.progress_lines()))
+
+    def enqueue_judging(prompt_id: str) -> None:
+        prompt_answers = [
+            answer for idx in sorted(answers_by_prompt[prompt_id]) for answer in answers_by_prompt[prompt_id][idx]
+        ]
+        failed = [a["answer_id"] for a in prompt_answers if "error" in a]
+        if failed:
+            skipped_prompts.append(prompt_id)
+            if verbose:
+                log.warning(f"  ⚠ Skipping judging for {prompt_id}: {len(failed)} answer(s) failed")
+            if judge_pbar:
+                judge_pbar.total -= judges_per_prompt
+                judge_pbar.refresh()
+            if metrics is not None:
+                metrics.add_planned("judge", -judges_per_prompt)
+            return
+
+        if aggregator is not None:
+            aggregator.add_answers(prompt_answers)
+        for sample_index, sample_answers in select_sample_sets(prompt_answers, samples_mode, shuffle_seed):
+            for judge_key in active_judges:
+                judgment_order.setdefault(prompt_id, []).append((sample_index, judge_key))
+                scheduler.add(
+                    ScheduledTask(
+                        judge_with_retries,
+                        kwargs={
+                            "prompt_id": prompt_id,
+                            "prompt_text": sample_answers[0]["prompt_text"],
+                            "answers": sample_answers,
+                            "judge_model": judge_models[judge_key],
+                            "judge_name": judge_key,
+                            "shuffle_seed": shuffle_seed,
+                            "verbose": verbose,
+                            "retries": retries,
+                            "retry_delay": retry_delay,
+                            "hint_mode": hint_mode,
+                            "budget": budget,
+                            "metrics": metrics,
+                            "sample_index": sample_index,
+                        },
+                        stage="judge",
+                        meta={"prompt_id": prompt_id, "judge_key": judge_key, "sample_index": sample_index},
+                        callback=on_judgment,
+                        priority=predicted_latency(
+                            judge_models[judge_key].model_name,
+                            judge_input_tokens(sample_answers[0]["prompt_text"], sample_answers),
+                            sample_answers[0].get("category"),
+                        ),
+                        group=judge_key.split("_", 1)[0],
+                    )
+                )
+
+    def on_answer(task: ScheduledTask, results: list[dict[str, str]], exc: BaseException) -> None:
+        idx = task.meta["index"]
+        gen_task = generation_tasks[idx]
+        prompt = gen_task["prompt"]
+        if exc is not None:
+            model_name = gen_task["model"].model_name
+            if "samples" in gen_task:
+                sample_indices = list(range(gen_task["samples"]))
+            else:
+                sample_indices = [gen_task.get("sample_index")]
+            results = [
+                {**answer_record(prompt, gen_task["vendor"], gen_task["tier"], model_name, i), "error": str(exc)}
+                for i in sample_indices
+            ]
+        ordered_answers[idx] = results
+
+        if verbose:
+            for result in results:
+                log_answer(result, gen_task["vendor"], gen_task["tier"], prompt["id"])
+        if gen_pbar:
+            gen_pbar.update(len(results))
+
+        prompt_answers = answers_by_prompt.setdefault(prompt["id"], {})
+        prompt_answers[idx] = results
+        if len(prompt_answers) == expected_per_prompt[prompt["id"]]:
+            enqueue_judging(prompt["id"])
+
+    for idx, task in enumerate(generation_tasks):
+        scheduler.add(
+            ScheduledTask(
+                run_generation_task,
+                args=(task, retries, retry_delay, budget, metrics),
+                stage="generate",
+                meta={"index": idx},
+                callback=on_answer,
+                priority=predicted_latency(
+                    task["model"].model_name, estimate_tokens(task["prompt"]["text"]), task["prompt"].get("category")
+                ),
+                group=task["vendor"],
+            )
+        )
+
+    scheduler.run()
+
+    if gen_pbar:
+        gen_pbar.close()
+    if judge_pbar:
+        judge_pbar.close()
+
+    if skipped_prompts:
+        print(f"\n⚠ {len(skipped_prompts)} prompt(s) not judged due to failed answers: {', '.join(skipped_prompts)}")
+
+    answers = [answer for results in ordered_answers if results is not None for answer in results]
+    judgments = []
+    for prompt_id in expected_per_prompt:
+        prompt_judgments = judgments_by_prompt.get(prompt_id, {})
+        judgments.extend(prompt_judgments[key] for key in judgment_order.get(prompt_id, []) if key in prompt_judgments)
+
+    return answers, judgments
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate and judge answers in a single pipelined run")
+    parser.add_argument("--config", type=str, default="config.yaml")
+    parser.add_argument("--prompts", type=str, default="prompts.json")
+    parser.add_argument("--answers-output", type=str, default=None)
+    parser.add_argument("--judgments-output", type=str, default=None)
+    parser.add_argument("--judges", type=str, nargs="+", default=None)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--category", type=str, default=None)
+    parser.add_argument("--verbose", action="store_true", default=True)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of concurrent workers (default: seeded by the preflight, else 6)",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="Maximum number of submitted-but-unfinished calls across both stages (default: --workers)",
+    )
+    parser.add_argument("--retries", type=int, default=3, help="Number of retries per task (default: 3)")
+    parser.add_argument(
+        "--retry-delay", type=float, default=1.0, help="Seconds to wait between retries (default: 1.0)"
+    )
+    parser.add_argument(
+        "--hint-mode",
+        type=str,
+        default=None,
+        choices=["none", "self", "competitors", "full"],
+        help="Hinting mode: none (blind), self (reveal own model), competitors (reveal others), full (reveal all)",
+    )
+    parser.add_argument(
+        "--live-every",
+        type=int,
+        default=25,
+        help="Print live top-1 rates every N completed judgments, 0 to disable (default: 25)",
+    )
+    add_sample_arguments(parser)
+    add_sample_mode_arguments(parser)
+    add_logging_arguments(parser)
+    add_metrics_arguments(parser)
+    add_deadline_arguments(parser)
+    add_preflight_arguments(parser)
+    add_history_arguments(parser)
+    add_fairness_arguments(parser)
+    add_instrumentation_arguments(parser)
+
+    args = parser.parse_args()
+    if args.samples < 1:
+        parser.error("--samples must be at least 1")
+
+    print("Loading configuration...")
+    config = load_config(args.config)
+
+    print("Loading prompts...")
+    prompts = load_prompts(args.prompts)
+
+    if args.category:
+        prompts = [p for p in prompts if p["category"] == args.category]
+        print(f"Filtered to {len(prompts)} prompts in category '{args.category}'")
+
+    if args.limit:
+        prompts = prompts[: args.limit]
+        print(f"Limited to first {args.limit} prompts")
+
+    judges = resolve_judges(config, args.judges)
+    print(f"Using judges: {', '.join(judges)}")
+
+    hint_mode = args.hint_mode or config.get("hinting", {}).get("mode", "none")
+
+    print("\nInitializing model factory...")
+    model_factory = ModelFactory(config)
+    judges, seeded_workers = run_preflight(model_factory, args.preflight, judges=judges)
+    workers = args.workers or seeded_workers or DEFAULT_WORKERS
+    seeded_note = " (seeded by the preflight)" if not args.workers and seeded_workers else ""
+    print(f"\nConcurrent workers: {workers}{seeded_note}")
+
+    print("\n" + "=" * 60)
+    print("STARTING PIPELINED GENERATION + JUDGING")
+    print("=" * 60)
+
+    timestamp = generate_timestamp()
+    answers_path = args.answers_output or f"data/answers/answers_{timestamp}.json"
+    judgments_path = args.judgments_output or f"data/judgments/judgments_{timestamp}.json"
+
+    aggregator = BiasAggregator()
+    latency_model = LatencyModel.from_paths(args.history) if args.history else None
+    budget = BudgetTracker.from_config(config)
+    metrics = serve_run_metrics(args.metrics_port)
+    with (
+        run_logging(args.log_level, args.log_json, args.progress_interval),
+        instrumented_run(args.trace, args.trace_format, args.profile, args.profile_interval),
+        run_deadline(args.deadline),
+    ):
+        answers, judgments = run_pipeline(
+            prompts=prompts,
+            model_factory=model_factory,
+            config=config,
+            judges=judges,
+            verbose=args.verbose,
+            max_workers=workers,
+            max_in_flight=args.max_in_flight,
+            retries=args.retries,
+            retry_delay=args.retry_delay,
+            hint_mode=hint_mode,
+            aggregator=aggregator,
+            live_every=args.live_every,
+            budget=budget,
+            metrics=metrics,
+            samples=args.samples,
+            samples_mode=args.samples_mode,
+            latency_model=latency_model,
+            vendor_share=args.vendor_share,
+        )
+
+        print(f"\nSaving {len(answers)} answers to {answers_path}")
+        save_json(answers, answers_path)
+        print(f"Saving {len(judgments)} judgments to {judgments_path}")
+        save_json(judgments, judgments_path)
+
+    print("\n" + "=" * 60)
+    print("SUMMARY")
+    print("=" * 60)
+
+    answer_errors = sum(1 for a in answers if "error" in a)
+    judgment_errors = sum(1 for j in judgments if "error" in j)
+    print(f"\nAnswers: {len(answers)} ({answer_errors} failed)")
+    print(f"Judgments: {len(judgments)} ({judgment_errors} failed)")
+    pending_answers = sum(1 for a in answers if a.get("error") == DEADLINE_REACHED)
+    pending_judgments = sum(1 for j in judgments if j.get("error") == DEADLINE_REACHED)
+    if pending_answers or pending_judgments:
+        print(
+            f"⚠ Deadline reached: {pending_answers} answer(s) and {pending_judgments} judgment(s) pending; "
+            "prompts with pending answers were not judged"
+        )
+
+    print("\n" + telemetry_report(answers, answer_group, "Usage by model"))
+    print("\n" + telemetry_report(judgments, judgment_group, "Usage by judge"))
+    if budget is not None:
+        print("\n" + budget.report())
+    if model_factory.breakers is not None:
+        print("\n" + model_factory.breakers.report())
+
+    print("\n" + aggregator.report())
+
+    print(f"\n✓ Done! Answers saved to: {answers_path}")
+    print(f"✓ Judgments saved to: {judgments_path}")
+
+
+if __name__ == "__main__":
+    main()
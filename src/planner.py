@@ -0,0 +1,229 @@
+"""
+Dry-run planning: expand a run's task matrix and predict its tokens, cost and wall time without calling any API.
+
+`--dry-run` on generate_answers.py / judge_answers.py builds the same task list the run would (prompts x
+vendors x tiers, or prompts x judges x hint modes). Input tokens come from the local `estimate_tokens`
+approximation. Output tokens and latency are drawn from the telemetry envelopes of earlier runs passed with
+`--history`, per model; a model without history is assumed to use `max_tokens` of output in
+`DEFAULT_LATENCY_S`. Each simulation replays the tasks longest-predicted first (see `LatencyModel`) on
+`--workers` slots, like the scheduler would, leaving out its per-vendor limit. Repeating it `SIMULATIONS`
+times gives a p50 / p90 for cost and makespan, and the same is done at a few other worker counts so
+`--workers` can be picked before spending anything. Prices come from `budget.prices` in the config.
+"""
+
+import heapq
+import random
+import statistics
+from typing import Any
+
+from src.budget import BudgetTracker, billable_usage, max_output_tokens
+from src.telemetry import percentile
+from src.utils import load_json
+
+DEFAULT_LATENCY_S = 30.0
+SIMULATIONS = 200
+
+
+def add_history_arguments(parser) -> None:
+    parser.add_argument(
+        "--history",
+        type=str,
+        nargs="+",
+        default=[],
+        help="Answers / judgments JSON files from earlier runs; their telemetry predicts each task's latency, "
+        "so the longest tasks are started first, and is what the dry run samples from",
+    )
+
+
+def add_planner_arguments(parser) -> None:
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Print the task matrix with predicted cost and wall time, then exit"
+    )
+    add_history_arguments(parser)
+
+
+def load_history(paths: list[str]) -> dict[str, list[tuple[float, int, float]]]:
+    """Model name -> (latency_s, billable output tokens, cached share of input) of past successful calls."""
+    history: dict[str, list[tuple[float, int, float]]] = {}
+    for path in paths:
+        for record in load_json(path):
+            telemetry = record.get("telemetry")
+            # Failed records stop early and would make successful calls look cheaper and faster than they are.
+            if not telemetry or not telemetry.get("model") or "error" in record:
+                continue
+            uncached, cached, output = billable_usage(telemetry)
+            cached_share = cached / (uncached + cached) if uncached + cached else 0.0
+            history.setdefault(telemetry["model"], []).append((telemetry.get("latency_s", 0.0), output, cached_share))
+    return history
+
+
+class LatencyModel:
+    """
+    Seconds a call is predicted to take, learned from the telemetry of earlier runs.
+
+    Per model, latency is fitted as a + b * input tokens by least squares (b >= 0), so long judge prompts
+    predict slower judgments. The fit is then scaled by the model's median ratio of actual to fitted latency
+    in the prompt's category, once that category has `MIN_CATEGORY_CALLS` calls. A model without history is
+    predicted to take `DEFAULT_LATENCY_S`. Only the order of predictions matters to the scheduler.
+    """
+
+    MIN_CATEGORY_CALLS = 3
+
+    def __init__(self, records: list[dict[str, Any]]):
+        calls: dict[str, list[tuple[int, float, str]]] = {}
+        for record in records:
+            telemetry = record.get("telemetry")
+            # Failed calls stop early; later samples of an `n` request carry no input tokens of their own.
+            if not telemetry or not telemetry.get("model") or "error" in record or not telemetry.get("input_tokens"):
+                continue
+            calls.setdefault(telemetry["model"], []).append(
+                (telemetry["input_tokens"], telemetry.get("latency_s", 0.0), record.get("category"))
+            )
+
+        self.fits: dict[str, tuple[float, float]] = {}
+        self.category_scale: dict[tuple[str, str], float] = {}
+        for model_name, model_calls in calls.items():
+            tokens = [c[0] for c in model_calls]
+            latencies = [c[1] for c in model_calls]
+            slope = 0.0
+            if len(set(tokens)) > 1:
+                mean_tokens = statistics.fmean(tokens)
+                covariance = sum((t - mean_tokens) * l for t, l in zip(tokens, latencies))
+                slope = max(covariance / sum((t - mean_tokens) ** 2 for t in tokens), 0.0)
+            intercept = statistics.fmean(latencies) - slope * statistics.fmean(tokens)
+            self.fits[model_name] = (intercept, slope)
+
+            ratios: dict[str, list[float]] = {}
+            for input_tokens, latency, category in model_calls:
+                fitted = intercept + slope * input_tokens
+                if category is not None and fitted > 0:
+                    ratios.setdefault(category, []).append(latency / fitted)
+            for category, values in ratios.items():
+                if len(values) >= self.MIN_CATEGORY_CALLS:
+                    self.category_scale[(model_name, category)] = statistics.median(values)
+
+    @classmethod
+    def from_paths(cls, paths: list[str]) -> "LatencyModel":
+        return cls([record for path in paths for record in load_json(path)])
+
+    def predict(self, model_name: str, input_tokens: int, category: str = None) -> float:
+        if model_name not in self.fits:
+            return DEFAULT_LATENCY_S
+        intercept, slope = self.fits[model_name]
+        scale = self.category_scale.get((model_name, category), 1.0)
+        return max(intercept + slope * input_tokens, 0.0) * scale
+
+
+def simulate(
+    tasks: list[dict[str, Any]],
+    history: dict[str, list[tuple[float, int, float]]],
+    workers: int,
+    default_output_tokens: int,
+    budget: BudgetTracker,
+    rng: random.Random,
+) -> tuple[float, dict[str, dict[str, float]]]:
+    """One replay of `tasks`, in order, on `workers` slots; returns the makespan and per-label output tokens / cost."""
+    slots = [0.0] * max(workers, 1)
+    per_label: dict[str, dict[str, float]] = {}
+    for task in tasks:
+        samples = history.get(task["model"])
+        if samples:
+            latency, output, cached_share = rng.choice(samples)
+        else:
+            latency, output, cached_share = DEFAULT_LATENCY_S, default_output_tokens, 0.0
+        heapq.heappush(slots, heapq.heappop(slots) + latency)
+        cached = int(task["input_tokens"] * cached_share)
+        row = per_label.setdefault(task["label"], {"output_tokens": 0.0, "cost": 0.0})
+        row["output_tokens"] += output
+        row["cost"] += budget.cost(task["model"], task["input_tokens"] - cached, cached, output)
+    return max(slots), per_label
+
+
+def plan_report(
+    tasks: list[dict[str, Any]],
+    config: dict[str, Any],
+    history_paths: list[str],
+    workers: int,
+    title: str,
+    seed: int = 0,
+) -> str:
+    """
+    Predicted tokens, cost and makespan for a list of planned tasks.
+
+    Each task is a dict with `label` (the group it is reported under, e.g. "gpt_fast"), `model` (the model
+    name as it appears in telemetry), `input_tokens` and optionally the prompt's `category`.
+    """
+    if not tasks:
+        return f"{title}: no tasks to run"
+
+    history = load_history(history_paths)
+    latency_model = LatencyModel.from_paths(history_paths)
+    tasks = sorted(
+        tasks,
+        key=lambda task: latency_model.predict(task["model"], task["input_tokens"], task.get("category")),
+        reverse=True,
+    )
+    budget = BudgetTracker(config.get("budget") or {})
+    default_output_tokens = max_output_tokens(config)
+    rng = random.Random(seed)
+
+    makespans: list[float] = []
+    costs: list[float] = []
+    label_totals: dict[str, dict[str, float]] = {}
+    for _ in range(SIMULATIONS):
+        makespan, per_label = simulate(tasks, history, workers, default_output_tokens, budget, rng)
+        makespans.append(makespan)
+        costs.append(sum(row["cost"] for row in per_label.values()))
+        for label, row in per_label.items():
+            totals = label_totals.setdefault(label, {"output_tokens": 0.0, "cost": 0.0})
+            totals["output_tokens"] += row["output_tokens"] / SIMULATIONS
+            totals["cost"] += row["cost"] / SIMULATIONS
+
+    by_label: dict[str, dict[str, Any]] = {}
+    for task in tasks:
+        row = by_label.setdefault(task["label"], {"model": task["model"], "tasks": 0, "input_tokens": 0})
+        row["tasks"] += 1
+        row["input_tokens"] += task["input_tokens"]
+
+    report = [
+        f"{title} (dry run, {len(tasks)} tasks, {SIMULATIONS} simulations):",
+        f"  {'':20} {'tasks':>6} {'in tok':>10} {'out tok':>10} {'cost $':>9} {'p50 s':>7}  history",
+    ]
+    for label, row in sorted(by_label.items()):
+        samples = history.get(row["model"], [])
+        latency_p50 = percentile(sorted(s[0] for s in samples), 0.5) if samples else DEFAULT_LATENCY_S
+        source = f"{len(samples)} calls" if samples else "none (max_tokens, default latency)"
+        totals = label_totals[label]
+        report.append(
+            f"  {label:20} {row['tasks']:6d} {row['input_tokens']:10,d} {totals['output_tokens']:10,.0f} "
+            f"{totals['cost']:9.4f} {latency_p50:7.2f}  {source}"
+        )
+
+    makespans.sort()
+    costs.sort()
+    report.append(
+        f"  Cost: ${percentile(costs, 0.5):.4f} (p50), ${percentile(costs, 0.9):.4f} (p90)"
+        + (f"; unpriced models count as $0: {', '.join(sorted(budget.unpriced))}" if budget.unpriced else "")
+    )
+    report.append(
+        f"  Makespan at {workers} workers: {_format_duration(percentile(makespans, 0.5))} (p50), "
+        f"{_format_duration(percentile(makespans, 0.9))} (p90)"
+    )
+
+    other_counts = sorted({max(workers // 2, 1), workers * 2, workers * 4} - {workers})
+    alternatives = []
+    for count in other_counts:
+        spans = sorted(
+            simulate(tasks, history, count, default_output_tokens, budget, rng)[0] for _ in range(SIMULATIONS)
+        )
+        alternatives.append(f"{count} workers: {_format_duration(percentile(spans, 0.5))}")
+    report.append(f"  Other worker counts (p50): {', '.join(alternatives)}")
+    return "\n".join(report)
+
+
+def _format_duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.1f}s"
+    minutes, secs = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h{minutes:02d}m{secs:02d}s" if hours else f"{minutes}m{secs:02d}s"
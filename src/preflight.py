@@ -0,0 +1,172 @@
+"""
+Preflight: probe every model of a run concurrently before any task is queued.
+
+`--preflight` on generate_answers.py, judge_answers.py and pipeline.py (default "off") sends
+`PROBE_BURST` short plain requests to every model the run uses, plus one structured request to every judge,
+all at once. Each model is then:
+
+  ok         at least one plain probe succeeded (and, for a judge, the structured probe did)
+  throttled  every plain probe was rate limited (429); the route is alive, so it stays in the run
+  dead       anything else: auth errors, unknown models, timeouts, 5xx, or a judge without structured output
+
+The run stops before any task is queued ("fail"), or dead models are dropped from it ("exclude"). Dropping a
+vendor or judge changes what a bias experiment measures, so exclusion is opt-in. Without `--workers`, the pool
+is sized from the probes' median latencies (see `seed_workers`), so dead routes add no workers and slow ones
+get more. The median probe latency of each model is printed with the report.
+"""
+
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from pydantic import BaseModel
+
+from src.models import ModelFactory, ModelWrapper
+
+PREFLIGHT_MODES = ("exclude", "fail", "off")
+PROBE_BURST = 2
+# Longer than the 10 characters OpenRouterWrapper requires of a reply; benchmarks/preflight_check.py checks it.
+PROBE_REPLY = "The connection test passed."
+PROBE_PROMPT = f"Reply with this exact sentence and nothing else: {PROBE_REPLY}"
+DEFAULT_WORKERS = 6
+MAX_WORKERS_PER_MODEL = 8
+
+OK = "ok"
+THROTTLED = "throttled"
+DEAD = "dead"
+
+
+class ProbeSchema(BaseModel):
+    reply: str
+
+
+def add_preflight_arguments(parser) -> None:
+    parser.add_argument(
+        "--preflight",
+        type=str,
+        default="off",
+        choices=PREFLIGHT_MODES,
+        help="Probe every model before the run: stop the run on dead ones (fail), drop them (exclude), or skip (off)",
+    )
+
+
+def probe(wrapper: ModelWrapper, structured: bool = False) -> tuple[float, BaseException | None]:
+    """(seconds, error) of one short request; `structured` asks for a `ProbeSchema` reply."""
+    start = time.perf_counter()
+    try:
+        if structured:
+            wrapper.generate(PROBE_PROMPT, response_model=ProbeSchema)
+        elif not wrapper.generate(PROBE_PROMPT):
+            raise ValueError("empty response")
+        error = None
+    except Exception as e:
+        error = e
+    return time.perf_counter() - start, error
+
+
+def probe_models(
+    models: dict[str, ModelWrapper], structured_keys: set[str] = frozenset(), burst: int = PROBE_BURST
+) -> dict[str, dict[str, Any]]:
+    """Model key -> probe result, with every probe of every model sent concurrently."""
+    jobs = [(key, False) for key in models for _ in range(burst)]
+    jobs += [(key, True) for key in models if key in structured_keys]
+    results = {
+        key: {"model": wrapper.model_name, "served": 0, "throttled": 0, "latency_s": None, "structured": None}
+        for key, wrapper in models.items()
+    }
+    latencies: dict[str, list[float]] = {key: [] for key in models}
+
+    with ThreadPoolExecutor(max_workers=max(len(jobs), 1)) as executor:
+        futures = [(key, structured, executor.submit(probe, models[key], structured)) for key, structured in jobs]
+        for key, structured, future in futures:
+            latency_s, error = future.result()
+            result = results[key]
+            if structured:
+                result["structured"] = error is None
+            elif error is None:
+                result["served"] += 1
+                latencies[key].append(latency_s)
+            elif getattr(error, "status_code", None) == 429:
+                result["throttled"] += 1
+            if error is not None:
+                result.setdefault("error", f"{type(error).__name__}: {error}")
+
+    for key, values in latencies.items():
+        if values:
+            results[key]["latency_s"] = round(statistics.median(values), 3)
+    return results
+
+
+def probe_status(result: dict[str, Any], structured: bool = False) -> str:
+    if structured and result["structured"] is False:
+        return DEAD
+    if result["served"]:
+        return OK
+    return THROTTLED if result["throttled"] else DEAD
+
+
+def seed_workers(results: dict[str, dict[str, Any]]) -> int:
+    """
+    Pool size from probe latency. A task holds its worker for about its model's latency, so for every model's
+    share of the tasks to finish together, each live model gets the probes it served concurrently scaled by its
+    median latency over the fastest model's, up to `MAX_WORKERS_PER_MODEL`. A throttled model gets one.
+    """
+    latencies = {key: max(result["latency_s"], 1e-3) for key, result in results.items() if result["served"]}
+    fastest = min(latencies.values(), default=None)
+    workers = 0
+    for key, result in results.items():
+        if key in latencies:
+            workers += min(MAX_WORKERS_PER_MODEL, max(1, round(result["served"] * latencies[key] / fastest)))
+        elif result["throttled"]:
+            workers += 1
+    return workers
+
+
+def preflight_report(results: dict[str, dict[str, Any]], structured_keys: set[str] = frozenset()) -> str:
+    lines = ["Preflight:"]
+    for key, result in results.items():
+        status = probe_status(result, key in structured_keys)
+        latency = f"{result['latency_s']:.2f}s" if result["latency_s"] is not None else "-"
+        structured = {True: ", structured ✓", False: ", structured ✗", None: ""}[result["structured"]]
+        line = f"  {'✓' if status == OK else '⚠' if status == THROTTLED else '✗'} {key} ({result['model']}): "
+        line += f"{status}, {result['served']}/{PROBE_BURST} served in {latency}{structured}"
+        if status != OK and result.get("error"):
+            line += f" — {result['error'][:160]}"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def run_preflight(
+    model_factory: ModelFactory, mode: str, generation: bool = True, judges: list[str] = ()
+) -> tuple[list[str], int | None]:
+    """
+    Probe the generation models (all configured ones, if `generation`) and `judges`, drop the dead ones from the
+    factory and the judge list, and return (live judges, seeded worker count). Exits in "fail" mode.
+    """
+    if mode == "off":
+        return list(judges), None
+
+    models = model_factory.get_all_models() if generation else {}
+    generation_keys = list(models)
+    for judge_key in judges:
+        if judge_key not in models:
+            models[judge_key] = model_factory.get_model(*judge_key.split("_", 1))
+    print(f"\nPreflight: probing {len(models)} model(s)...")
+    results = probe_models(models, set(judges))
+    print(preflight_report(results, set(judges)))
+
+    dead_generators = [key for key in generation_keys if probe_status(results[key]) == DEAD]
+    dead_judges = [key for key in judges if probe_status(results[key], structured=True) == DEAD]
+    if dead_generators or dead_judges:
+        dead = ", ".join(dict.fromkeys(dead_generators + dead_judges))
+        if mode == "fail":
+            print(f"\n✗ Preflight failed for: {dead}")
+            sys.exit(1)
+        print(f"\n⚠ Excluding from this run: {dead}")
+        model_factory.disable(dead_generators)
+
+    live_judges = [key for key in judges if key not in dead_judges]
+    live_keys = [key for key in generation_keys if key not in dead_generators] + live_judges
+    return live_judges, seed_workers({key: results[key] for key in live_keys}) or None
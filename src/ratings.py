@@ -0,0 +1,322 @@
+"""
+Bradley-Terry / Plackett-Luce ratings fitted from judge rankings.
+
+Every ranking is turned into choice events: a winner picked out of a choice set of answers.
+
+- bradley_terry: one event per answer pair, where the better-ranked answer beats the other.
+- plackett_luce: one event per ranking position. The answer at position t is chosen over every
+  answer ranked below it.
+
+Identical events are merged into unique patterns. The data then becomes a sparse (prompts x patterns)
+count matrix. Its width depends on the number of models, not the number of prompts. A cluster-bootstrap
+resample is just a reweighting of its rows, so all resamples are fitted together as one batch with
+a damped Newton solver whose sufficient statistics are sparse matrix products.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+CURRENT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = CURRENT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.resampling import MAX_WEIGHT_CELLS, bootstrap_weights, percentile_interval
+
+METHODS = ("bradley_terry", "plackett_luce")
+
+# Elo-style display scale: a 400 point gap is 10:1 odds of winning a head-to-head comparison.
+ELO_SCALE = 400 / np.log(10)
+ELO_BASE = 1000.0
+
+
+def ranking_events(df: pd.DataFrame, method: str = "bradley_terry") -> dict:
+    """
+    Convert the rankings in a merged frame into unique choice-event patterns.
+
+    Items are answer slots (`{vendor}_{tier}`). Returns the item labels and their (vendor, tier) slots, the
+    prompt labels, the winner of each pattern, a sparse (patterns x items) choice-set matrix and a sparse
+    (prompts x patterns) count matrix.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown rating method: {method}")
+
+    prompt_codes, prompt_ids = pd.factorize(df["prompt_id"])
+    judge_codes, judges = pd.factorize(df["judge"])
+    judgment_codes = prompt_codes * len(judges) + judge_codes
+    vendor_codes, vendors = pd.factorize(df["model_vendor"], sort=True)
+    tier_codes, tiers = pd.factorize(df["model_tier"], sort=True)
+    slot_codes, item_codes = np.unique(vendor_codes * len(tiers) + tier_codes, return_inverse=True)
+    slots = [(vendors[c // len(tiers)], tiers[c % len(tiers)]) for c in slot_codes]
+    items = [f"{vendor}_{tier}" for vendor, tier in slots]
+    n_items = len(items)
+
+    order = np.lexsort((df["rank"].to_numpy(), judgment_codes))
+    judgment_sorted = judgment_codes[order]
+    starts = np.flatnonzero(np.r_[True, judgment_sorted[1:] != judgment_sorted[:-1]])
+    sizes = np.diff(np.r_[starts, len(order)])
+
+    # Events as (prompt, winner, padded choice set); rankings of equal length are expanded as one block.
+    max_size = int(sizes.max()) if len(sizes) else 0
+    blocks = []
+    for size in np.unique(sizes[sizes >= 2]):
+        first = starts[sizes == size]
+        rows = order[first[:, None] + np.arange(size)]
+        ranked = item_codes[rows]
+        prompts = prompt_codes[rows[:, 0]]
+        if method == "bradley_terry":
+            winner_pos, loser_pos = np.triu_indices(size, k=1)
+            winners = ranked[:, winner_pos]
+            choice = np.stack([ranked[:, winner_pos], ranked[:, loser_pos]], axis=2)
+        else:
+            winners = ranked[:, :-1]
+            suffix = np.arange(size)[None, :] >= np.arange(size - 1)[:, None]
+            choice = np.where(suffix[None], ranked[:, None, :], -1)
+        choice = np.sort(choice, axis=2)
+        choice = np.pad(choice, ((0, 0), (0, 0), (max_size - choice.shape[2], 0)), constant_values=-1)
+        n_events = winners.shape[1]
+        blocks.append(
+            np.column_stack(
+                [np.repeat(prompts, n_events), winners.ravel(), choice.reshape(-1, max_size)]
+            )
+        )
+
+    if not blocks:
+        return {
+            "items": items,
+            "slots": slots,
+            "prompt_ids": list(prompt_ids),
+            "winners": np.zeros(0, dtype=np.int64),
+            "choice_sets": sparse.csr_matrix((0, n_items)),
+            "counts": sparse.csr_matrix((len(prompt_ids), 0)),
+        }
+
+    events = np.concatenate(blocks, axis=0)
+    columns = events[:, 1:] + 1
+    if (n_items + 1) ** columns.shape[1] < 2**62:
+        # Pack each (winner, choice set) row into one integer so deduplication is a 1-D unique.
+        keys = columns @ ((n_items + 1) ** np.arange(columns.shape[1], dtype=np.int64))
+        _, first, pattern_codes = np.unique(keys, return_index=True, return_inverse=True)
+        patterns = events[first, 1:]
+    else:
+        patterns, pattern_codes = np.unique(events[:, 1:], axis=0, return_inverse=True)
+    pattern_codes = pattern_codes.ravel()
+
+    members = patterns[:, 1:]
+    pattern_rows, member_cols = np.nonzero(members >= 0)
+    choice_sets = sparse.csr_matrix(
+        (np.ones(len(pattern_rows)), (pattern_rows, members[pattern_rows, member_cols])),
+        shape=(len(patterns), n_items),
+    )
+    counts = sparse.csr_matrix(
+        (np.ones(len(events)), (events[:, 0], pattern_codes)), shape=(len(prompt_ids), len(patterns))
+    )
+    counts.sum_duplicates()
+
+    return {
+        "items": items,
+        "slots": slots,
+        "prompt_ids": list(prompt_ids),
+        "winners": patterns[:, 0],
+        "choice_sets": choice_sets,
+        "counts": counts,
+    }
+
+
+def _member_pairs(choice_sets: sparse.csr_matrix) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # Every ordered (member a, member b) pair of every choice set, as positions into `choice_sets.indices`.
+    indptr = choice_sets.indptr
+    sizes = np.diff(indptr)
+    patterns, pos_a, pos_b = [], [], []
+    for size in np.unique(sizes[sizes > 0]):
+        rows = np.flatnonzero(sizes == size)
+        a, b = np.divmod(np.arange(size * size), size)
+        patterns.append(np.repeat(rows, size * size))
+        pos_a.append((indptr[rows][:, None] + a).ravel())
+        pos_b.append((indptr[rows][:, None] + b).ravel())
+    if not patterns:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, empty
+    pos_a, pos_b = np.concatenate(pos_a), np.concatenate(pos_b)
+    cells = choice_sets.indices[pos_a] * choice_sets.shape[1] + choice_sets.indices[pos_b]
+    return np.concatenate(patterns), pos_a, pos_b, cells
+
+
+def fit_strengths(
+    event_weights: np.ndarray,
+    winners: np.ndarray,
+    choice_sets: sparse.csr_matrix,
+    prior: float = 1.0,
+    max_iter: int = 100,
+    tol: float = 1e-8,
+    initial: np.ndarray = None,
+) -> np.ndarray:
+    """
+    Batched Newton fit of Plackett-Luce log-strengths. Bradley-Terry is the special case where every
+    choice set has two items.
+
+    `event_weights` is (batch x patterns), and each row is an independent data set, such as one bootstrap
+    resample. `prior` adds that many virtual wins and losses against a reference item of strength 1 for every
+    item. This keeps estimates finite for items that never win or never lose, and makes each step well posed.
+    Rows are solved in memory-bounded chunks. `initial` (items,) warm-starts every row, e.g. bootstrap
+    resamples from the full-data fit. Returns log-strengths relative to the reference item, with shape
+    (batch x items).
+    """
+    event_weights = np.atleast_2d(np.asarray(event_weights, dtype=np.float64))
+    choice_sets = sparse.csr_matrix(choice_sets)
+    n_batch, n_patterns = event_weights.shape
+    n_items = choice_sets.shape[1]
+    if n_items == 0:
+        return np.zeros((n_batch, 0))
+
+    win_matrix = sparse.csr_matrix(
+        (np.ones(len(winners)), (np.arange(len(winners)), winners)), shape=(len(winners), n_items)
+    )
+    nnz_rows = np.repeat(np.arange(n_patterns), np.diff(choice_sets.indptr))
+    nnz_items = sparse.csr_matrix(
+        (np.ones(choice_sets.nnz), (np.arange(choice_sets.nnz), choice_sets.indices)),
+        shape=(choice_sets.nnz, n_items),
+    )
+    # Without a reference item the scale is free; the rank-one term pins the mean log-strength instead.
+    gauge = np.full((n_items, n_items), 1.0 / n_items) + 1e-9 * np.eye(n_items) if prior <= 0 else 0.0
+
+    # Small problems expand every member pair once, so the Hessians of a whole chunk come from one sparse
+    # product. Large ones build each row's Hessian with a sparse-sparse product instead.
+    row_cells = max(n_patterns, choice_sets.nnz, n_items * n_items, 1)
+    n_pairs = int((np.diff(choice_sets.indptr) ** 2).sum())
+    use_pairs = 2 * max(row_cells, n_pairs) <= MAX_WEIGHT_CELLS
+    if use_pairs:
+        pair_patterns, pair_a, pair_b, pair_cells = _member_pairs(choice_sets)
+        pair_matrix = sparse.csr_matrix(
+            (np.ones(len(pair_cells)), (np.arange(len(pair_cells)), pair_cells)),
+            shape=(len(pair_cells), n_items**2),
+        )
+        row_cells = max(row_cells, n_pairs)
+    chunk_size = max(1, MAX_WEIGHT_CELLS // row_cells)
+    results = []
+    for start in range(0, n_batch, chunk_size):
+        weights = event_weights[start : start + chunk_size]
+        wins = np.asarray((win_matrix.T @ weights.T).T)
+        theta = np.zeros((weights.shape[0], n_items))
+        if initial is not None:
+            theta += initial
+        for _ in range(max_iter):
+            gamma = np.exp(theta)
+            set_strength = np.asarray(choice_sets @ gamma.T).T[:, nnz_rows]
+            share = gamma[:, choice_sets.indices] / set_strength
+            expected = np.asarray((nnz_items.T @ (weights[:, nnz_rows] * share).T).T)
+            if use_pairs:
+                joint = weights[:, pair_patterns] * share[:, pair_a] * share[:, pair_b]
+                information = -np.asarray((pair_matrix.T @ joint.T).T).reshape(-1, n_items, n_items)
+            else:
+                information = np.empty((len(weights), n_items, n_items))
+                for row in range(len(weights)):
+                    scaled = sparse.csr_matrix(
+                        (np.sqrt(weights[row, nnz_rows]) * share[row], choice_sets.indices, choice_sets.indptr),
+                        shape=choice_sets.shape,
+                    )
+                    information[row] = -(scaled.T @ scaled).toarray()
+
+            reference = 1 / (1 + np.exp(-theta))
+            gradient = wins - expected + prior * (1 - 2 * reference)
+            diagonal = expected + 2 * prior * reference * (1 - reference)
+            information[:, np.arange(n_items), np.arange(n_items)] += diagonal
+            step = np.linalg.solve(information + gauge, gradient[..., None])[..., 0]
+
+            # Damped Newton: cap the largest move per iteration so early steps cannot overshoot.
+            largest = np.abs(step).max(axis=1, keepdims=True)
+            theta += step / np.maximum(largest, 1.0)
+            if largest.max() < tol:
+                break
+        results.append(theta)
+
+    return np.concatenate(results, axis=0) if results else np.zeros((0, n_items))
+
+
+def _to_elo(log_strengths: np.ndarray) -> np.ndarray:
+    # Centered per row, so the average item sits at ELO_BASE.
+    return ELO_BASE + ELO_SCALE * (log_strengths - log_strengths.mean(axis=-1, keepdims=True))
+
+
+def fit_ratings(
+    df: pd.DataFrame,
+    judge: str = None,
+    method: str = "bradley_terry",
+    n_bootstrap: int = 1000,
+    confidence: float = 0.95,
+    seed: int = None,
+    prior: float = 1.0,
+    max_iter: int = 100,
+    tol: float = 1e-8,
+) -> pd.DataFrame:
+    """
+    Ratings for every answer slot from one judge's rankings, or from all judges pooled when `judge` is None.
+
+    `rating` is on an Elo-like scale centered at 1000. `ci_low` / `ci_high` are percentile intervals from a
+    prompt-clustered bootstrap when `n_bootstrap` > 0.
+    """
+    if judge:
+        df = df[df["judge"] == judge]
+
+    events = ranking_events(df, method=method)
+    if not events["items"]:
+        return pd.DataFrame(columns=["item", "model_vendor", "model_tier", "strength", "rating", "wins"])
+    counts = events["counts"]
+    point = fit_strengths(
+        np.asarray(counts.sum(axis=0)), events["winners"], events["choice_sets"], prior, max_iter, tol
+    )[0]
+
+    per_item = pd.DataFrame(
+        {
+            "item": events["items"],
+            "model_vendor": [vendor for vendor, _ in events["slots"]],
+            "model_tier": [tier for _, tier in events["slots"]],
+        }
+    )
+    wins = np.bincount(events["winners"], weights=np.asarray(counts.sum(axis=0)).ravel(), minlength=len(per_item))
+    per_item["strength"] = point - point.mean()
+    per_item["rating"] = _to_elo(point)
+    per_item["wins"] = wins
+
+    if n_bootstrap > 0 and counts.shape[1] > 0:
+        n_prompts = counts.shape[0]
+        chunk_size = max(1, min(n_bootstrap, MAX_WEIGHT_CELLS // max(n_prompts, counts.shape[1], 1)))
+        sizes = [min(chunk_size, n_bootstrap - start) for start in range(0, n_bootstrap, chunk_size)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        samples = []
+        for size, chunk_seed in zip(sizes, seeds):
+            weights = bootstrap_weights(n_prompts, size, np.random.default_rng(chunk_seed))
+            event_weights = np.asarray((counts.T @ weights.T).T)
+            samples.append(
+                fit_strengths(
+                    event_weights, events["winners"], events["choice_sets"], prior, max_iter, tol, initial=point
+                )
+            )
+        low, high = percentile_interval(_to_elo(np.concatenate(samples, axis=0)), confidence)
+        per_item["ci_low"] = low
+        per_item["ci_high"] = high
+
+    return per_item.sort_values("rating", ascending=False).reset_index(drop=True)
+
+
+def compute_ratings(
+    df: pd.DataFrame,
+    method: str = "bradley_terry",
+    n_bootstrap: int = 1000,
+    confidence: float = 0.95,
+    seed: int = None,
+    prior: float = 1.0,
+) -> pd.DataFrame:
+    """Per-judge ratings plus a pooled `all` row set, stacked into one table with a `judge` column."""
+    tables = []
+    for judge in [*sorted(df["judge"].unique()), None]:
+        table = fit_ratings(
+            df, judge=judge, method=method, n_bootstrap=n_bootstrap, confidence=confidence, seed=seed, prior=prior
+        )
+        table.insert(0, "judge", judge or "all")
+        tables.append(table)
+    return pd.concat(tables, ignore_index=True)
@@ -0,0 +1,235 @@
+"""
+Self-bias and statistics tables for every judge x vendor combination at once.
+
+`generate_summary_report` covers one target vendor and filters the frame again for every table it prints.
+Here the merged frame is aggregated once, grouped by categorical judge / vendor / tier columns so every
+combination appears even when its count is zero. Every table is then derived from that small aggregate:
+top-1 rates, score summaries, self-bias differences, chi-square and binomial tests. The result can be exported
+as JSON or Markdown.
+"""
+
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+CURRENT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = CURRENT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.analysis import VENDORS, build_prompt_tensors, load_and_merge_data
+from src.resampling import permutation_test_self_bias
+
+
+def categorical_frame(df: pd.DataFrame) -> pd.DataFrame:
+    vendors = VENDORS + sorted(set(df["model_vendor"]) - set(VENDORS))
+    return df.assign(
+        judge=pd.Categorical(df["judge"], categories=sorted(df["judge"].unique())),
+        model_vendor=pd.Categorical(df["model_vendor"], categories=vendors),
+        model_tier=pd.Categorical(df["model_tier"], categories=sorted(df["model_tier"].unique())),
+    )
+
+
+def aggregate_cells(df: pd.DataFrame) -> pd.DataFrame:
+    """The single groupby pass: top-1 counts and score moments per judge x vendor x tier."""
+    if not isinstance(df["judge"].dtype, pd.CategoricalDtype):
+        df = categorical_frame(df)
+    return df.groupby(["judge", "model_vendor", "model_tier"], observed=False, sort=True).agg(
+        top1_count=("is_top_ranked", "sum"),
+        count=("score", "size"),
+        mean_score=("score", "mean"),
+        std_score=("score", "std"),
+    )
+
+
+def build_bias_report(
+    df: pd.DataFrame,
+    n_permutations: int = 0,
+    alternative: str = "two-sided",
+    significance_level: float = 0.05,
+    seed: int = None,
+) -> dict:
+    """
+    Top-1, score, self-bias and test tables for all judges and vendors.
+
+    In the self-bias table, each judge's rate of ranking a vendor #1 is compared with the other judges' average
+    rate for that vendor, the same comparison `detect_self_bias` makes for `{vendor}_thinking`. The binomial
+    test in each row compares the judge's rate with a uniform 1 / n_vendors instead, so it only sets
+    `differs_from_uniform`. With `n_permutations` > 0 every row also gets a within-prompt permutation test of the
+    self-bias difference, and `significant` is set from it; without one, `significant` is left out.
+    """
+    cells = aggregate_cells(df)
+    judges = list(cells.index.levels[0])
+    vendors = list(cells.index.levels[1])
+    n_judges, n_vendors = len(judges), len(vendors)
+
+    top1 = cells["top1_count"].groupby(level=[0, 1], observed=False).sum().to_numpy().reshape(n_judges, n_vendors)
+    totals = top1.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rates = np.where(totals[:, None] > 0, top1 / totals[:, None], 0.0)
+        # Leave-one-out mean over the other judges, for every (judge, vendor) at once.
+        other_avg = (rates.sum(axis=0, keepdims=True) - rates) / (n_judges - 1) if n_judges > 1 else rates * np.nan
+
+    judge_grid = np.repeat(judges, n_vendors)
+    vendor_grid = np.tile(vendors, n_judges)
+    top1_table = pd.DataFrame(
+        {
+            "judge": judge_grid,
+            "vendor": vendor_grid,
+            "top1_count": top1.ravel(),
+            "total_judgments": np.repeat(totals, n_vendors),
+            "top1_percentage": rates.ravel() * 100,
+        }
+    )
+
+    scores = cells[["mean_score", "std_score", "count"]].reset_index()
+    scores.columns = ["judge", "vendor", "tier", "mean_score", "std_score", "count"]
+    scores = scores[scores["count"] > 0].reset_index(drop=True)
+    scores[["judge", "vendor", "tier"]] = scores[["judge", "vendor", "tier"]].astype(str)
+
+    expected_rate = 1 / n_vendors if n_vendors else math.nan
+    # Against uniform preference, not the other judges. Two-sided: twice the smaller tail.
+    lower_tail = stats.binom.cdf(top1, totals[:, None], expected_rate)
+    upper_tail = stats.binom.sf(top1 - 1, totals[:, None], expected_rate)
+    binomial_p = np.minimum(1.0, 2 * np.minimum(lower_tail, upper_tail))
+    self_bias = pd.DataFrame(
+        {
+            "judge": judge_grid,
+            "vendor": vendor_grid,
+            "is_own_vendor": [judge.split("_")[0] == vendor for judge, vendor in zip(judge_grid, vendor_grid)],
+            "rate": rates.ravel(),
+            "other_judges_avg_rate": other_avg.ravel(),
+            "bias_difference": (rates - other_avg).ravel(),
+            "binomial_p_value": binomial_p.ravel(),
+        }
+    )
+
+    if n_permutations:
+        t = build_prompt_tensors(df)
+        p_values = []
+        for judge, vendor in zip(judge_grid, vendor_grid):
+            v = t["vendors"].index(vendor)
+            result = permutation_test_self_bias(
+                t["top1"][:, :, v],
+                t["judgments"],
+                target=t["judges"].index(judge),
+                n_permutations=n_permutations,
+                alternative=alternative,
+                seed=seed,
+            )
+            p_values.append(result["p_value"])
+        self_bias["permutation_p_value"] = p_values
+
+    self_bias["differs_from_uniform"] = self_bias["binomial_p_value"] < significance_level
+    if n_permutations:
+        self_bias["significant"] = self_bias["permutation_p_value"] < significance_level
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        chi2, chi2_p = stats.chisquare(top1, np.repeat(totals[:, None] / n_vendors, n_vendors, axis=1), axis=1)
+    chi_square = pd.DataFrame(
+        {
+            "judge": judges,
+            "total_judgments": totals,
+            "chi2_statistic": chi2,
+            "p_value": chi2_p,
+            "significant": chi2_p < significance_level,
+        }
+    )
+
+    return {
+        "judges": judges,
+        "vendors": vendors,
+        "significance_level": significance_level,
+        "n_permutations": n_permutations,
+        "top1": top1_table,
+        "scores": scores,
+        "self_bias": self_bias,
+        "chi_square": chi_square,
+    }
+
+
+TABLES = ("top1", "scores", "self_bias", "chi_square")
+
+
+def _json_value(value):
+    if isinstance(value, (np.integer, np.bool_)):
+        return value.item()
+    if isinstance(value, (float, np.floating)):
+        return None if math.isnan(value) else float(value)
+    return value
+
+
+def report_to_json(report: dict, indent: int = 2) -> str:
+    payload = {key: value for key, value in report.items() if key not in TABLES}
+    for name in TABLES:
+        payload[name] = [
+            {column: _json_value(value) for column, value in row.items()}
+            for row in report[name].to_dict(orient="records")
+        ]
+    return json.dumps(payload, indent=indent, ensure_ascii=False)
+
+
+def _markdown_table(df: pd.DataFrame) -> str:
+    def fmt(value):
+        if isinstance(value, (float, np.floating)):
+            return "" if math.isnan(value) else f"{value:.4g}"
+        return str(value)
+
+    lines = ["| " + " | ".join(df.columns) + " |", "|" + "---|" * len(df.columns)]
+    for row in df.itertuples(index=False):
+        lines.append("| " + " | ".join(fmt(value) for value in row) + " |")
+    return "\n".join(lines)
+
+
+def report_to_markdown(report: dict) -> str:
+    titles = {
+        "top1": "Top-1 preference",
+        "scores": "Average scores",
+        "self_bias": "Self-bias",
+        "chi_square": "Chi-square (uniform preference)",
+    }
+    sections = ["# Bias evaluation report", f"Judges: {', '.join(report['judges'])}"]
+    for name in TABLES:
+        sections.append(f"## {titles[name]}\n\n{_markdown_table(report[name])}")
+    return "\n\n".join(sections) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Self-bias report for every judge x vendor combination")
+    parser.add_argument("--answers", type=str, required=True)
+    parser.add_argument("--judgments", type=str, required=True)
+    parser.add_argument("--format", type=str, default="markdown", choices=["markdown", "json"])
+    parser.add_argument("--output", type=str, default=None, help="Write the report here instead of stdout")
+    parser.add_argument(
+        "--n-permutations",
+        type=int,
+        default=1000,
+        help="Permutations for the self-bias significance test (0 skips it and the `significant` column)",
+    )
+    parser.add_argument("--significance-level", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    df = load_and_merge_data(args.answers, args.judgments)
+    report = build_bias_report(
+        df, n_permutations=args.n_permutations, significance_level=args.significance_level, seed=args.seed
+    )
+    text = report_to_json(report) if args.format == "json" else report_to_markdown(report)
+
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w") as f:
+            f.write(text)
+        print(f"✓ Report saved to: {args.output}")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+import itertools
+import math
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Upper bound on the number of float64 cells of the (resamples x prompts) weight matrix held in memory at once.
+MAX_WEIGHT_CELLS = 4_000_000
+
+# Largest number of judge orders (J!) enumerated into a lookup table for permutation tests.
+MAX_ORDER_TABLE = 5040
+
+
+def bootstrap_weights(n_prompts: int, n_resamples: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Draw `n_resamples` cluster-bootstrap resamples of `n_prompts` prompts.
+
+    Returns a (resamples x prompts) matrix whose entry [b, p] is how many times prompt p was drawn in
+    resample b. Built from a single index matrix with one `bincount`, so there is no Python-level loop.
+    """
+    idx = rng.integers(0, n_prompts, size=(n_resamples, n_prompts))
+    idx += (np.arange(n_resamples) * n_prompts)[:, None]
+    counts = np.bincount(idx.ravel(), minlength=n_resamples * n_prompts)
+    return counts.reshape(n_resamples, n_prompts).astype(np.float64)
+
+
+def _bootstrap_ratio_chunk(
+    numerators: np.ndarray, denominators: np.ndarray, n_resamples: int, seed: np.random.SeedSequence
+) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    weights = bootstrap_weights(numerators.shape[0], n_resamples, rng)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return (weights @ numerators) / (weights @ denominators)
+
+
+def bootstrap_ratios(
+    numerators: np.ndarray,
+    denominators: np.ndarray,
+    n_resamples: int = 10000,
+    seed: int = None,
+    n_jobs: int = 1,
+) -> np.ndarray:
+    """
+    Cluster-bootstrap ratio statistics (rates, means) that are sums over prompts.
+
+    `numerators` and `denominators` are (prompts x features) per-prompt sums, e.g. top-1 counts and
+    judgment counts. Every resample reweights whole prompts, so within-prompt correlation is preserved.
+    Returns a (resamples x features) array, NaN where a resample has a zero denominator. Work is split into
+    fixed-size chunks with independent seeds, so results are identical for any `n_jobs`.
+    """
+    numerators = np.asarray(numerators, dtype=np.float64)
+    denominators = np.asarray(denominators, dtype=np.float64)
+    n_prompts = numerators.shape[0]
+    chunk_size = max(1, min(n_resamples, MAX_WEIGHT_CELLS // max(n_prompts, 1)))
+    sizes = [min(chunk_size, n_resamples - start) for start in range(0, n_resamples, chunk_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    if n_jobs is not None and n_jobs > 1 and len(sizes) > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            chunks = list(
+                executor.map(
+                    _bootstrap_ratio_chunk,
+                    [numerators] * len(sizes),
+                    [denominators] * len(sizes),
+                    sizes,
+                    seeds,
+                )
+            )
+    else:
+        chunks = [_bootstrap_ratio_chunk(numerators, denominators, size, s) for size, s in zip(sizes, seeds)]
+
+    return np.concatenate(chunks, axis=0)
+
+
+def percentile_interval(samples: np.ndarray, confidence: float = 0.95) -> tuple[np.ndarray, np.ndarray]:
+    alpha = (1 - confidence) / 2
+    with warnings.catch_warnings():
+        # Features with no data in any resample (e.g. a judge that never saw a vendor) yield NaN bounds.
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low, high = np.nanpercentile(samples, [100 * alpha, 100 * (1 - alpha)], axis=0)
+    return low, high
+
+
+def _self_bias_statistic(hits: np.ndarray, totals: np.ndarray, target: int) -> np.ndarray:
+    # hits/totals: (..., prompts, judges). Target judge's rate minus the mean rate of the other judges.
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rates = hits.sum(axis=-2) / totals.sum(axis=-2)
+    others = np.delete(rates, target, axis=-1)
+    return rates[..., target] - np.nanmean(others, axis=-1)
+
+
+def permutation_test_self_bias(
+    hits: np.ndarray,
+    totals: np.ndarray,
+    target: int,
+    n_permutations: int = 10000,
+    alternative: str = "two-sided",
+    seed: int = None,
+    memory_budget_mb: float = 64.0,
+) -> dict:
+    """
+    Permutation test for judge self-bias that shuffles judge labels within each prompt.
+
+    `hits` and `totals` are (prompts x judges) arrays: how often each judge ranked the target vendor #1 on a
+    prompt, and how many judgments it made there (0 for a missing judgment). Under the null hypothesis judge
+    identity is exchangeable within a prompt. Permutations are evaluated in chunks of a
+    (permutations x prompts x judges) array sized to `memory_budget_mb`. When every relabelling fits within
+    `n_permutations`, all of them are enumerated and the p-value is exact.
+    """
+    hits = np.asarray(hits, dtype=np.float64)
+    totals = np.asarray(totals, dtype=np.float64)
+    n_prompts, n_judges = hits.shape
+    observed = float(_self_bias_statistic(hits, totals, target))
+
+    # Per permutation we hold one order code per prompt, the gathered judge orders and two gathered arrays
+    # (plus the random keys when orders are drawn by argsort).
+    bytes_per_permutation = 8 * n_prompts * (1 + 4 * n_judges)
+    chunk_size = max(1, int(memory_budget_mb * 1024 * 1024) // bytes_per_permutation)
+
+    n_orders = math.factorial(n_judges)
+    # Drawing an index into a table of all J! orders is much cheaper than argsorting random keys.
+    all_orders = (
+        np.array(list(itertools.permutations(range(n_judges))), dtype=np.int64)
+        if n_orders <= MAX_ORDER_TABLE
+        else None
+    )
+    exact = all_orders is not None and n_prompts * math.log(n_orders) <= math.log(max(n_permutations, 1))
+    total = n_orders**n_prompts if exact else n_permutations
+
+    rng = np.random.default_rng(seed)
+    radix = n_orders ** np.arange(n_prompts, dtype=np.int64) if exact else None
+    # With every judge present exactly as often on every prompt, the other judges' mean rate is fixed by the
+    # target's, so only the label landing in the target slot has to be drawn.
+    balanced = not exact and n_judges > 1 and np.all(totals == totals.flat[0]) and totals.flat[0] > 0
+    if balanced:
+        chunk_size = max(1, int(memory_budget_mb * 1024 * 1024) // (2 * 8 * n_prompts))
+        slot_total = totals.flat[0] * n_prompts
+        prompt_index = np.arange(n_prompts)[None, :]
+
+    null = np.empty(total, dtype=np.float64)
+    for start in range(0, total, chunk_size):
+        size = min(chunk_size, total - start)
+        if balanced:
+            target_hits = hits[prompt_index, rng.integers(0, n_judges, size=(size, n_prompts))].sum(axis=1)
+            other_mean = (hits.sum() - target_hits) / ((n_judges - 1) * slot_total)
+            null[start : start + size] = target_hits / slot_total - other_mean
+            continue
+        if exact:
+            codes = np.arange(start, start + size, dtype=np.int64)
+            orders = all_orders[(codes[:, None] // radix[None, :]) % n_orders]
+        elif all_orders is not None:
+            orders = all_orders[rng.integers(0, n_orders, size=(size, n_prompts))]
+        else:
+            orders = np.argsort(rng.random((size, n_prompts, n_judges)), axis=2)
+        null[start : start + size] = _self_bias_statistic(
+            np.take_along_axis(hits[None], orders, axis=2),
+            np.take_along_axis(totals[None], orders, axis=2),
+            target,
+        )
+
+    # Small tolerance so permutations that reproduce the observed value exactly count as "as extreme".
+    tol = 1e-12
+    if alternative == "greater":
+        extreme = null >= observed - tol
+    elif alternative == "less":
+        extreme = null <= observed + tol
+    elif alternative == "two-sided":
+        extreme = np.abs(null) >= abs(observed) - tol
+    else:
+        raise ValueError(f"Unknown alternative: {alternative}")
+
+    if exact:
+        p_value = float(np.mean(extreme))
+    else:
+        p_value = float((extreme.sum() + 1) / (total + 1))
+
+    return {
+        "test": "Within-prompt judge-label permutation test",
+        "method": "exact" if exact else "monte_carlo",
+        "alternative": alternative,
+        "statistic": observed,
+        "p_value": p_value,
+        "n_permutations": int(total),
+        "null_mean": float(np.nanmean(null)),
+        "null_std": float(np.nanstd(null)),
+    }
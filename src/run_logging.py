@@ -0,0 +1,136 @@
+"""
+Non-blocking run logging for the generate / judge hot path.
+
+Worker threads and completion loops log through the `llm_eval` logger. Inside `run_logging(...)` that logger
+only has a `QueueHandler`, so a log call costs a queue put and never waits on the terminal. A `QueueListener`
+thread drains the queue into:
+
+- the console, through `tqdm.write` so progress bars stay intact, filtered by `--log-level`. Lines logged with
+  `extra={"progress": True}` (per-task completions, live bias rates) are rate limited to one per
+  `--progress-interval` seconds. Suppressed lines are counted on the next one that gets through. Warnings and
+  errors are never rate limited.
+- optionally `--log-json PATH`: every record at or above `--log-level` as one JSON object per line, with any
+  `extra` fields (stage, vendor, tier, prompt_id, ...) as keys. Progress lines are not rate limited here.
+
+Outside `run_logging` (library use, the sharded runner, the regenerate scripts) records go straight to the
+console as before.
+"""
+
+import contextlib
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from pathlib import Path
+
+from tqdm import tqdm
+
+LOG_LEVELS = ("DEBUG", "INFO", "WARNING", "ERROR")
+
+# Attributes every LogRecord has; anything else on a record came from `extra=`.
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+logger = logging.getLogger("llm_eval")
+logger.setLevel(logging.INFO)
+logger.propagate = False
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logger.getChild(name)
+
+
+class _TqdmHandler(logging.Handler):
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            tqdm.write(self.format(record), file=sys.stdout)
+        except Exception:
+            self.handleError(record)
+
+
+class ProgressRateLimit(logging.Filter):
+    """Lets at most one `progress` record through per `interval` seconds; 0 disables the limit."""
+
+    def __init__(self, interval: float = 1.0):
+        super().__init__()
+        self.interval = interval
+        self.suppressed = 0
+        self._last = 0.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "progress", False) or self.interval <= 0:
+            return True
+        now = time.monotonic()
+        if now - self._last < self.interval:
+            self.suppressed += 1
+            return False
+        self._last = now
+        if self.suppressed:
+            record.msg = f"{record.getMessage()} (+{self.suppressed} more)"
+            record.args = None
+            self.suppressed = 0
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRIBUTES})
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_direct_handler = _TqdmHandler()
+logger.addHandler(_direct_handler)
+
+
+def add_logging_arguments(parser) -> None:
+    parser.add_argument("--log-level", type=str, default="INFO", choices=LOG_LEVELS, help="Console / JSON log level")
+    parser.add_argument("--log-json", type=str, default=None, help="Also write JSON-lines logs to this file")
+    parser.add_argument(
+        "--progress-interval",
+        type=float,
+        default=1.0,
+        help="Show at most one per-task progress line per this many seconds, 0 for all (default: 1.0)",
+    )
+
+
+@contextlib.contextmanager
+def run_logging(level: str = "INFO", json_path: str = None, progress_interval: float = 1.0):
+    handlers: list[logging.Handler] = []
+    if json_path:
+        Path(json_path).parent.mkdir(parents=True, exist_ok=True)
+        json_handler = logging.FileHandler(json_path, mode="a", encoding="utf-8")
+        json_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(json_handler)
+    # Last: the rate limit rewrites the message of the line it lets through, which the JSON log must not see.
+    console = _TqdmHandler()
+    console.addFilter(ProgressRateLimit(progress_interval))
+    handlers.append(console)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    previous_level = logger.level
+    logger.setLevel(level)
+    logger.removeHandler(_direct_handler)
+    logger.addHandler(queue_handler)
+    listener.start()
+    try:
+        yield logger
+    finally:
+        # stop() enqueues a sentinel and joins the listener thread, so every queued record is written first.
+        listener.stop()
+        logger.removeHandler(queue_handler)
+        logger.addHandler(_direct_handler)
+        logger.setLevel(previous_level)
+        for handler in handlers:
+            handler.close()
@@ -0,0 +1,194 @@
+"""
+Operational counters for a generation / judging run, served in Prometheus text format.
+
+Start it with `--metrics-port PORT` on generate_answers.py, judge_answers.py or pipeline.py and point Prometheus
+(or just curl) at http://127.0.0.1:PORT/metrics. Every task reports when it starts and when it finishes. Latency,
+attempts and tokens come from the record's telemetry envelope, so the endpoint costs nothing per API call.
+"""
+
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from src.telemetry import TOKEN_FIELDS
+
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _labels(**labels: str) -> str:
+    if not labels:
+        return ""
+
+    def escape(value: str) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class RunMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.created = time.time()
+        # stage -> tasks planned / started, and when the first one started (for the completion rate).
+        self.planned: dict[str, int] = {}
+        self.started: dict[str, int] = {}
+        self.first_start: dict[str, float] = {}
+        # (stage, vendor, tier) -> value
+        self.in_flight: dict[tuple[str, str, str], int] = {}
+        self.completed: dict[tuple[str, str, str], int] = {}
+        self.errors: dict[tuple[str, str, str], int] = {}
+        self.retries: dict[tuple[str, str, str], int] = {}
+        self.latency_buckets: dict[tuple[str, str, str], list[int]] = {}
+        self.latency_sum: dict[tuple[str, str, str], float] = {}
+        # Records without telemetry (budget skips) count as completed but are not latency observations.
+        self.latency_count: dict[tuple[str, str, str], int] = {}
+        # (stage, vendor, tier, kind) -> tokens
+        self.tokens: dict[tuple[str, str, str, str], int] = {}
+
+    def add_planned(self, stage: str, count: int) -> None:
+        """Register `count` more tasks for a stage; negative when planned tasks are dropped (e.g. skipped prompts)."""
+        with self._lock:
+            self.planned[stage] = self.planned.get(stage, 0) + count
+
+    def task_started(self, stage: str, vendor: str, tier: str) -> None:
+        key = (stage, vendor, tier)
+        with self._lock:
+            self.started[stage] = self.started.get(stage, 0) + 1
+            self.first_start.setdefault(stage, time.monotonic())
+            self.in_flight[key] = self.in_flight.get(key, 0) + 1
+
+    def task_finished(self, stage: str, vendor: str, tier: str, record: dict[str, Any]) -> None:
+        key = (stage, vendor, tier)
+        telemetry = record.get("telemetry") or {}
+        with self._lock:
+            self.in_flight[key] = self.in_flight.get(key, 1) - 1
+            self.completed[key] = self.completed.get(key, 0) + 1
+            if "error" in record:
+                self.errors[key] = self.errors.get(key, 0) + 1
+            if telemetry:
+                self.retries[key] = self.retries.get(key, 0) + max(telemetry.get("attempts", 1) - 1, 0)
+                latency = telemetry.get("latency_s", 0.0)
+                buckets = self.latency_buckets.setdefault(key, [0] * len(LATENCY_BUCKETS))
+                for i, bound in enumerate(LATENCY_BUCKETS):
+                    if latency <= bound:
+                        buckets[i] += 1
+                self.latency_sum[key] = self.latency_sum.get(key, 0.0) + latency
+                self.latency_count[key] = self.latency_count.get(key, 0) + 1
+                for field in TOKEN_FIELDS:
+                    token_key = (stage, vendor, tier, field.removesuffix("_tokens"))
+                    self.tokens[token_key] = self.tokens.get(token_key, 0) + telemetry.get(field, 0)
+
+    def eta_seconds(self, stage: str) -> float:
+        """Remaining tasks divided by the stage's completion rate so far; NaN before anything has finished."""
+        done = sum(count for (s, _, _), count in self.completed.items() if s == stage)
+        if stage not in self.first_start or done == 0:
+            return math.nan
+        rate = done / max(time.monotonic() - self.first_start[stage], 1e-9)
+        return max(self.planned.get(stage, 0) - done, 0) / rate
+
+    def render(self) -> str:
+        lines: list[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples: list[tuple[dict[str, str], float]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(**labels)} {'NaN' if value != value else value}")
+
+        def by_key(values: dict[tuple[str, str, str], float]) -> list[tuple[dict[str, str], float]]:
+            return [
+                ({"stage": stage, "vendor": vendor, "tier": tier}, value)
+                for (stage, vendor, tier), value in sorted(values.items())
+            ]
+
+        with self._lock:
+            stages = sorted(self.planned)
+            family(
+                "llm_eval_queue_depth",
+                "gauge",
+                "Planned tasks not started yet.",
+                [({"stage": s}, max(self.planned[s] - self.started.get(s, 0), 0)) for s in stages],
+            )
+            family("llm_eval_in_flight", "gauge", "Tasks currently running.", by_key(self.in_flight))
+            family("llm_eval_completed_total", "counter", "Finished tasks, successful or not.", by_key(self.completed))
+            family("llm_eval_errors_total", "counter", "Finished tasks with an error record.", by_key(self.errors))
+            family(
+                "llm_eval_retries_total",
+                "counter",
+                "Provider requests beyond the first, across wrapper and task retries.",
+                by_key(self.retries),
+            )
+            family(
+                "llm_eval_tokens_total",
+                "counter",
+                "Tokens reported by providers.",
+                [
+                    ({"stage": stage, "vendor": vendor, "tier": tier, "kind": kind}, value)
+                    for (stage, vendor, tier, kind), value in sorted(self.tokens.items())
+                ],
+            )
+
+            lines.append("# HELP llm_eval_task_latency_seconds Wall time per task, including retries.")
+            lines.append("# TYPE llm_eval_task_latency_seconds histogram")
+            for (stage, vendor, tier), buckets in sorted(self.latency_buckets.items()):
+                base = {"stage": stage, "vendor": vendor, "tier": tier}
+                count = self.latency_count[(stage, vendor, tier)]
+                name = "llm_eval_task_latency_seconds"
+                for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                    lines.append(f"{name}_bucket{_labels(**base, le=str(bound))} {bucket_count}")
+                lines.append(f"{name}_bucket{_labels(**base, le='+Inf')} {count}")
+                lines.append(f"{name}_sum{_labels(**base)} {self.latency_sum[(stage, vendor, tier)]}")
+                lines.append(f"{name}_count{_labels(**base)} {count}")
+
+            family(
+                "llm_eval_eta_seconds",
+                "gauge",
+                "Estimated seconds until the stage's planned tasks finish, from its completion rate so far.",
+                [({"stage": s}, self.eta_seconds(s)) for s in stages],
+            )
+            family("llm_eval_start_time_seconds", "gauge", "Unix time the run started.", [({}, self.created)])
+        return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    metrics: RunMetrics = None
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        body = self.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(metrics: RunMetrics, port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    handler = type("MetricsHandler", (_MetricsHandler,), {"metrics": metrics})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    print(f"Serving run metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def add_metrics_arguments(parser) -> None:
+    parser.add_argument(
+        "--metrics-port", type=int, default=None, help="Serve live run metrics (Prometheus text) on this local port"
+    )
+
+
+def serve_run_metrics(port: int = None) -> RunMetrics | None:
+    """A RunMetrics served on `port`, or None (and no instrumentation) when no port was given."""
+    if port is None:
+        return None
+    metrics = RunMetrics()
+    start_metrics_server(metrics, port)
+    return metrics
@@ -0,0 +1,128 @@
+import heapq
+import itertools
+import math
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable
+
+from src.tracing import span
+
+# Lower value = scheduled first. Downstream stages drain before new upstream work is started so that
+# finished prompts flow through the pipeline instead of piling up behind the generation backlog.
+STAGE_PRIORITY = {"judge": 0, "generate": 1}
+
+DEFAULT_VENDOR_SHARE = 0.5
+
+
+def add_fairness_arguments(parser) -> None:
+    parser.add_argument(
+        "--vendor-share",
+        type=float,
+        default=DEFAULT_VENDOR_SHARE,
+        help="Largest share of the workers one vendor may hold while other vendors have tasks waiting "
+        f"(default: {DEFAULT_VENDOR_SHARE}; 1 disables the limit)",
+    )
+
+
+class ScheduledTask:
+    def __init__(
+        self,
+        fn: Callable[..., Any],
+        args: tuple = (),
+        kwargs: dict[str, Any] = None,
+        stage: str = "generate",
+        meta: dict[str, Any] = None,
+        callback: Callable[["ScheduledTask", Any, BaseException], None] = None,
+        priority: float = 0.0,
+        group: str = None,
+    ):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.stage = stage
+        self.meta = meta or {}
+        self.callback = callback
+        # Within a stage, higher priority runs first (e.g. predicted seconds, for longest-first); ties run FIFO.
+        self.priority = priority
+        # Tasks of one group (e.g. a vendor) share the scheduler's per-group limit.
+        self.group = group
+        self.enqueued_at: float = None
+
+
+class TaskScheduler:
+    """
+    Bounded-concurrency task runner shared by all pipeline stages.
+
+    Tasks wait in per-stage priority queues (FIFO among equal priorities) and are handed to a single thread
+    pool, never exceeding `max_in_flight` submitted-but-unfinished tasks (the backpressure budget). Completion
+    callbacks run on the thread that called `run()` and may enqueue further tasks, which is how one stage feeds
+    the next.
+
+    With `group_share`, a group holds at most that share of `max_in_flight` while another group of the same
+    stage has a task waiting, so one slow vendor cannot take every worker. When only capped groups have work
+    left, they may exceed it rather than leave workers idle.
+    """
+
+    def __init__(self, max_workers: int, max_in_flight: int = None, group_share: float = None):
+        self.max_workers = max_workers
+        self.max_in_flight = max(max_in_flight or max_workers, 1)
+        self.group_limit = max(math.ceil(self.max_in_flight * group_share), 1) if group_share else None
+        # stage -> group -> heap of (-priority, sequence number, task)
+        self._queues: dict[str, dict[str | None, list]] = {}
+        self._in_flight: dict[Future, ScheduledTask] = {}
+        self._group_in_flight: dict[str | None, int] = {}
+        self._sequence = itertools.count()
+
+    def add(self, task: ScheduledTask) -> None:
+        task.enqueued_at = time.perf_counter()
+        groups = self._queues.setdefault(task.stage, {})
+        heapq.heappush(groups.setdefault(task.group, []), (-task.priority, next(self._sequence), task))
+
+    def pending(self, stage: str = None) -> int:
+        stages = [self._queues.get(stage, {})] if stage is not None else self._queues.values()
+        return sum(len(heap) for groups in stages for heap in groups.values())
+
+    def in_flight(self) -> int:
+        return len(self._in_flight)
+
+    def _next_task(self) -> ScheduledTask | None:
+        for stage in sorted(self._queues, key=lambda s: STAGE_PRIORITY.get(s, len(STAGE_PRIORITY))):
+            waiting = [heap for heap in self._queues[stage].values() if heap]
+            if not waiting:
+                continue
+            if self.group_limit is not None:
+                under_limit = [
+                    heap for heap in waiting if self._group_in_flight.get(heap[0][2].group, 0) < self.group_limit
+                ]
+                waiting = under_limit or waiting
+            return heapq.heappop(min(waiting, key=lambda heap: heap[0][:2]))[2]
+        return None
+
+    def _fill(self, executor: ThreadPoolExecutor) -> None:
+        while len(self._in_flight) < self.max_in_flight:
+            task = self._next_task()
+            if task is None:
+                return
+            future = executor.submit(self._execute, task)
+            self._in_flight[future] = task
+            self._group_in_flight[task.group] = self._group_in_flight.get(task.group, 0) + 1
+
+    @staticmethod
+    def _execute(task: ScheduledTask) -> Any:
+        queue_wait_ms = (time.perf_counter() - task.enqueued_at) * 1000
+        with span(f"{task.stage}.task", queue_wait_ms=round(queue_wait_ms, 3), **task.meta):
+            return task.fn(*task.args, **task.kwargs)
+
+    def run(self) -> None:
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            self._fill(executor)
+            while self._in_flight:
+                done, _ = wait(list(self._in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = self._in_flight.pop(future)
+                    self._group_in_flight[task.group] -= 1
+                    exc = future.exception()
+                    result = None if exc is not None else future.result()
+                    if task.callback is not None:
+                        task.callback(task, result, exc)
+                self._fill(executor)
@@ -0,0 +1,311 @@
+"""
+Split a generation or judging run across processes and hosts with a file-based lease queue.
+
+Typical flow (the queue file and shard directory must sit on storage every worker can reach):
+
+  python src/sharded_run.py init  --queue run/queue.db --stage generate --prompts prompts.json
+  python src/sharded_run.py work  --queue run/queue.db --stage generate --shard-dir run/shards \\
+      --config config.yaml --prompts prompts.json --processes 4      # repeat on as many hosts as needed
+  python src/sharded_run.py merge --queue run/queue.db --stage generate --shard-dir run/shards \\
+      --output data/answers/answers.json
+
+Workers claim batches of prompt ids, write each finished batch to its own shard file and keep their lease
+alive with a heartbeat. If a worker dies, its lease expires and the batch is picked up by another worker.
+
+A `budget:` section in the config is enforced per worker process, not across the run: with N processes the
+run can spend up to N times each limit, so divide the limits accordingly.
+"""
+
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+
+CURRENT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = CURRENT_DIR.parent
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.insert(0, str(PROJECT_ROOT))
+
+from src.utils import load_config, load_prompts, load_json, save_json
+from src.models import ModelFactory
+from src.budget import BudgetTracker
+from src.work_queue import LeaseQueue
+from src.planner import LatencyModel, add_history_arguments
+from src.scheduler import add_fairness_arguments
+from src.generate_answers import add_sample_arguments, generate_all_answers
+from src.judge_answers import add_sample_mode_arguments, judge_all_answers, resolve_judges
+from src.telemetry import answer_group, judgment_group, telemetry_report
+
+STAGES = ("generate", "judge")
+
+
+def record_key(stage: str, record: dict[str, str]) -> tuple:
+    if stage == "generate":
+        return (record["answer_id"],)
+    return (record["prompt_id"], record["judge_model"], record.get("sample_index"))
+
+
+def group_by_prompt(records: list[dict[str, str]]) -> dict[str, list[dict[str, str]]]:
+    grouped: dict[str, list[dict[str, str]]] = {}
+    for record in records:
+        grouped.setdefault(record["prompt_id"], []).append(record)
+    return grouped
+
+
+def write_shard(records: list[dict[str, str]], shard_dir: str, stage: str, worker_id: str, batch_no: int) -> str:
+    shard_path = Path(shard_dir) / stage / f"{worker_id}-{batch_no:05d}.json"
+    tmp_path = shard_path.with_name(shard_path.name + ".tmp")
+    save_json(records, str(tmp_path))
+    # Atomic rename: a worker killed mid-write never leaves a truncated shard behind.
+    os.replace(tmp_path, shard_path)
+    return str(shard_path)
+
+
+class LeaseHeartbeat:
+    def __init__(self, queue_path: str, stage: str, worker_id: str, item_ids: list[str], lease_seconds: float):
+        self.queue_path = queue_path
+        self.stage = stage
+        self.worker_id = worker_id
+        self.item_ids = item_ids
+        self.lease_seconds = lease_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self) -> None:
+        # SQLite connections are bound to their thread, so the heartbeat opens its own.
+        queue = LeaseQueue(self.queue_path)
+        try:
+            while not self._stop.wait(self.lease_seconds / 3):
+                queue.renew(self.stage, self.worker_id, self.item_ids, self.lease_seconds)
+        finally:
+            queue.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(args: argparse.Namespace, worker_id: str) -> int:
+    queue = LeaseQueue(args.queue)
+    config = load_config(args.config)
+    model_factory = ModelFactory(config)
+    latency_model = LatencyModel.from_paths(args.history) if args.history else None
+    budget = BudgetTracker.from_config(config)
+
+    if args.stage == "generate":
+        prompts_by_id = {p["id"]: p for p in load_prompts(args.prompts)}
+    else:
+        answers_by_prompt = group_by_prompt(load_json(args.answers))
+        judges = resolve_judges(config, args.judges)
+        hint_mode = args.hint_mode or config.get("hinting", {}).get("mode", "none")
+
+    batch_no = 0
+    processed = 0
+    while True:
+        item_ids = queue.claim(args.stage, worker_id, args.batch_size, args.lease, max_attempts=args.max_attempts)
+        if not item_ids:
+            counts = queue.status(args.stage, args.max_attempts)
+            # Exhausted items will never be claimed again; `merge` reports them as missing.
+            if counts["leased"] == 0 and counts["expired"] == 0:
+                if counts["exhausted"]:
+                    exhausted = counts["exhausted"]
+                    print(f"[{worker_id}] {exhausted} prompt(s) reached --max-attempts and were not processed")
+                break
+            # Other workers still hold leases; wait in case one of them dies and its batch comes back.
+            time.sleep(args.poll_interval)
+            continue
+
+        print(f"[{worker_id}] claimed {len(item_ids)} prompt(s): {', '.join(item_ids)}")
+        try:
+            with LeaseHeartbeat(args.queue, args.stage, worker_id, item_ids, args.lease):
+                if args.stage == "generate":
+                    records = generate_all_answers(
+                        prompts=[prompts_by_id[item_id] for item_id in item_ids],
+                        model_factory=model_factory,
+                        verbose=args.verbose,
+                        max_workers=args.workers,
+                        retries=args.retries,
+                        retry_delay=args.retry_delay,
+                        samples=args.samples,
+                        budget=budget,
+                        latency_model=latency_model,
+                        vendor_share=args.vendor_share,
+                    )
+                else:
+                    records = judge_all_answers(
+                        answers=[a for item_id in item_ids for a in answers_by_prompt.get(item_id, [])],
+                        model_factory=model_factory,
+                        config=config,
+                        judges=judges,
+                        verbose=args.verbose,
+                        max_workers=args.workers,
+                        retries=args.retries,
+                        retry_delay=args.retry_delay,
+                        hint_mode=hint_mode,
+                        samples_mode=args.samples_mode,
+                        budget=budget,
+                        latency_model=latency_model,
+                        vendor_share=args.vendor_share,
+                    )
+            shard_path = write_shard(records, args.shard_dir, args.stage, worker_id, batch_no)
+        except BaseException:
+            queue.release(args.stage, worker_id, item_ids)
+            raise
+
+        queue.complete(args.stage, worker_id, item_ids)
+        print(f"[{worker_id}] wrote {len(records)} record(s) to {shard_path}")
+        batch_no += 1
+        processed += len(item_ids)
+
+    queue.close()
+    print(f"[{worker_id}] queue drained, processed {processed} prompt(s)")
+    if budget is not None:
+        print(f"[{worker_id}] " + budget.report())
+    return processed
+
+
+def merge_shards(queue_path: str, stage: str, shard_dir: str) -> tuple[list[dict[str, str]], list[str]]:
+    queue = LeaseQueue(queue_path)
+    prompt_order = queue.item_ids(stage)
+    queue.close()
+
+    shard_paths = sorted((Path(shard_dir) / stage).glob("*.json"), key=lambda p: (p.stat().st_mtime, p.name))
+    merged: dict[tuple, dict[str, str]] = {}
+    for shard_path in shard_paths:
+        for record in load_json(str(shard_path)):
+            key = record_key(stage, record)
+            # Duplicates appear when a lease expired under a slow-but-alive worker; prefer a successful record.
+            if key not in merged or ("error" in merged[key] and "error" not in record):
+                merged[key] = record
+
+    by_prompt = group_by_prompt(list(merged.values()))
+    records = [record for prompt_id in prompt_order for record in by_prompt.get(prompt_id, [])]
+    missing = [prompt_id for prompt_id in prompt_order if prompt_id not in by_prompt]
+    return records, missing
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sharded generation/judging over a lease-based work queue")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_common(sub):
+        sub.add_argument("--queue", type=str, required=True, help="Path to the SQLite queue file")
+        sub.add_argument("--stage", type=str, required=True, choices=STAGES)
+
+    init_parser = subparsers.add_parser("init", help="Enqueue prompt ids for a stage")
+    add_common(init_parser)
+    init_parser.add_argument("--prompts", type=str, default=None, help="Prompts JSON (generate stage)")
+    init_parser.add_argument("--answers", type=str, default=None, help="Answers JSON (judge stage)")
+    init_parser.add_argument("--limit", type=int, default=None)
+    init_parser.add_argument("--category", type=str, default=None)
+
+    work_parser = subparsers.add_parser("work", help="Claim and process batches until the queue is drained")
+    add_common(work_parser)
+    work_parser.add_argument("--shard-dir", type=str, required=True)
+    work_parser.add_argument("--config", type=str, default="config.yaml")
+    work_parser.add_argument("--prompts", type=str, default="prompts.json")
+    work_parser.add_argument("--answers", type=str, default=None)
+    work_parser.add_argument("--judges", type=str, nargs="+", default=None)
+    work_parser.add_argument(
+        "--hint-mode", type=str, default=None, choices=["none", "self", "competitors", "full"]
+    )
+    work_parser.add_argument("--worker-id", type=str, default=None, help="Default: <hostname>-<pid>")
+    work_parser.add_argument("--processes", type=int, default=1, help="Local worker processes to start (default: 1)")
+    work_parser.add_argument("--batch-size", type=int, default=4, help="Prompt ids claimed per lease (default: 4)")
+    work_parser.add_argument("--lease", type=float, default=600.0, help="Lease duration in seconds (default: 600)")
+    work_parser.add_argument(
+        "--max-attempts", type=int, default=None, help="Stop re-claiming a prompt after this many leases"
+    )
+    work_parser.add_argument("--poll-interval", type=float, default=10.0)
+    work_parser.add_argument("--workers", type=int, default=6, help="Concurrent API calls per process (default: 6)")
+    work_parser.add_argument("--retries", type=int, default=3)
+    work_parser.add_argument("--retry-delay", type=float, default=1.0)
+    work_parser.add_argument("--verbose", action="store_true", default=False)
+    add_sample_arguments(work_parser)
+    add_sample_mode_arguments(work_parser)
+    add_history_arguments(work_parser)
+    add_fairness_arguments(work_parser)
+
+    merge_parser = subparsers.add_parser("merge", help="Merge shard outputs into a single file")
+    add_common(merge_parser)
+    merge_parser.add_argument("--shard-dir", type=str, required=True)
+    merge_parser.add_argument("--output", type=str, required=True)
+
+    status_parser = subparsers.add_parser("status", help="Show queue progress")
+    add_common(status_parser)
+    status_parser.add_argument(
+        "--max-attempts", type=int, default=None, help="Count unfinished prompts leased this many times as exhausted"
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "init":
+        if args.stage == "generate":
+            if not args.prompts:
+                parser.error("--prompts is required for the generate stage")
+            prompts = load_prompts(args.prompts)
+            if args.category:
+                prompts = [p for p in prompts if p["category"] == args.category]
+            prompt_ids = [p["id"] for p in prompts]
+        else:
+            if not args.answers:
+                parser.error("--answers is required for the judge stage")
+            prompt_ids = list(dict.fromkeys(a["prompt_id"] for a in load_json(args.answers)))
+        if args.limit:
+            prompt_ids = prompt_ids[: args.limit]
+        queue = LeaseQueue(args.queue)
+        added = queue.enqueue(args.stage, prompt_ids)
+        queue.close()
+        print(f"Enqueued {added} new prompt id(s) for stage '{args.stage}' in {args.queue}")
+
+    elif args.command == "work":
+        if args.stage == "judge" and not args.answers:
+            parser.error("--answers is required for the judge stage")
+        base_id = args.worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        if args.processes <= 1:
+            run_worker(args, base_id)
+            return
+        processes = [
+            multiprocessing.Process(target=run_worker, args=(args, f"{base_id}-{i}")) for i in range(args.processes)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        failed = [p for p in processes if p.exitcode != 0]
+        if failed:
+            print(f"⚠ {len(failed)} worker process(es) exited with errors; re-run `work` to pick up their batches")
+            sys.exit(1)
+
+    elif args.command == "merge":
+        records, missing = merge_shards(args.queue, args.stage, args.shard_dir)
+        save_json(records, args.output)
+        errors = sum(1 for r in records if "error" in r)
+        print(f"Merged {len(records)} record(s) ({errors} with errors) into {args.output}")
+        if missing:
+            print(f"⚠ {len(missing)} prompt(s) have no shard output yet: {', '.join(missing)}")
+        if args.stage == "generate":
+            print("\n" + telemetry_report(records, answer_group, "Usage by model"))
+        else:
+            print("\n" + telemetry_report(records, judgment_group, "Usage by judge"))
+
+    elif args.command == "status":
+        queue = LeaseQueue(args.queue)
+        counts = queue.status(args.stage, args.max_attempts)
+        queue.close()
+        total = sum(counts.values())
+        print(f"Stage '{args.stage}': {total} prompt(s)")
+        for status, count in counts.items():
+            print(f"  {status}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import math
+from typing import Any, Callable
+
+TOKEN_FIELDS = ("input_tokens", "output_tokens", "cached_tokens", "reasoning_tokens")
+
+
+def new_envelope(model_name: str = None) -> dict[str, Any]:
+    """
+    Usage / latency envelope for one logical model call.
+
+    `attempts` counts provider requests, including a wrapper's own retries and repair calls, and token counts
+    are summed over all of them. `latency_s` is the wall time of the whole call. Calls made with reasoning
+    settings also carry them as `reasoning`, and the returned thoughts as `thoughts` when they were asked for.
+    """
+    envelope = {"model": model_name, "route": None, "attempts": 0}
+    envelope.update({field: 0 for field in TOKEN_FIELDS})
+    envelope.update({"latency_s": 0.0, "finish_reason": None})
+    return envelope
+
+
+def merge_envelopes(total: dict[str, Any], call: dict[str, Any]) -> dict[str, Any]:
+    """Fold one call's envelope into a running total, e.g. across the retries of one answer or judgment."""
+    if not call:
+        return total
+    if not total:
+        return dict(call)
+    merged = dict(total)
+    for field in ("attempts", *TOKEN_FIELDS):
+        merged[field] = merged.get(field, 0) + call.get(field, 0)
+    merged["latency_s"] = round(merged.get("latency_s", 0.0) + call.get("latency_s", 0.0), 4)
+    for field in ("model", "route", "finish_reason", "reasoning", "thoughts"):
+        if call.get(field) is not None:
+            merged[field] = call[field]
+    return merged
+
+
+def split_envelope(envelope: dict[str, Any], n: int) -> list[dict[str, Any]]:
+    """
+    Per-sample envelopes for one request that returned `n` completions.
+
+    The prompt is paid for once, so input / cached tokens and attempts stay on the first sample; output and
+    reasoning tokens are divided evenly. Every sample reports the request's latency.
+    """
+    if not envelope:
+        return [envelope] * n
+    samples = []
+    for i in range(n):
+        sample = dict(envelope)
+        for field in ("attempts", "input_tokens", "cached_tokens"):
+            sample[field] = envelope.get(field, 0) if i == 0 else 0
+        for field in ("output_tokens", "reasoning_tokens"):
+            share, remainder = divmod(envelope.get(field, 0), n)
+            sample[field] = share + (i < remainder)
+        samples.append(sample)
+    return samples
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return math.nan
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def summarize_telemetry(
+    records: list[dict[str, Any]], group_key: Callable[[dict[str, Any]], str]
+) -> dict[str, dict[str, Any]]:
+    """Per-group totals and latency percentiles over the `telemetry` envelopes stored on records."""
+    latencies: dict[str, list[float]] = {}
+    summary: dict[str, dict[str, Any]] = {}
+    for record in records:
+        telemetry = record.get("telemetry")
+        if not telemetry:
+            continue
+        group = group_key(record)
+        row = summary.setdefault(group, {"records": 0, "errors": 0, "attempts": 0, **dict.fromkeys(TOKEN_FIELDS, 0)})
+        row["records"] += 1
+        row["errors"] += "error" in record
+        for field in ("attempts", *TOKEN_FIELDS):
+            row[field] += telemetry.get(field, 0)
+        latencies.setdefault(group, []).append(telemetry.get("latency_s", 0.0))
+
+    for group, row in summary.items():
+        values = sorted(latencies[group])
+        row["latency_total_s"] = sum(values)
+        row["latency_p50_s"] = percentile(values, 0.5)
+        row["latency_p95_s"] = percentile(values, 0.95)
+    return dict(sorted(summary.items()))
+
+
+def answer_group(record: dict[str, Any]) -> str:
+    return f"{record['model_vendor']}_{record['model_tier']}"
+
+
+def judgment_group(record: dict[str, Any]) -> str:
+    return record["judge_model"]
+
+
+def telemetry_report(records: list[dict[str, Any]], group_key: Callable[[dict[str, Any]], str], title: str) -> str:
+    summary = summarize_telemetry(records, group_key)
+    if not summary:
+        return f"{title}: no telemetry recorded"
+
+    report = [
+        f"{title}:",
+        f"  {'':20} {'calls':>6} {'tries':>6} {'in tok':>10} {'out tok':>10} {'cached':>9} {'reason':>9} "
+        f"{'p50 s':>7} {'p95 s':>7}",
+    ]
+    for group, row in summary.items():
+        report.append(
+            f"  {group:20} {row['records']:6d} {row['attempts']:6d} {row['input_tokens']:10d} "
+            f"{row['output_tokens']:10d} {row['cached_tokens']:9d} {row['reasoning_tokens']:9d} "
+            f"{row['latency_p50_s']:7.2f} {row['latency_p95_s']:7.2f}"
+        )
+    return "\n".join(report)
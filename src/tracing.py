@@ -0,0 +1,294 @@
+"""
+Opt-in tracing spans and a sampling profiler for the generate / judge hot path.
+
+Instrumented code calls `span(name, **attributes)` or is decorated with `@traced(name)`. While tracing is off
+`span` returns one shared no-op context manager and `traced` calls straight through, so an instrumented call
+costs a global lookup and nothing else. `instrumented_run` turns it on for the length of a CLI run and writes:
+
+- `--trace PATH`: every finished span, as a Chrome trace (chrome://tracing, Perfetto) or as OTLP/JSON spans
+  (one `resourceSpans` document, the shape an OpenTelemetry collector's file receiver reads).
+- `--profile PATH`: stack samples of every thread in folded "frame;frame;frame count" lines, each stack
+  prefixed with the span stack that was active on that thread, for flamegraph.pl / speedscope / inferno.
+  Worker threads are sampled too, which cProfile would miss.
+"""
+
+import contextlib
+import functools
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any
+
+TRACE_FORMATS = ("chrome", "otlp")
+
+_NOOP_SPAN = contextlib.nullcontext()
+_tracer: "Tracer | None" = None
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "attributes", "span_id", "parent_id", "start_ns")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def __enter__(self) -> "_Span":
+        stack = self.tracer.thread_stack()
+        self.parent_id = stack[-1].span_id if stack else None
+        self.span_id = next(self.tracer._ids)
+        stack.append(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        end_ns = time.time_ns()
+        self.tracer.thread_stack().pop()
+        if self.tracer.record:
+            error = None if exc_type is None else f"{exc_type.__name__}: {exc}"
+            self.tracer.spans.append(
+                (
+                    self.name,
+                    self.span_id,
+                    self.parent_id,
+                    threading.get_ident(),
+                    self.start_ns,
+                    end_ns,
+                    self.attributes,
+                    error,
+                )
+            )
+
+
+class Tracer:
+    """Collects finished spans. With `record=False` it only tracks each thread's open spans, for the profiler."""
+
+    def __init__(self, record: bool = True):
+        self.record = record
+        # (name, span_id, parent_id, thread_id, start_ns, end_ns, attributes, error); list.append is atomic.
+        self.spans: list[tuple] = []
+        self.trace_id = os.urandom(16).hex()
+        self._ids = itertools.count(1)
+        self._stacks: dict[int, list[_Span]] = {}
+        self._thread_names: dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def thread_stack(self) -> list[_Span]:
+        ident = threading.get_ident()
+        stack = self._stacks.get(ident)
+        if stack is None:
+            with self._lock:
+                stack = self._stacks.setdefault(ident, [])
+                self._thread_names[ident] = threading.current_thread().name
+        return stack
+
+    def active_path(self, thread_id: int) -> list[str]:
+        return [s.name for s in list(self._stacks.get(thread_id, ()))]
+
+    def chrome_trace(self) -> dict[str, Any]:
+        pid = os.getpid()
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in self._thread_names.items()
+        ]
+        for name, _, _, tid, start_ns, end_ns, attributes, error in self.spans:
+            args = dict(attributes, error=error) if error else attributes
+            events.append(
+                {
+                    "name": name,
+                    "cat": name.split(".", 1)[0],
+                    "ph": "X",
+                    "ts": start_ns / 1000,
+                    "dur": (end_ns - start_ns) / 1000,
+                    "pid": pid,
+                    "tid": tid,
+                    "args": args,
+                }
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def otlp_trace(self, service_name: str = "llm-eval") -> dict[str, Any]:
+        def attribute(key: str, value: Any) -> dict[str, Any]:
+            if isinstance(value, bool):
+                return {"key": key, "value": {"boolValue": value}}
+            if isinstance(value, int):
+                return {"key": key, "value": {"intValue": str(value)}}
+            if isinstance(value, float):
+                return {"key": key, "value": {"doubleValue": value}}
+            return {"key": key, "value": {"stringValue": str(value)}}
+
+        spans = []
+        for name, span_id, parent_id, tid, start_ns, end_ns, attributes, error in self.spans:
+            spans.append(
+                {
+                    "traceId": self.trace_id,
+                    "spanId": f"{span_id:016x}",
+                    "parentSpanId": f"{parent_id:016x}" if parent_id else "",
+                    "name": name,
+                    "kind": 1,
+                    "startTimeUnixNano": str(start_ns),
+                    "endTimeUnixNano": str(end_ns),
+                    "attributes": [attribute(k, v) for k, v in attributes.items()]
+                    + [attribute("thread.id", tid), attribute("thread.name", self._thread_names.get(tid, ""))],
+                    "status": {"code": 2, "message": error} if error else {"code": 1},
+                }
+            )
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": [attribute("service.name", service_name)]},
+                    "scopeSpans": [{"scope": {"name": "src.tracing"}, "spans": spans}],
+                }
+            ]
+        }
+
+    def export(self, path: str, trace_format: str = "chrome") -> None:
+        if trace_format not in TRACE_FORMATS:
+            raise ValueError(f"Unknown trace format: {trace_format}")
+        payload = self.chrome_trace() if trace_format == "chrome" else self.otlp_trace()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(payload, f)
+
+
+def span(name: str, **attributes) -> Any:
+    """Context manager timing a block as a span. A shared no-op while tracing is off."""
+    tracer = _tracer
+    if tracer is None:
+        return _NOOP_SPAN
+    return _Span(tracer, name, attributes)
+
+
+def traced(name: str = None):
+    """Decorator form of `span`; while tracing is off the wrapper only checks one global before calling through."""
+
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            tracer = _tracer
+            if tracer is None:
+                return fn(*args, **kwargs)
+            with _Span(tracer, span_name, {}):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def tracing_enabled() -> bool:
+    return _tracer is not None
+
+
+def enable_tracing(record: bool = True) -> Tracer:
+    global _tracer
+    _tracer = Tracer(record=record)
+    return _tracer
+
+
+def disable_tracing() -> None:
+    global _tracer
+    _tracer = None
+
+
+class SamplingProfiler:
+    """Samples every thread's Python stack on a background thread, keyed by the thread's active span path."""
+
+    def __init__(self, tracer: Tracer, interval: float = 0.005):
+        self.tracer = tracer
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+
+    @staticmethod
+    def _frame_label(frame) -> str:
+        code = frame.f_code
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._frame_label(frame))
+                    frame = frame.f_back
+                stack.reverse()
+                path = self.tracer.active_path(thread_id) or ["(no span)"]
+                self.samples[";".join([f"[{name}]" for name in path] + stack)] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def stage_totals(self) -> dict[str, int]:
+        totals: Counter = Counter()
+        for stack, count in self.samples.items():
+            totals[stack.split(";", 1)[0].strip("[]")] += count
+        return dict(totals.most_common())
+
+    def write_folded(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def add_instrumentation_arguments(parser) -> None:
+    parser.add_argument("--trace", type=str, default=None, help="Write tracing spans for this run to this file")
+    parser.add_argument("--trace-format", type=str, default="chrome", choices=TRACE_FORMATS)
+    parser.add_argument(
+        "--profile",
+        type=str,
+        default=None,
+        help="Sample all threads during the run and write folded per-stage flame stacks to this file",
+    )
+    parser.add_argument(
+        "--profile-interval", type=float, default=0.005, help="Seconds between profiler samples (default: 0.005)"
+    )
+
+
+@contextlib.contextmanager
+def instrumented_run(
+    trace_path: str = None, trace_format: str = "chrome", profile_path: str = None, profile_interval: float = 0.005
+):
+    if not trace_path and not profile_path:
+        yield None
+        return
+
+    tracer = enable_tracing(record=bool(trace_path))
+    profiler = SamplingProfiler(tracer, profile_interval) if profile_path else None
+    if profiler is not None:
+        profiler.start()
+    try:
+        with span("run"):
+            yield tracer
+    finally:
+        if profiler is not None:
+            profiler.stop()
+        disable_tracing()
+        if trace_path:
+            tracer.export(trace_path, trace_format)
+            print(f"✓ Trace ({len(tracer.spans)} spans, {trace_format}) saved to: {trace_path}")
+        if profiler is not None:
+            profiler.write_folded(profile_path)
+            total = sum(profiler.samples.values()) or 1
+            print(f"✓ Profile ({sum(profiler.samples.values())} samples) saved to: {profile_path}")
+            for stage, count in list(profiler.stage_totals().items())[:10]:
+                print(f"  {stage:30} {count / total * 100:6.2f}%")
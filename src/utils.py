@@ -1,5 +1,8 @@
 import os
+import sys
 import json
+import types
+import importlib
 import yaml
 import random
 from datetime import datetime
@@ -7,6 +10,8 @@ from pathlib import Path
 from typing import Any
 from dotenv import load_dotenv
 
+from src.tracing import traced
+
 
 def load_config(config_path: str = "config.yaml") -> dict[str, Any]:
     with open(config_path, "r") as f:
@@ -29,6 +34,7 @@ def load_prompts(prompts_path: str = "prompts.json") -> list[dict[str, Any]]:
     return data["prompts"]
 
 
+@traced("save_json")
 def save_json(data: Any, filepath: str, indent: int = 2) -> None:
     Path(filepath).parent.mkdir(parents=True, exist_ok=True)
     with open(filepath, "w") as f:
@@ -44,6 +50,7 @@ def generate_timestamp() -> str:
     return datetime.now().strftime("%Y%m%d_%H%M%S")
 
 
+@traced("anonymize_and_shuffle")
 def anonymize_and_shuffle(answers: list[dict[str, Any]], seed: int = None) -> tuple:
     if seed is not None:
         random.seed(seed)
@@ -65,6 +72,7 @@ def anonymize_and_shuffle(answers: list[dict[str, Any]], seed: int = None) -> tu
     return anonymized, mapping
 
 
+@traced("format_judge_prompt")
 def format_judge_prompt(
     question: str,
     anonymized_answers: list[dict[str, str]],
@@ -210,6 +218,7 @@ def _find_first_json_span(s: str) -> tuple[int, int] | None:
     return None
 
 
+@traced("extract_json_from_response")
 def extract_json_from_response(response: str) -> dict[str, Any]:
     raw = response.strip()
     raw = _strip_code_fences(raw)
@@ -279,3 +288,20 @@ def calculate_statistics(data: list[float]) -> dict[str, float]:
         "max": float(np.max(data)),
         "count": len(data),
     }
+
+
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, name: str) -> Any:
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, name)
+
+
+def lazy_import(module_name: str) -> types.ModuleType:
+    """
+    Return `module_name` without importing it yet; the real import happens on first attribute access.
+
+    For heavy dependencies that only some code paths need, e.g. `pd = lazy_import("pandas")`. Annotations that
+    mention the module must not be evaluated at definition time (`from __future__ import annotations`).
+    """
+    return sys.modules.get(module_name) or _LazyModule(module_name)
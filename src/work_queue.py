@@ -0,0 +1,146 @@
+import sqlite3
+import time
+from pathlib import Path
+
+
+class LeaseQueue:
+    """
+    Lease-based work queue stored in a single SQLite file.
+
+    Items are claimed in batches under a time-limited lease. A worker that dies simply stops renewing its
+    lease, and once the lease expires the items become claimable again. No server is involved, so the file
+    can live on storage shared between processes or hosts. The default rollback journal is kept on purpose:
+    WAL mode does not work on network filesystems.
+    """
+
+    def __init__(self, path: str, busy_timeout: float = 60.0):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS items (
+                stage TEXT NOT NULL,
+                item_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (stage, item_id)
+            )
+            """
+        )
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front so two workers can never claim the same rows.
+        self._conn.execute("BEGIN IMMEDIATE")
+        return self._conn
+
+    def enqueue(self, stage: str, item_ids: list[str]) -> int:
+        conn = self._transaction()
+        try:
+            (start,) = conn.execute("SELECT COALESCE(MAX(seq) + 1, 0) FROM items WHERE stage = ?", (stage,)).fetchone()
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO items (stage, item_id, seq) VALUES (?, ?, ?)",
+                [(stage, item_id, start + i) for i, item_id in enumerate(item_ids)],
+            )
+            added = conn.total_changes - before
+            conn.execute("COMMIT")
+            return added
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def claim(
+        self, stage: str, worker_id: str, batch_size: int, lease_seconds: float, max_attempts: int = None
+    ) -> list[str]:
+        now = time.time()
+        conn = self._transaction()
+        try:
+            query = (
+                "SELECT item_id FROM items WHERE stage = ? "
+                "AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?))"
+            )
+            params: list = [stage, now]
+            if max_attempts is not None:
+                query += " AND attempts < ?"
+                params.append(max_attempts)
+            query += " ORDER BY seq LIMIT ?"
+            params.append(batch_size)
+            item_ids = [row[0] for row in conn.execute(query, params)]
+            conn.executemany(
+                "UPDATE items SET status = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1 "
+                "WHERE stage = ? AND item_id = ?",
+                [(worker_id, now + lease_seconds, stage, item_id) for item_id in item_ids],
+            )
+            conn.execute("COMMIT")
+            return item_ids
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def renew(self, stage: str, worker_id: str, item_ids: list[str], lease_seconds: float) -> int:
+        conn = self._transaction()
+        try:
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE items SET lease_expires = ? "
+                "WHERE stage = ? AND item_id = ? AND owner = ? AND status = 'leased'",
+                [(time.time() + lease_seconds, stage, item_id, worker_id) for item_id in item_ids],
+            )
+            renewed = conn.total_changes - before
+            conn.execute("COMMIT")
+            return renewed
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def complete(self, stage: str, worker_id: str, item_ids: list[str]) -> None:
+        # Completion is accepted even if the lease was lost: the shard output has been written, and a
+        # duplicate produced by whoever re-claimed the items is resolved at merge time.
+        self._set_status(stage, item_ids, "done", worker_id)
+
+    def release(self, stage: str, worker_id: str, item_ids: list[str]) -> None:
+        self._set_status(stage, item_ids, "pending", None, only_owner=worker_id)
+
+    def _set_status(
+        self, stage: str, item_ids: list[str], status: str, owner: str | None, only_owner: str = None
+    ) -> None:
+        conn = self._transaction()
+        try:
+            query = "UPDATE items SET status = ?, owner = ?, lease_expires = NULL WHERE stage = ? AND item_id = ?"
+            rows = [(status, owner, stage, item_id) for item_id in item_ids]
+            if only_owner is not None:
+                query += " AND owner = ?"
+                rows = [row + (only_owner,) for row in rows]
+            conn.executemany(query, rows)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def item_ids(self, stage: str) -> list[str]:
+        rows = self._conn.execute("SELECT item_id FROM items WHERE stage = ? ORDER BY seq", (stage,))
+        return [row[0] for row in rows]
+
+    def status(self, stage: str, max_attempts: int = None) -> dict[str, int]:
+        """
+        Item counts per status. With `max_attempts`, unfinished items that `claim` will no longer hand out are
+        counted as "exhausted" rather than "pending" / "expired".
+        """
+        now = time.time()
+        counts = {"pending": 0, "leased": 0, "expired": 0, "exhausted": 0, "done": 0}
+        for status, expires, attempts in self._conn.execute(
+            "SELECT status, lease_expires, attempts FROM items WHERE stage = ?", (stage,)
+        ):
+            if status == "leased" and expires is not None and expires < now:
+                status = "expired"
+            if status in ("pending", "expired") and max_attempts is not None and attempts >= max_attempts:
+                status = "exhausted"
+            counts[status] = counts.get(status, 0) + 1
+        return counts
@@ -22,11 +22,20 @@ sys.path.insert(0, str(PROJECT_ROOT))
 
 from src.utils import load_config, load_json, save_json
 from src.models import ModelFactory
-from src.generate_answers import generate_answer  # type: ignore
+from src.budget import BudgetTracker, estimate_tokens, max_output_tokens, metered
+from src.generate_answers import generate_answer_with_telemetry  # type: ignore
+from src.telemetry import answer_group, merge_envelopes, telemetry_report
 
 
-def regenerate_entry(model, prompt_text: str, retries: int) -> str:
-    return generate_answer(model, prompt_text, retries=retries, retry_delay=45)
+def regenerate_entry(
+    model, vendor: str, prompt_text: str, retries: int, budget: BudgetTracker = None
+) -> tuple[str | dict[str, str], dict]:
+    skip_reason = budget.skip_reason(vendor) if budget is not None else None
+    if skip_reason is not None:
+        return {"error": skip_reason}, None
+    output_tokens = max_output_tokens(model.config, model.model_name)
+    with metered(budget, vendor, estimate_tokens(prompt_text), output_tokens):
+        return generate_answer_with_telemetry(model, prompt_text, retries=retries, retry_delay=45)
 
 
 def main() -> None:
@@ -94,21 +103,26 @@ def main() -> None:
                 "prompt_text": answer["prompt_text"],
                 "answer_id": answer["answer_id"],
                 "model_key": f"{vendor}_{tier}",
+                "vendor": vendor,
                 "model": get_model_instance(vendor, tier, model_name),
             }
         )
 
+    budget = BudgetTracker.from_config(config)
     pbar = tqdm(total=len(tasks), desc="Regenerating answers")
     failures = 0
     ordered_outputs = [None] * len(tasks)
+    ordered_telemetry = [None] * len(tasks)
 
     with ThreadPoolExecutor(max_workers=args.workers) as executor:
         future_to_index = {
             executor.submit(
                 regenerate_entry,
                 task["model"],
+                task["vendor"],
                 task["prompt_text"],
                 args.retries,
+                budget,
             ): idx
             for idx, task in enumerate(tasks)
         }
@@ -116,7 +130,7 @@ def main() -> None:
         for future in as_completed(future_to_index):
             idx = future_to_index[future]
             try:
-                ordered_outputs[idx] = future.result()
+                ordered_outputs[idx], ordered_telemetry[idx] = future.result()
             except Exception as e:
                 ordered_outputs[idx] = f"[ERROR: Failed to regenerate answer - {e}]"
                 failures += 1
@@ -127,6 +141,10 @@ def main() -> None:
 
     for idx, task in enumerate(tasks):
         new_answer = ordered_outputs[idx]
+        if ordered_telemetry[idx] is not None:
+            # Keep the cost of the original failed run alongside the regeneration attempts.
+            answer = answers[task["index"]]
+            answer["telemetry"] = merge_envelopes(answer.get("telemetry"), ordered_telemetry[idx])
         if new_answer is None:
             failures += 1
             if "answer_text" in answers[task["index"]]:
@@ -148,6 +166,10 @@ def main() -> None:
     else:
         print("✓ Successfully regenerated all dubious answers.")
 
+    print(telemetry_report([answers[task["index"]] for task in tasks], answer_group, "Regeneration usage by model"))
+    if budget is not None:
+        print(budget.report())
+
     output_path = args.output or args.answers
     save_json(answers, output_path)
     print(f"Updated answers written to {output_path}")
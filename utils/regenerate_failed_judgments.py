@@ -24,7 +24,9 @@ sys.path.insert(0, str(PROJECT_ROOT))
 
 from src.utils import load_config, load_json, save_json
 from src.models import ModelFactory
-from src.judge_answers import judge_prompt_answers
+from src.budget import BudgetTracker, estimate_tokens, max_output_tokens, metered
+from src.judge_answers import SAMPLE_MODES, judge_prompt_answers, select_sample_sets
+from src.telemetry import judgment_group, merge_envelopes, telemetry_report
 
 
 def build_answers_index(answers: list[dict[str, Any]]) -> dict[str, list[dict[str, Any]]]:
@@ -42,21 +44,31 @@ def run_with_retries(
     retries: int,
     retry_delay: float,
     hint_mode: str = None,
+    budget: BudgetTracker = None,
 ):
+    judge_vendor = task["judge_key"].split("_")[0]
+    skip_reason = budget.skip_reason(judge_vendor) if budget is not None else None
+    if skip_reason is not None:
+        return {"prompt_id": task["prompt_id"], "judge_model": task["judge_key"], "error": skip_reason, "mapping": {}}
+    answers_text = "".join(a.get("answer_text", "") for a in task["answers"])
+    prompt_tokens = estimate_tokens(task["prompt_text"] + answers_text)
+
     last_exc = None
     for attempt in range(retries):
         try:
             judge_model = get_model_fn(task["judge_key"], task["judge_model_name"])
-            return judge_prompt_answers(
-                prompt_id=task["prompt_id"],
-                prompt_text=task["prompt_text"],
-                answers=task["answers"],
-                judge_model=judge_model,
-                judge_name=task["judge_key"],
-                shuffle_seed=shuffle_seed,
-                verbose=verbose,
-                hint_mode=hint_mode,
-            )
+            output_tokens = max_output_tokens(judge_model.config, judge_model.model_name, "judging")
+            with metered(budget, judge_vendor, prompt_tokens, output_tokens):
+                return judge_prompt_answers(
+                    prompt_id=task["prompt_id"],
+                    prompt_text=task["prompt_text"],
+                    answers=task["answers"],
+                    judge_model=judge_model,
+                    judge_name=task["judge_key"],
+                    shuffle_seed=shuffle_seed,
+                    verbose=verbose,
+                    hint_mode=hint_mode,
+                )
         except Exception as exc:
             last_exc = exc
             if attempt < retries - 1:
@@ -113,6 +125,13 @@ def main() -> None:
         choices=["none", "self", "competitors", "full"],
         help="Hinting mode: none (blind), self (reveal own model), competitors (reveal others), full (reveal all)",
     )
+    parser.add_argument(
+        "--samples-mode",
+        type=str,
+        default="first",
+        choices=SAMPLE_MODES,
+        help="--samples-mode the judgments were made with; per-sample judgments always re-use their own sample",
+    )
     args = parser.parse_args()
 
     config = load_config(args.config)
@@ -157,6 +176,16 @@ def main() -> None:
             print(f"⚠ Skipping {prompt_id} - no answers found.")
             skipped += 1
             continue
+        sample_index = entry.get("sample_index")
+        if sample_index is None:
+            prompt_answers = select_sample_sets(prompt_answers, args.samples_mode, shuffle_seed)[0][1]
+        else:
+            sample_sets = dict(select_sample_sets(prompt_answers, "each", shuffle_seed))
+            if sample_index not in sample_sets:
+                print(f"⚠ Skipping {prompt_id} - no answers for sample {sample_index}.")
+                skipped += 1
+                continue
+            prompt_answers = sample_sets[sample_index]
 
         tasks.append(
             {
@@ -164,6 +193,7 @@ def main() -> None:
                 "prompt_id": prompt_id,
                 "judge_key": judge_key,
                 "judge_model_name": entry.get("judge_model_name"),
+                "sample_index": sample_index,
                 "answers": prompt_answers,
                 "prompt_text": prompt_answers[0]["prompt_text"],
             }
@@ -173,6 +203,7 @@ def main() -> None:
         print("No runnable tasks (likely due to missing prompt data).")
         return
 
+    budget = BudgetTracker.from_config(config)
     pbar = tqdm(total=len(tasks), desc="Regenerating judgments")
 
     ordered_results = [None] * len(tasks)
@@ -188,6 +219,7 @@ def main() -> None:
                 args.retries,
                 args.retry_delay,
                 args.hint_mode,
+                budget,
             ): idx
             for idx, task in enumerate(tasks)
         }
@@ -210,11 +242,22 @@ def main() -> None:
 
     for idx, task in enumerate(tasks):
         if ordered_results[idx] is not None:
-            judgments[task["index"]] = ordered_results[idx]
+            result = ordered_results[idx]
+            # Keep the cost of the original failed judgment alongside the regeneration.
+            telemetry = merge_envelopes(judgments[task["index"]].get("telemetry"), result.get("telemetry"))
+            if telemetry is not None:
+                result["telemetry"] = telemetry
+            if task["sample_index"] is not None:
+                result["sample_index"] = task["sample_index"]
+            judgments[task["index"]] = result
 
     if skipped:
         print(f"Skipped {skipped} entries due to missing data.")
 
+    print(telemetry_report([judgments[task["index"]] for task in tasks], judgment_group, "Regeneration usage by judge"))
+    if budget is not None:
+        print(budget.report())
+
     output_path = args.output or args.judgments
     save_json(judgments, output_path)
     print(f"Updated judgments written to {output_path}")
@@ -38,8 +38,8 @@ def main():
     parser.add_argument("--prompts", type=str, required=True, help="Path to prompts JSON.")
     parser.add_argument("--prompt-id", type=str, default=None, help="Specific prompt id to run.")
     parser.add_argument("--prompt-index", type=int, default=0, help="Prompt index if id not provided.")
-    parser.add_argument("--vendor", type=str, required=True, choices=["gpt", "gemini", "claude"], help="Model vendor.")
-    parser.add_argument("--tier", type=str, required=True, choices=["fast", "thinking"], help="Model tier.")
+    parser.add_argument("--vendor", type=str, required=True, help="Model vendor, as configured under models:.")
+    parser.add_argument("--tier", type=str, required=True, help="Model tier, as configured under models:.")
     parser.add_argument(
         "--use-response-model", action="store_true", help="Request structured output using the JudgmentSchema."
     )
@@ -78,7 +78,9 @@ def main():
 
     response_model = JudgmentSchema if args.use_response_model else None
 
-    response = model.generate(prompt_text, system_prompt=system_prompt, response_model=response_model)
+    response, telemetry = model.generate_with_metadata(
+        prompt_text, system_prompt=system_prompt, response_model=response_model
+    )
 
     if isinstance(response, BaseModel):
         output = response.model_dump()
@@ -95,6 +97,7 @@ def main():
                 "tier": args.tier,
                 "use_response_model": args.use_response_model,
                 "output": output,
+                "telemetry": telemetry,
             },
             indent=2,
         )